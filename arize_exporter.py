@@ -3,11 +3,23 @@ Arize exporter - sends guardrail evaluation results to Arize for observability.
 """
 
 import logging
+import gzip
+import hashlib
+import json
+import time
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import httpx
 import asyncio
 
+from guardrails_eval.utils.metrics import ARIZE_ERRORS, ARIZE_REQUEST_SECONDS
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,6 +32,18 @@ class ArizeExporter:
     - Trend analysis over time
     - Correlation with model performance
     - Production quality monitoring
+    
+    With batch_enabled, evaluation exports are queued and a background task
+    coalesces them into multi-record POSTs to /api/v1/evaluations/batch, bounded by
+    batch_max_records and batch_max_bytes and sent at least every
+    batch_flush_interval_seconds (optionally gzip-compressed).
+    
+    Sampling: breached and failed traces are always exported; passed traces are
+    exported for a deterministic pass_sample_rate share of trace_ids. Sampled-out
+    traces are counted exactly and sent as periodic aggregates. The aggregates are
+    authoritative: passed traces = exported passed records + passed_sampled_out.
+    Records carry their sample_rate as a tag for information only; they carry no
+    re-weighting metric, so nothing is counted twice.
     """
     
     def __init__(self, arize_config: Dict[str, Any]):
@@ -36,16 +60,45 @@ class ArizeExporter:
         
         self.enabled = bool(self.endpoint and self.api_key and self.space_id)
         
+        # Background batching
+        self.batch_enabled = arize_config.get("batch_enabled", False)
+        self.batch_max_records = arize_config.get("batch_max_records", 100)
+        self.batch_max_bytes = arize_config.get("batch_max_bytes", 1024 * 1024)
+        self.batch_flush_interval = arize_config.get("batch_flush_interval_seconds", 1.0)
+        self.batch_gzip = arize_config.get("batch_gzip", False)
+        self.batch_queue: asyncio.Queue = asyncio.Queue(maxsize=arize_config.get("batch_queue_size", 10000))
+        self.batch_task: Optional[asyncio.Task] = None
+        self.batch_stats = {"batches": 0, "records_sent": 0, "records_failed": 0, "records_dropped": 0}
+        
+        # Sampling of passed traces
+        self.pass_sample_rate = float(arize_config.get("pass_sample_rate", 1.0))
+        self.max_prompt_chars = arize_config.get("max_prompt_chars")
+        self.max_response_chars = arize_config.get("max_response_chars")
+        self.aggregate_interval = arize_config.get("aggregate_interval_seconds", 60)
+        self.sampled_out_counts: Dict[str, int] = {}  # runtime_id -> passed traces not exported
+        self.aggregate_window_start = datetime.utcnow()
+        self.aggregate_task: Optional[asyncio.Task] = None
+        
         if self.enabled:
+            http2 = arize_config.get("http2", True) and HTTP2_AVAILABLE
             self.client = httpx.AsyncClient(
                 base_url=self.endpoint,
                 headers={
                     "Authorization": f"Bearer {self.api_key}",
                     "Content-Type": "application/json"
                 },
-                timeout=30.0
+                timeout=30.0,
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=arize_config.get("max_connections", 20),
+                    max_keepalive_connections=arize_config.get("max_keepalive_connections", 10),
+                    keepalive_expiry=arize_config.get("keepalive_expiry_seconds", 60.0)
+                )
+            )
+            logger.info(
+                f"ArizeExporter initialized - endpoint: {self.endpoint} "
+                f"(http2: {http2}, batching: {self.batch_enabled})"
             )
-            logger.info(f"ArizeExporter initialized - endpoint: {self.endpoint}")
         else:
             self.client = None
             logger.warning("ArizeExporter disabled - missing configuration")
@@ -58,7 +111,7 @@ class ArizeExporter:
         user_prompt: Optional[str] = None,
         model_response: Optional[str] = None,
         trace_metadata: Optional[Dict[str, Any]] = None
-    ) -> bool:
+    ) -> Optional[bool]:
         """
         Export guardrail evaluation results to Arize.
         
@@ -71,12 +124,17 @@ class ArizeExporter:
             trace_metadata: Additional trace metadata
             
         Returns:
-            True if export successful, False otherwise
+            True if export successful, None if sampled out, False otherwise
         """
         if not self.enabled:
             logger.debug("Arize export skipped - not enabled")
             return False
         
+        if not self._is_sampled(trace_id, evaluation_result):
+            self._record_sampled_out(runtime_id)
+            logger.debug(f"Arize export of passed trace {trace_id} sampled out")
+            return None
+        
         try:
             # Build Arize-compatible payload
             payload = self._build_arize_payload(
@@ -88,11 +146,12 @@ class ArizeExporter:
                 trace_metadata=trace_metadata
             )
             
+            # Queue for the background batch sender
+            if self.batch_enabled:
+                return self._enqueue_record(trace_id, payload)
+            
             # Send to Arize
-            response = await self.client.post(
-                "/api/v1/evaluations",
-                json=payload
-            )
+            response = await self._post("evaluation", "/api/v1/evaluations", json=payload)
             
             if response.status_code in [200, 201, 202]:
                 logger.info(f"Successfully exported evaluation for trace {trace_id} to Arize")
@@ -108,6 +167,207 @@ class ArizeExporter:
             logger.error(f"Error exporting to Arize: {str(e)}", exc_info=True)
             return False
     
+    def _is_sampled(self, trace_id: str, evaluation_result: Dict[str, Any]) -> bool:
+        """
+        Decide whether an evaluation is exported.
+        
+        Breaches and failures are always exported. Passed traces are sampled by a
+        hash of trace_id, so the decision is the same on every replica and replay.
+        """
+        if self.pass_sample_rate >= 1.0:
+            return True
+        
+        if evaluation_result.get("breached_status") or evaluation_result.get("overall_status") != "passed":
+            return True
+        
+        digest = hashlib.blake2b(trace_id.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") / 2 ** 64 < self.pass_sample_rate
+    
+    def _record_sampled_out(self, runtime_id: str):
+        """Count a sampled-out passed trace for the next aggregate report"""
+        self.sampled_out_counts[runtime_id] = self.sampled_out_counts.get(runtime_id, 0) + 1
+        
+        if self.aggregate_task is None:
+            self.aggregate_task = asyncio.create_task(self._aggregate_loop())
+    
+    async def _aggregate_loop(self):
+        """Send sampled-out pass counts every aggregate interval"""
+        while True:
+            try:
+                await asyncio.sleep(self.aggregate_interval)
+                await self._send_aggregates()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error sending Arize pass aggregates: {e}")
+    
+    async def _send_aggregates(self):
+        """Send and reset the sampled-out pass counts of the current window"""
+        counts = self.sampled_out_counts
+        window_start = self.aggregate_window_start
+        self.sampled_out_counts = {}
+        self.aggregate_window_start = datetime.utcnow()
+        
+        for runtime_id, count in counts.items():
+            payload = {
+                "space_id": self.space_id,
+                "model_id": runtime_id,
+                "window_start": window_start.isoformat() + "Z",
+                "window_end": self.aggregate_window_start.isoformat() + "Z",
+                "pass_sample_rate": self.pass_sample_rate,
+                "counts": {"passed_sampled_out": count}
+            }
+            
+            try:
+                response = await self._post("aggregates", "/api/v1/evaluations/aggregates", json=payload)
+                if response.status_code not in [200, 201, 202]:
+                    logger.error(
+                        f"Failed to send pass aggregates to Arize (status {response.status_code}): "
+                        f"{response.text}"
+                    )
+            except Exception as e:
+                logger.error(f"Error sending pass aggregates to Arize: {str(e)}")
+    
+    async def _post(self, endpoint: str, path: str, **kwargs) -> httpx.Response:
+        """
+        POST to the Arize API, recording latency and failures per endpoint.
+        
+        Args:
+            endpoint: Metrics label (evaluation, batch, alert, aggregates)
+            path: API path
+            **kwargs: httpx request arguments
+        """
+        started = time.perf_counter()
+        try:
+            response = await self.client.post(path, **kwargs)
+        except Exception:
+            ARIZE_ERRORS.labels(endpoint).inc()
+            raise
+        finally:
+            ARIZE_REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - started)
+        
+        if response.status_code not in (200, 201, 202):
+            ARIZE_ERRORS.labels(endpoint).inc()
+        return response
+    
+    @staticmethod
+    def _truncate(text: Optional[str], max_chars: Optional[int]) -> str:
+        """Cap text length for export (None = no cap)"""
+        text = text or ""
+        if max_chars is not None and len(text) > max_chars:
+            return text[:max_chars]
+        return text
+    
+    def _enqueue_record(self, trace_id: str, payload: Dict[str, Any]) -> bool:
+        """
+        Queue a serialized evaluation record for the background batch sender.
+        
+        Args:
+            trace_id: Trace identifier
+            payload: Arize evaluation payload
+            
+        Returns:
+            True if queued, False if the queue is full and the record was dropped
+        """
+        if self.batch_task is None:
+            self.batch_task = asyncio.create_task(self._batch_loop())
+        
+        try:
+            self.batch_queue.put_nowait(json.dumps(payload, default=str).encode("utf-8"))
+            return True
+        except asyncio.QueueFull:
+            self.batch_stats["records_dropped"] += 1
+            logger.warning(f"Arize batch queue full, dropping evaluation for trace {trace_id}")
+            return False
+    
+    async def _batch_loop(self):
+        """Coalesce queued records into batches bounded by count, size and flush interval"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        
+        while not stopping:
+            record = await self.batch_queue.get()
+            if record is None:  # Sentinel from close()
+                break
+            
+            batch, batch_bytes = [record], len(record)
+            deadline = loop.time() + self.batch_flush_interval
+            
+            while len(batch) < self.batch_max_records:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                
+                try:
+                    record = await asyncio.wait_for(self.batch_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                
+                if record is None:
+                    stopping = True
+                    break
+                
+                if batch_bytes + len(record) > self.batch_max_bytes:
+                    await self._send_batch(batch)
+                    batch, batch_bytes = [], 0
+                
+                batch.append(record)
+                batch_bytes += len(record)
+            
+            await self._send_batch(batch)
+    
+    async def _send_batch(self, records: List[bytes]) -> bool:
+        """
+        Send serialized records as one multi-record payload.
+        
+        Args:
+            records: JSON-encoded evaluation payloads
+            
+        Returns:
+            True if the batch was accepted
+        """
+        if not records:
+            return True
+        
+        body = (
+            b'{"space_id":' + json.dumps(self.space_id).encode("utf-8")
+            + b',"records":[' + b",".join(records) + b"]}"
+        )
+        headers = {}
+        if self.batch_gzip:
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        
+        self.batch_stats["batches"] += 1
+        
+        try:
+            response = await self._post("batch", "/api/v1/evaluations/batch", content=body, headers=headers)
+            
+            if response.status_code in [200, 201, 202]:
+                self.batch_stats["records_sent"] += len(records)
+                logger.debug(f"Exported batch of {len(records)} evaluations to Arize")
+                return True
+            
+            logger.error(
+                f"Failed to export batch of {len(records)} evaluations to Arize "
+                f"(status {response.status_code}): {response.text}"
+            )
+        
+        except Exception as e:
+            logger.error(f"Error exporting batch to Arize: {str(e)}")
+        
+        self.batch_stats["records_failed"] += len(records)
+        return False
+    
+    def get_batch_stats(self) -> Dict[str, Any]:
+        """
+        Get background batching statistics.
+        
+        Returns:
+            Dictionary with queue depth and batch/record counters
+        """
+        return {"queue_depth": self.batch_queue.qsize(), **self.batch_stats}
+    
     def _build_arize_payload(
         self,
         trace_id: str,
@@ -154,6 +414,14 @@ class ArizeExporter:
             "version": "1.0"
         }
         
+        # Passed traces are sampled; the rate is informational (counts come from the aggregates)
+        is_passed = (
+            not evaluation_result.get("breached_status")
+            and evaluation_result.get("overall_status") == "passed"
+        )
+        sample_rate = self.pass_sample_rate if is_passed and self.pass_sample_rate < 1.0 else 1.0
+        tags["sample_rate"] = str(sample_rate)
+        
         # Add breach details as tags if present
         breach_details = evaluation_result.get("breach_details")
         if breach_details:
@@ -188,8 +456,8 @@ class ArizeExporter:
             
             # Prediction data (what the agent did)
             "prediction": {
-                "prompt": user_prompt or "",
-                "response": model_response or "",
+                "prompt": self._truncate(user_prompt, self.max_prompt_chars),
+                "response": self._truncate(model_response, self.max_response_chars),
                 "metadata": metadata
             },
             
@@ -221,11 +489,14 @@ class ArizeExporter:
         """
         Export multiple evaluation results in batch.
         
+        With batch_enabled, records are queued for the background sender and
+        counted as successful once queued.
+        
         Args:
             evaluation_results: List of evaluation result dictionaries
             
         Returns:
-            Dictionary with success and failure counts
+            Dictionary with success, failure and skipped (sampled out) counts
         """
         if not self.enabled:
             return {"success": 0, "failed": 0, "skipped": len(evaluation_results)}
@@ -251,10 +522,12 @@ class ArizeExporter:
         tasks = [export_one(eval_data) for eval_data in evaluation_results]
         task_results = await asyncio.gather(*tasks, return_exceptions=True)
         
-        # Count successes and failures
+        # Count successes, failures and sampled-out traces
         for result in task_results:
             if isinstance(result, Exception):
                 results["failed"] += 1
+            elif result is None:
+                results["skipped"] += 1
             elif result:
                 results["success"] += 1
             else:
@@ -262,7 +535,7 @@ class ArizeExporter:
         
         logger.info(
             f"Batch export complete: {results['success']} succeeded, "
-            f"{results['failed']} failed"
+            f"{results['failed']} failed, {results['skipped']} sampled out"
         )
         
         return results
@@ -300,10 +573,7 @@ class ArizeExporter:
                 "metadata": breach_details
             }
             
-            response = await self.client.post(
-                "/api/v1/alerts",
-                json=alert_payload
-            )
+            response = await self._post("alert", "/api/v1/alerts", json=alert_payload)
             
             if response.status_code in [200, 201, 202]:
                 logger.info(f"Breach alert sent to Arize for trace {trace_id}")
@@ -317,7 +587,25 @@ class ArizeExporter:
             return False
     
     async def close(self):
-        """Close HTTP client."""
+        """Flush queued records and aggregates and close HTTP client."""
+        if self.aggregate_task:
+            self.aggregate_task.cancel()
+            try:
+                await self.aggregate_task
+            except asyncio.CancelledError:
+                pass
+        
+        if self.sampled_out_counts and self.client:
+            await self._send_aggregates()
+        
+        if self.batch_task:
+            await self.batch_queue.put(None)
+            try:
+                await asyncio.wait_for(self.batch_task, timeout=30.0)
+            except asyncio.TimeoutError:
+                logger.warning("Timed out flushing Arize batch queue")
+                self.batch_task.cancel()
+        
         if self.client:
             await self.client.aclose()
             logger.info("ArizeExporter closed")
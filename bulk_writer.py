@@ -0,0 +1,174 @@
+"""
+Bulk writer - write-behind batching of TaskRegistry upserts into unordered bulk writes.
+"""
+
+import asyncio
+import itertools
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from pymongo.write_concern import WriteConcern
+
+logger = logging.getLogger(__name__)
+
+
+class TaskRegistryBulkWriter:
+    """
+    Collects TaskRegistry upserts and writes them with bulk_write(ordered=False).
+    
+    - Group commit: an upsert arriving while no bulk write is in flight is written
+      immediately; upserts arriving during a write are collected and written
+      together as soon as it finishes (up to batch_size per bulk write), so
+      batches grow with load and an idle writer adds no latency
+    - Each caller awaits the outcome of its own upsert, so failures are still
+      reported per trace
+    - Repeated upserts of one trace_id within a batch are coalesced (last wins)
+    - Ensures an index on trace_id at startup so the upsert filter is indexed
+    """
+    
+    def __init__(self, collection, bulk_write_config: Dict[str, Any]):
+        """
+        Initialize bulk writer.
+        
+        Args:
+            collection: TaskRegistry collection (Motor)
+            bulk_write_config: Batching configuration (enabled, batch_size, write_concern,
+                ensure_trace_id_index, unique_trace_id_index)
+        """
+        self.enabled = bulk_write_config.get("enabled", True)
+        self.batch_size = bulk_write_config.get("batch_size", 500)
+        self.ensure_index = bulk_write_config.get("ensure_trace_id_index", True)
+        self.unique_index = bulk_write_config.get("unique_trace_id_index", True)
+        
+        # e.g. {"w": 1, "j": false} or {"w": "majority", "wtimeout": 5000}
+        write_concern = bulk_write_config.get("write_concern")
+        if write_concern:
+            collection = collection.with_options(write_concern=WriteConcern(**write_concern))
+        self.collection = collection
+        
+        # trace_id -> (record, futures of callers waiting for that trace)
+        self.pending: Dict[str, Tuple[Dict[str, Any], List[asyncio.Future]]] = {}
+        # One bulk write in flight at a time, so upserts of a trace are applied in order
+        self.flush_lock = asyncio.Lock()
+        self.flush_task: Optional[asyncio.Task] = None
+        self.started = False
+        
+        self.stats = {"batches": 0, "upserts": 0, "errors": 0}
+    
+    async def start(self):
+        """Ensure the trace_id index"""
+        if self.started:
+            return
+        self.started = True
+        
+        if self.ensure_index:
+            try:
+                # create_index is idempotent if the index already exists with the same options
+                await self.collection.create_index("trace_id", unique=self.unique_index)
+                logger.info(f"Ensured index on TaskRegistry.trace_id (unique: {self.unique_index})")
+            except OperationFailure as e:
+                logger.error(f"Failed to ensure index on TaskRegistry.trace_id: {e}")
+    
+    async def upsert(self, trace_id: str, record: Dict[str, Any]) -> Optional[str]:
+        """
+        Upsert a TaskRegistry record by trace_id.
+        
+        Args:
+            trace_id: Trace identifier
+            record: Document fields to $set
+            
+        Returns:
+            Upserted document ID if a new document was inserted, otherwise None
+            
+        Raises:
+            Exception: If the write for this trace failed
+        """
+        await self.start()
+        
+        if not self.enabled:
+            result = await self.collection.update_one(
+                {"trace_id": trace_id},
+                {"$set": record},
+                upsert=True
+            )
+            return str(result.upserted_id) if result.upserted_id else None
+        
+        future = asyncio.get_running_loop().create_future()
+        
+        if trace_id in self.pending:
+            self.pending[trace_id][1].append(future)
+            self.pending[trace_id] = (record, self.pending[trace_id][1])
+        else:
+            self.pending[trace_id] = (record, [future])
+        
+        # Written by its own task, so a cancelled caller cannot strand other callers' upserts
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self.flush())
+        
+        return await future
+    
+    async def flush(self):
+        """Write pending upserts until none are left, batch_size per bulk write"""
+        async with self.flush_lock:
+            while self.pending:
+                await self._write_batch()
+    
+    async def _write_batch(self):
+        """Write up to batch_size pending upserts in one unordered bulk write"""
+        batch = list(itertools.islice(self.pending.items(), self.batch_size))
+        for trace_id, _ in batch:
+            del self.pending[trace_id]
+        
+        operations = [
+            UpdateOne({"trace_id": trace_id}, {"$set": record}, upsert=True)
+            for trace_id, (record, _) in batch
+        ]
+        
+        failed: Dict[int, str] = {}
+        upserted: Dict[int, Any] = {}
+        
+        try:
+            result = await self.collection.bulk_write(operations, ordered=False)
+            upserted = result.upserted_ids or {}
+        
+        except BulkWriteError as e:
+            # Unordered: every operation was attempted, only some failed
+            for error in e.details.get("writeErrors", []):
+                failed[error["index"]] = error.get("errmsg", "write error")
+            for item in e.details.get("upserted", []):
+                upserted[item["index"]] = item["_id"]
+            
+            if e.details.get("writeConcernErrors"):
+                message = f"Write concern error: {e.details['writeConcernErrors']}"
+                failed.update({index: message for index in range(len(batch)) if index not in failed})
+        
+        except Exception as e:
+            logger.error(f"Bulk write of {len(batch)} TaskRegistry upserts failed: {e}")
+            failed = {index: str(e) for index in range(len(batch))}
+        
+        self.stats["batches"] += 1
+        self.stats["upserts"] += len(batch) - len(failed)
+        self.stats["errors"] += len(failed)
+        
+        for index, (trace_id, (_, futures)) in enumerate(batch):
+            for future in futures:
+                if future.done():
+                    continue
+                if index in failed:
+                    future.set_exception(
+                        Exception(f"TaskRegistry upsert failed for trace {trace_id}: {failed[index]}")
+                    )
+                else:
+                    upserted_id = upserted.get(index)
+                    future.set_result(str(upserted_id) if upserted_id else None)
+        
+        logger.debug(f"Flushed {len(batch)} TaskRegistry upserts ({len(failed)} failed)")
+    
+    async def close(self):
+        """Write remaining upserts"""
+        if self.flush_task:
+            await asyncio.gather(self.flush_task, return_exceptions=True)
+        
+        await self.flush()
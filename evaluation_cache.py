@@ -0,0 +1,230 @@
+"""
+Evaluation cache - reuse guardrail results for traces that were already evaluated.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+class EvaluationCache:
+    """
+    Evaluation results keyed by trace content hash.
+    
+    Opt-in: create_trace_pipeline only wraps the pipeline when
+    evaluation_cache.enabled is true.
+    
+    - Bounded in-memory LRU (max_entries) in front of a MongoDB collection, so
+      results survive restarts and are shared between replicas and processors
+    - The content hash covers the parsed trace and the guardrail config version,
+      so a config change never serves stale results
+    - Persistent entries expire after ttl_seconds (TTL index on created_at)
+    """
+    
+    def __init__(self, collection, cache_config: Dict[str, Any]):
+        """
+        Initialize evaluation cache.
+        
+        Args:
+            collection: evaluation_cache collection (Motor), or None for memory only
+            cache_config: Cache configuration (max_entries, ttl_seconds)
+        """
+        self.collection = collection
+        self.max_entries = cache_config.get("max_entries", 10000)
+        self.ttl_seconds = cache_config.get("ttl_seconds", 7 * 24 * 3600)
+        
+        # content_hash -> result (evaluation_result, user_prompt, model_response)
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.index_ready = False
+        
+        self.stats = {"memory_hits": 0, "mongo_hits": 0, "misses": 0, "errors": 0}
+    
+    async def get(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result.
+        
+        Args:
+            content_hash: Trace content hash
+            
+        Returns:
+            Cached result, or None on a miss
+        """
+        result = self.entries.get(content_hash)
+        if result is not None:
+            self.entries.move_to_end(content_hash)
+            self.stats["memory_hits"] += 1
+            return result
+        
+        if self.collection is not None:
+            try:
+                doc = await self.collection.find_one({"_id": content_hash}, {"result": 1})
+            except Exception as e:
+                # Cache is best effort - evaluate instead
+                self.stats["errors"] += 1
+                logger.error(f"Failed to read evaluation cache: {e}")
+                doc = None
+            
+            if doc is not None:
+                self.stats["mongo_hits"] += 1
+                self._remember(content_hash, doc["result"])
+                return doc["result"]
+        
+        self.stats["misses"] += 1
+        return None
+    
+    async def put(self, content_hash: str, result: Dict[str, Any]):
+        """
+        Store a result.
+        
+        Args:
+            content_hash: Trace content hash
+            result: evaluation_result, user_prompt and model_response
+        """
+        self._remember(content_hash, result)
+        
+        if self.collection is None:
+            return
+        
+        try:
+            await self._ensure_index()
+            await self.collection.update_one(
+                {"_id": content_hash},
+                {"$set": {"result": result, "created_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Failed to write evaluation cache: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+        
+        Returns:
+            Dictionary with hit/miss counters and current size
+        """
+        return {**self.stats, "entries": len(self.entries), "max_entries": self.max_entries}
+    
+    def _remember(self, content_hash: str, result: Dict[str, Any]):
+        """Add to the LRU, evicting the least recently used entries over max_entries"""
+        self.entries[content_hash] = result
+        self.entries.move_to_end(content_hash)
+        
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+    
+    async def _ensure_index(self):
+        """Create the TTL index on first write"""
+        if self.index_ready or not self.ttl_seconds:
+            return
+        self.index_ready = True
+        
+        try:
+            await self.collection.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+        except OperationFailure as e:
+            logger.error(f"Failed to ensure TTL index on evaluation cache: {e}")
+
+
+class CachedTracePipeline:
+    """
+    Wraps TracePipeline or ShardedTracePipeline with an EvaluationCache.
+    
+    Traces are prepared (parsed, content hashed) by the wrapped pipeline; only
+    cache misses are evaluated. Concurrent evaluations of the same content share
+    one evaluation. Results carry cached=True when they were not re-evaluated.
+    Same interface as TracePipeline.
+    """
+    
+    def __init__(self, pipeline, cache: EvaluationCache):
+        """
+        Initialize cached pipeline.
+        
+        Args:
+            pipeline: TracePipeline or ShardedTracePipeline
+            cache: Evaluation cache
+        """
+        self.pipeline = pipeline
+        self.cache = cache
+        
+        # content_hash -> evaluation in progress
+        self.in_flight: Dict[str, asyncio.Future] = {}
+    
+    async def evaluate_json_spans(self, trace_id: str, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """See TracePipeline.evaluate_json_spans"""
+        prepared = await self.pipeline.prepare_json_spans(trace_id, spans)
+        return await self.evaluate_prepared(trace_id, prepared)
+    
+    async def evaluate_csv_rows(self, trace_id: str, trace_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """See TracePipeline.evaluate_csv_rows"""
+        prepared = await self.pipeline.prepare_csv_rows(trace_id, trace_data)
+        return await self.evaluate_prepared(trace_id, prepared)
+    
+    async def prepare_json_spans(self, trace_id: str, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """See TracePipeline.prepare_json_spans"""
+        return await self.pipeline.prepare_json_spans(trace_id, spans)
+    
+    async def prepare_csv_rows(self, trace_id: str, trace_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """See TracePipeline.prepare_csv_rows"""
+        return await self.pipeline.prepare_csv_rows(trace_id, trace_data)
+    
+    async def evaluate_prepared(self, trace_id: str, prepared: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Evaluate a prepared trace, or reuse the cached result for its content hash.
+        
+        Returns:
+            Dictionary with evaluation_result, user_prompt, model_response,
+            content_hash, cached and timings
+        """
+        content_hash = prepared["content_hash"]
+        timings = prepared.get("timings") or {}
+        
+        cached = await self.cache.get(content_hash)
+        if cached is not None:
+            return {**cached, "content_hash": content_hash, "cached": True, "timings": timings}
+        
+        if content_hash in self.in_flight:
+            result = await asyncio.shield(self.in_flight[content_hash])
+            return {**result, "content_hash": content_hash, "cached": True, "timings": timings}
+        
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[content_hash] = future
+        
+        try:
+            result = await self.pipeline.evaluate_prepared(trace_id, prepared)
+            cacheable = {
+                "evaluation_result": result["evaluation_result"],
+                "user_prompt": result["user_prompt"],
+                "model_response": result["model_response"]
+            }
+            future.set_result(cacheable)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters get the error; don't warn about it if nobody waited
+            future.exception()
+            raise
+        finally:
+            del self.in_flight[content_hash]
+        
+        await self.cache.put(content_hash, cacheable)
+        return {**cacheable, "content_hash": content_hash, "cached": False, "timings": result.get("timings")}
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """See EvaluationCache.get_stats"""
+        return self.cache.get_stats()
+    
+    def get_memo_stats(self) -> Dict[str, Dict[str, Any]]:
+        """See TracePipeline.get_memo_stats"""
+        return self.pipeline.get_memo_stats()
+    
+    async def close(self):
+        """Release pipeline resources"""
+        await self.pipeline.close()
@@ -0,0 +1,126 @@
+"""
+Export checkpoint - tracks progress through an HPOS export so processing can resume.
+"""
+
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+
+class ExportCheckpoint:
+    """
+    Progress of one export as a watermark over the order traces are read in.
+    
+    Each trace gets a sequence number when it is read. Traces finish out of order
+    (they are evaluated concurrently), so the watermark is the lowest sequence
+    number still in flight: every trace below it is saved. On resume, the first
+    trace_watermark traces are skipped without being evaluated; this relies on
+    the export being read in the same order, which trace_order records.
+    
+    processed_count/failed_count only cover traces below the watermark, so traces
+    redone after a resume are not counted twice.
+    """
+    
+    def __init__(
+        self,
+        saved: Optional[Dict[str, Any]],
+        trace_order: str,
+        interval_traces: int = 1000,
+        interval_seconds: float = 30
+    ):
+        """
+        Initialize checkpoint.
+        
+        Args:
+            saved: Checkpoint stored on the TraceExports document, if any
+            trace_order: Order traces are read in (see TraceExportReader.trace_order)
+            interval_traces: Save after this many traces finished
+            interval_seconds: Save after this many seconds
+        """
+        saved = saved or {}
+        if saved.get("trace_order") != trace_order:
+            # Read order changed (or no checkpoint): the watermark is meaningless
+            saved = {}
+        
+        self.trace_order = trace_order
+        self.interval_traces = interval_traces
+        self.interval_seconds = interval_seconds
+        
+        self.resume_watermark = saved.get("trace_watermark", 0)
+        self.watermark = self.resume_watermark
+        self.processed = saved.get("processed_count", 0)
+        self.failed = saved.get("failed_count", 0)
+        
+        self.next_seq = 0
+        self.in_flight: Set[int] = set()
+        
+        # Finished traces at or above the watermark: seq -> succeeded
+        self.finished: Dict[int, bool] = {}
+        
+        self.finished_since_save = 0
+        self.saved_at = time.monotonic()
+    
+    @property
+    def resumed(self) -> bool:
+        """Whether a previous attempt's watermark is being resumed from"""
+        return self.resume_watermark > 0
+    
+    def skip_done(self, batch: List[Tuple[str, Any]]) -> List[Tuple[str, Any]]:
+        """
+        Drop traces of a batch that were done before the resume watermark.
+        
+        Args:
+            batch: (trace_id, trace_data) pairs in read order
+            
+        Returns:
+            Remaining pairs, each to be passed to begin() in order
+        """
+        skip = min(max(self.resume_watermark - self.next_seq, 0), len(batch))
+        self.next_seq += skip
+        return batch[skip:]
+    
+    def begin(self) -> int:
+        """Assign the next trace its sequence number and mark it in flight"""
+        seq = self.next_seq
+        self.next_seq += 1
+        self.in_flight.add(seq)
+        return seq
+    
+    def finish(self, seq: int, succeeded: bool):
+        """Mark a trace as saved (or failed)"""
+        self.in_flight.discard(seq)
+        self.finished[seq] = succeeded
+        self.finished_since_save += 1
+    
+    def due(self) -> bool:
+        """Whether a checkpoint should be saved now"""
+        return (
+            self.finished_since_save >= self.interval_traces
+            or time.monotonic() - self.saved_at >= self.interval_seconds
+        )
+    
+    def advance(self) -> Dict[str, Any]:
+        """
+        Move the watermark up to the lowest trace in flight.
+        
+        Returns:
+            Checkpoint document to store on the TraceExports document
+        """
+        self.watermark = min(self.in_flight) if self.in_flight else self.next_seq
+        
+        for seq in [seq for seq in self.finished if seq < self.watermark]:
+            if self.finished.pop(seq):
+                self.processed += 1
+            else:
+                self.failed += 1
+        
+        self.finished_since_save = 0
+        self.saved_at = time.monotonic()
+        
+        return {
+            "trace_watermark": self.watermark,
+            "trace_order": self.trace_order,
+            "processed_count": self.processed,
+            "failed_count": self.failed,
+            "updated_at": datetime.utcnow()
+        }
@@ -0,0 +1,176 @@
+"""
+Goal cache - cached and batched goal inference shared by the Redis and HPOS paths.
+"""
+
+import asyncio
+import logging
+import re
+from collections import OrderedDict
+from typing import Dict, Any, FrozenSet, List, Optional, Tuple
+
+from guardrails_eval.utils.goal_inference import GoalInference
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+GoalKey = Tuple[str, FrozenSet[str]]
+
+
+def goal_key(user_prompt: Optional[str], tool_calls: List[Dict[str, Any]]) -> GoalKey:
+    """Cache key: normalized prompt (case and whitespace folded) and the set of tool names"""
+    prompt = _WHITESPACE.sub(" ", (user_prompt or "").strip()).casefold()
+    return prompt, frozenset(call.get("tool_name") or "" for call in tool_calls)
+
+
+class CachedGoalInference:
+    """
+    GoalInference with an LRU cache and a batch API.
+    
+    - The inferred goal is assumed to depend only on the user prompt and the set
+      of tools called, so traces from the same prompt template share one inference
+    - infer_goals() takes many traces at once and infers each distinct key once;
+      it uses GoalInference.infer_goals when available
+    - infer() batches concurrent callers on the event loop: requests made in the
+      same loop iteration are inferred together
+    """
+    
+    def __init__(self, goal_inference: GoalInference, goal_config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize cached goal inference.
+        
+        Args:
+            goal_inference: Underlying GoalInference
+            goal_config: Cache configuration (goal_cache_max_entries)
+        """
+        goal_config = goal_config or {}
+        self.goal_inference = goal_inference
+        self.max_entries = goal_config.get("goal_cache_max_entries", 10000)
+        
+        self.cache: "OrderedDict[GoalKey, Any]" = OrderedDict()
+        self.pending: List[Tuple[GoalKey, Dict[str, Any], asyncio.Future]] = []
+        
+        self.stats = {"hits": 0, "misses": 0, "batches": 0}
+    
+    def infer_goal(
+        self,
+        user_prompt: str,
+        tool_calls: List[Dict[str, Any]],
+        llm_spans: Optional[List[Any]] = None
+    ) -> Any:
+        """Same as GoalInference.infer_goal, cached"""
+        return self.infer_goals([{
+            "user_prompt": user_prompt,
+            "tool_calls": tool_calls,
+            "llm_spans": llm_spans or []
+        }])[0]
+    
+    def infer_goals(self, requests: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Infer goals for many traces.
+        
+        Args:
+            requests: Dictionaries with user_prompt, tool_calls and llm_spans
+            
+        Returns:
+            Inferred goal per request, in order
+        """
+        keys = [goal_key(request["user_prompt"], request["tool_calls"]) for request in requests]
+        
+        # First request per uncached key is inferred; the rest reuse its goal
+        goals: Dict[GoalKey, Any] = {}
+        misses: Dict[GoalKey, Dict[str, Any]] = {}
+        for key, request in zip(keys, requests):
+            if key in goals or key in misses:
+                self.stats["hits"] += 1
+            elif key in self.cache:
+                self.cache.move_to_end(key)
+                goals[key] = self.cache[key]
+                self.stats["hits"] += 1
+            else:
+                misses[key] = request
+                self.stats["misses"] += 1
+        
+        if misses:
+            self.stats["batches"] += 1
+            for key, goal in zip(misses, self._infer_uncached(list(misses.values()))):
+                goals[key] = goal
+                self._remember(key, goal)
+        
+        return [goals[key] for key in keys]
+    
+    async def infer(
+        self,
+        user_prompt: str,
+        tool_calls: List[Dict[str, Any]],
+        llm_spans: Optional[List[Any]] = None
+    ) -> Any:
+        """
+        Infer a goal, batched with other callers in the same event loop iteration.
+        
+        Cache hits return without waiting.
+        """
+        key = goal_key(user_prompt, tool_calls)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.stats["hits"] += 1
+            return self.cache[key]
+        
+        future = asyncio.get_running_loop().create_future()
+        if not self.pending:
+            asyncio.get_running_loop().call_soon(self._flush)
+        self.pending.append((key, {
+            "user_prompt": user_prompt,
+            "tool_calls": tool_calls,
+            "llm_spans": llm_spans or []
+        }, future))
+        
+        return await future
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+        
+        Returns:
+            Dictionary with hit/miss/batch counters and current size
+        """
+        return {**self.stats, "entries": len(self.cache)}
+    
+    def _flush(self):
+        """Infer all pending requests as one batch"""
+        pending, self.pending = self.pending, []
+        
+        try:
+            goals = self.infer_goals([request for _, request, _ in pending])
+        except Exception as e:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, _, future), goal in zip(pending, goals):
+            if not future.done():
+                future.set_result(goal)
+    
+    def _infer_uncached(self, requests: List[Dict[str, Any]]) -> List[Any]:
+        """Run the underlying inference, in one batch call if supported"""
+        infer_goals = getattr(self.goal_inference, "infer_goals", None)
+        if infer_goals is not None:
+            return infer_goals(requests)
+        
+        return [
+            self.goal_inference.infer_goal(
+                user_prompt=request["user_prompt"] or "",
+                tool_calls=request["tool_calls"],
+                llm_spans=request["llm_spans"]
+            )
+            for request in requests
+        ]
+    
+    def _remember(self, key: GoalKey, goal: Any):
+        """Add to the LRU, evicting the least recently used entries over max_entries"""
+        self.cache[key] = goal
+        self.cache.move_to_end(key)
+        
+        while len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
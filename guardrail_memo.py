@@ -0,0 +1,386 @@
+"""
+Guardrail memoization - reuse a guardrail's result when the inputs it reads repeat.
+"""
+
+import functools
+import hashlib
+import importlib
+import inspect
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_path(value: Any, path: str) -> Any:
+    """
+    Read a dotted path out of a parsed trace.
+    
+    Segments are dict keys, list indices (negative allowed) or "*" to map the rest
+    of the path over a list, e.g. "user_prompt", "llm_spans.-1.output",
+    "tool_spans.*.tool_name". Missing segments resolve to None.
+    
+    Args:
+        value: Parsed trace (or any nested dict/list)
+        path: Dotted path
+    """
+    segments = path.split(".")
+    
+    for i, segment in enumerate(segments):
+        if value is None:
+            return None
+        
+        if segment == "*":
+            if not isinstance(value, (list, tuple)):
+                return None
+            rest = ".".join(segments[i + 1:])
+            return [resolve_path(item, rest) if rest else item for item in value]
+        
+        if isinstance(value, dict):
+            value = value.get(segment)
+        elif isinstance(value, (list, tuple)):
+            try:
+                value = value[int(segment)]
+            except (ValueError, IndexError):
+                return None
+        else:
+            value = getattr(value, segment, None)
+    
+    return value
+
+
+class GuardrailMemo:
+    """
+    Memoizes one guardrail's evaluate() on the trace fields it reads.
+    
+    - Key: hash of the guardrail name, its config and the configured input paths
+      resolved against the trace - the guardrail must read nothing else
+    - In-memory LRU with TTL (max_entries, ttl_seconds)
+    - Optional persistent tier (MongoDB) for expensive checks such as LLM judges,
+      shared across restarts, shard processes and replicas
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        guardrail_config: Any,
+        memo_config: Dict[str, Any],
+        store: Optional["MongoMemoStore"] = None
+    ):
+        """
+        Initialize guardrail memo.
+        
+        Args:
+            name: Guardrail name
+            guardrail_config: Guardrail's own configuration (part of the key)
+            memo_config: Memo configuration (inputs, max_entries, ttl_seconds, persistent)
+            store: Persistent tier, used if memo_config has persistent: true
+        """
+        self.name = name
+        self.inputs: List[str] = memo_config["inputs"]
+        self.max_entries = memo_config.get("max_entries", 10000)
+        self.ttl_seconds = memo_config.get("ttl_seconds", 3600)
+        self.store = store if memo_config.get("persistent", False) else None
+        self.config_hash = hashlib.blake2b(
+            json.dumps(guardrail_config, sort_keys=True, default=str).encode("utf-8"),
+            digest_size=16
+        ).hexdigest()
+        
+        # key -> (expires_at, result)
+        self.entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        
+        self.stats = {
+            "hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evicted": 0
+        }
+        
+        # Called with (name, outcome) per lookup: "hit", "persistent_hit" or "miss"
+        self.on_lookup: Optional[Callable[[str, str], None]] = None
+    
+    def _count(self, outcome: str):
+        """Count a lookup outcome and report it to on_lookup"""
+        self.stats[f"{outcome}s"] += 1
+        if self.on_lookup is not None:
+            self.on_lookup(self.name, outcome)
+    
+    def key(self, trace: Any) -> str:
+        """Hash of the guardrail's inputs from this trace"""
+        inputs = [resolve_path(trace, path) for path in self.inputs]
+        encoded = json.dumps([self.name, self.config_hash, inputs], sort_keys=True, default=str)
+        return hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).hexdigest()
+    
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Look up the in-memory tier.
+        
+        Returns:
+            (found, result)
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return False, None
+        
+        expires_at, result = entry
+        if time.monotonic() >= expires_at:
+            del self.entries[key]
+            self.stats["expired"] += 1
+            return False, None
+        
+        self.entries.move_to_end(key)
+        return True, result
+    
+    def put(self, key: str, result: Any):
+        """Store in the in-memory tier, evicting least recently used entries"""
+        self.entries[key] = (time.monotonic() + self.ttl_seconds, result)
+        self.entries.move_to_end(key)
+        
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats["evicted"] += 1
+    
+    def wrap(self, evaluate):
+        """
+        Memoize a guardrail's evaluate method.
+        
+        The trace is taken from the "trace" keyword or the first positional argument.
+        Exceptions are not memoized. Synchronous methods use the in-memory tier only.
+        """
+        def trace_of(args, kwargs):
+            return kwargs["trace"] if "trace" in kwargs else (args[0] if args else None)
+        
+        if not inspect.iscoroutinefunction(evaluate):
+            @functools.wraps(evaluate)
+            def memoized_sync(*args, **kwargs):
+                key = self.key(trace_of(args, kwargs))
+                found, result = self.get(key)
+                if found:
+                    self._count("hit")
+                    return result
+                
+                self._count("miss")
+                result = evaluate(*args, **kwargs)
+                self.put(key, result)
+                return result
+            
+            return memoized_sync
+        
+        @functools.wraps(evaluate)
+        async def memoized(*args, **kwargs):
+            key = self.key(trace_of(args, kwargs))
+            found, result = self.get(key)
+            if found:
+                self._count("hit")
+                return result
+            
+            if self.store is not None:
+                found, result = await self.store.get(self.name, key)
+                if found:
+                    self._count("persistent_hit")
+                    self.put(key, result)
+                    return result
+            
+            self._count("miss")
+            result = await evaluate(*args, **kwargs)
+            self.put(key, result)
+            
+            if self.store is not None:
+                await self.store.put(self.name, key, result, self.ttl_seconds)
+            return result
+        
+        return memoized
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get memo statistics.
+        
+        Returns:
+            Dictionary with hit/miss/eviction counters and current size
+        """
+        return {**self.stats, "entries": len(self.entries)}
+
+
+class MongoMemoStore:
+    """
+    Persistent memo tier in a MongoDB collection.
+    
+    Results are stored as plain documents: pydantic results as model_dump() plus
+    their class path, anything else as-is, so it must be BSON-serializable. On
+    read, only known classes are rebuilt with model_validate - those this process
+    stored and those listed in result_types - never a class path taken from the
+    document alone; other results are returned as the stored dict. Entries expire through a TTL index on
+    expires_at. Errors are logged and treated as misses - the guardrail is
+    evaluated instead.
+    """
+    
+    def __init__(self, memo_config: Dict[str, Any]):
+        """
+        Initialize store.
+        
+        Args:
+            memo_config: guardrail_memo configuration (mongodb_uri, database, collection,
+                result_types: "module:QualName" result classes allowed on read)
+        """
+        self.mongodb_uri = memo_config["mongodb_uri"]
+        self.allowed_result_types = set(memo_config.get("result_types", []))
+        self.result_classes: Dict[str, type] = {}  # class path -> result class
+        self.database_name = memo_config["database"]
+        self.collection_name = memo_config.get("collection", "guardrail_memo")
+        self.collection = None
+        self.index_ready = False
+        self.errors = 0
+    
+    def _collection(self):
+        """Collection on the shared client, connected on first use (in the running process)"""
+        if self.collection is None:
+            from guardrails_eval.utils.mongodb_client import get_mongo_client
+            
+            client = get_mongo_client(self.mongodb_uri)
+            self.collection = client[self.database_name][self.collection_name]
+        return self.collection
+    
+    def _encode(self, result: Any) -> Tuple[Any, Optional[str]]:
+        """(document value, result class path) for a result; remembers the class for reads"""
+        if hasattr(result, "model_dump"):
+            result_class = type(result)
+            result_type = f"{result_class.__module__}:{result_class.__qualname__}"
+            self.result_classes[result_type] = result_class
+            return result.model_dump(mode="json"), result_type
+        return result, None
+    
+    def _decode(self, value: Any, result_type: Optional[str]) -> Any:
+        """Rebuild a stored result of a known class; otherwise the plain document"""
+        if not result_type:
+            return value
+        
+        result_class = self.result_classes.get(result_type)
+        if result_class is None:
+            if result_type not in self.allowed_result_types:
+                return value
+            
+            module_name, _, qualname = result_type.partition(":")
+            try:
+                result_class = importlib.import_module(module_name)
+                for attr in qualname.split("."):
+                    result_class = getattr(result_class, attr)
+            except (ImportError, AttributeError):
+                logger.warning(f"Guardrail memo result type {result_type} not found, returning the stored dict")
+                return value
+            self.result_classes[result_type] = result_class
+        
+        return result_class.model_validate(value)
+    
+    async def get(self, name: str, key: str) -> Tuple[bool, Any]:
+        """
+        Look up a stored result.
+        
+        Returns:
+            (found, result)
+        """
+        try:
+            doc = await self._collection().find_one(
+                {"_id": key}, {"result": 1, "result_type": 1, "expires_at": 1}
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Failed to read guardrail memo for {name}: {e}")
+            return False, None
+        
+        # The TTL monitor only runs once a minute
+        if doc is None or doc["expires_at"] <= datetime.utcnow():
+            return False, None
+        try:
+            return True, self._decode(doc["result"], doc.get("result_type"))
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Failed to decode guardrail memo for {name}: {e}")
+            return False, None
+    
+    async def put(self, name: str, key: str, result: Any, ttl_seconds: float):
+        """Store a result until ttl_seconds from now"""
+        try:
+            collection = self._collection()
+            if not self.index_ready:
+                self.index_ready = True
+                await collection.create_index("expires_at", expireAfterSeconds=0)
+            
+            value, result_type = self._encode(result)
+            await collection.update_one(
+                {"_id": key},
+                {"$set": {
+                    "guardrail": name,
+                    "result": value,
+                    "result_type": result_type,
+                    "expires_at": datetime.utcnow() + timedelta(seconds=ttl_seconds)
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Failed to write guardrail memo for {name}: {e}")
+    
+    def close(self):
+        """Release the shared client"""
+        if self.collection is not None:
+            from guardrails_eval.utils.mongodb_client import release_mongo_client
+            
+            release_mongo_client(self.mongodb_uri)
+            self.collection = None
+
+
+def iter_guardrails(executor) -> List[Tuple[str, Any]]:
+    """(name, guardrail) pairs of an executor's guardrails (dict or list)"""
+    guardrails = getattr(executor, "guardrails", None)
+    if guardrails is None:
+        return []
+    if isinstance(guardrails, dict):
+        return list(guardrails.items())
+    return [(getattr(g, "name", type(g).__name__), g) for g in guardrails]
+
+
+def install_guardrail_memo(executor, memo_config: Optional[Dict[str, Any]]) -> Dict[str, GuardrailMemo]:
+    """
+    Memoize the executor's guardrails listed in memo_config (opt-in per guardrail).
+    
+    Args:
+        executor: GuardrailsExecutor; its guardrails attribute (dict by name or
+            list of objects with a name) provides the guardrail objects
+        memo_config: guardrail_memo configuration: enabled, guardrails (name ->
+            inputs, max_entries, ttl_seconds, persistent), and mongodb_uri/database/
+            collection for the persistent tier
+            
+    Returns:
+        Guardrail name -> GuardrailMemo, for statistics
+    """
+    memo_config = memo_config or {}
+    if not memo_config.get("enabled", False):
+        return {}
+    
+    guardrail_configs = memo_config.get("guardrails", {})
+    store = MongoMemoStore(memo_config) if memo_config.get("mongodb_uri") else None
+    memos: Dict[str, GuardrailMemo] = {}
+    
+    for name, guardrail in iter_guardrails(executor):
+        config = guardrail_configs.get(name)
+        if not config or not hasattr(guardrail, "evaluate"):
+            continue
+        
+        if config.get("persistent") and store is None:
+            logger.warning(f"Guardrail memo for {name} is persistent but no mongodb_uri is set")
+        
+        memo = GuardrailMemo(name, getattr(guardrail, "config", None), config, store)
+        guardrail.evaluate = memo.wrap(guardrail.evaluate)
+        memos[name] = memo
+    
+    missing = set(guardrail_configs) - set(memos)
+    if missing:
+        logger.warning(f"Guardrail memo configured for unknown guardrails: {sorted(missing)}")
+    
+    logger.info(f"Memoizing guardrails: {sorted(memos)}")
+    return memos
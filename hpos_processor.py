@@ -3,21 +3,37 @@ HPOS processor - batch processing of CSV trace exports from S3.
 """
 
 import asyncio
+import itertools
 import logging
-from typing import Dict, Any, List, Optional
-from datetime import datetime
+import os
+import socket
+import time
+from typing import Dict, Any, AsyncIterator, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
 import pandas as pd
 from pathlib import Path
 from io import BytesIO, StringIO
 import boto3
 from botocore.exceptions import ClientError
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure
 
 from guardrails_eval.models.mongodb_models import ProcessingStatus
-from guardrails_eval.utils.trace_parser import TraceParser
-from guardrails_eval.utils.goal_inference import GoalInference
-from guardrails_eval.executor.guardrails_executor import GuardrailsExecutor
 from guardrails_eval.processors.result_processor import ResultProcessor
-from motor.motor_asyncio import AsyncIOMotorClient
+from guardrails_eval.processors.trace_pipeline import create_trace_pipeline
+from guardrails_eval.processors.export_checkpoint import ExportCheckpoint
+from guardrails_eval.utils.mongodb_client import get_mongo_client, release_mongo_client
+from guardrails_eval.utils.trace_export_reader import TraceExportReader
+from guardrails_eval.utils.s3_stream import open_s3_stream
+from guardrails_eval.utils.metrics import (
+    HPOS_BACKLOG,
+    HPOS_EXPORTS_IN_PROGRESS,
+    STAGE_SECONDS,
+    TRACES_PROCESSED,
+    record_timings,
+    start_metrics_server,
+    stop_metrics_server
+)
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +42,19 @@ class HPOSProcessor:
     """
     Processes trace exports from HPOS (CSV files).
     Polls TraceExports collection for pending files, processes them in batches.
+    
+    Exports are claimed atomically with a worker_id and a lease that is renewed by
+    heartbeat while processing; exports whose lease expired (dead replica) are
+    reclaimed. Any number of replicas can run against the same collection.
+    
+    New exports are picked up immediately through a change stream on TraceExports
+    (PENDING inserts for this runtime_id), resumed by token after restarts. Polling
+    remains as a fallback with adaptive backoff between min_poll_interval_seconds
+    and poll_interval_seconds.
+    
+    Progress is checkpointed on the TraceExports document, so a reclaimed export
+    resumes where the previous worker stopped instead of re-evaluating (and
+    re-exporting) every trace.
     """
     
     def __init__(
@@ -34,7 +63,8 @@ class HPOSProcessor:
         mongodb_config: Dict[str, Any],
         kafka_config: Dict[str, Any],
         arize_config: Optional[Dict[str, Any]],
-        agent_card: Dict[str, Any]
+        agent_card: Dict[str, Any],
+        metrics_config: Optional[Dict[str, Any]] = None
     ):
         """
         Initialize HPOS processor.
@@ -45,15 +75,21 @@ class HPOSProcessor:
             kafka_config: Kafka configuration
             arize_config: Arize configuration (optional)
             agent_card: Agent card configuration
+            metrics_config: Prometheus endpoint configuration (optional)
         """
         self.hpos_config = hpos_config
+        self.metrics_config = metrics_config
         self.agent_card = agent_card
         self.runtime_id = agent_card.get("runtime_id")
         
-        # MongoDB connection
-        self.client = AsyncIOMotorClient(mongodb_config["uri"])
+        # MongoDB connection (shared with ResultProcessor)
+        self.mongodb_uri = mongodb_config["uri"]
+        self.client = get_mongo_client(self.mongodb_uri, mongodb_config)
         self.db = self.client[mongodb_config["database"]]
         self.trace_exports = self.db[mongodb_config.get("trace_exports_collection", "trace_exports")]
+        self.scheduler_state = self.db[
+            hpos_config.get("scheduler_state_collection", "hpos_scheduler_state")
+        ]
         
         # S3 configuration
         self.use_s3 = hpos_config.get("use_s3", True)
@@ -65,6 +101,8 @@ class HPOSProcessor:
                 region_name=hpos_config.get("aws_region", "us-east-1")
             )
             self.s3_bucket = hpos_config.get("s3_bucket")
+            self.s3_part_size = int(hpos_config.get("s3_part_size_mb", 8) * 1024 * 1024)
+            self.s3_max_concurrency = hpos_config.get("s3_max_concurrency", 8)
             logger.info(f"S3 storage enabled: bucket={self.s3_bucket}")
         else:
             # Fallback to local filesystem
@@ -72,72 +110,367 @@ class HPOSProcessor:
             logger.info(f"Local filesystem storage: directory={self.csv_directory}")
         
         # Processors
-        self.executor = GuardrailsExecutor(agent_card)
         self.result_processor = ResultProcessor(
             mongodb_uri=mongodb_config["uri"],
             database_name=mongodb_config["database"],
             kafka_config=kafka_config,
             arize_config=arize_config,
             task_registry_collection=mongodb_config.get("task_registry_collection", "TaskRegistry"),
-            trace_exports_collection=mongodb_config.get("trace_exports_collection", "trace_exports")
+            trace_exports_collection=mongodb_config.get("trace_exports_collection", "trace_exports"),
+            bulk_write_config=mongodb_config.get("bulk_write"),
+            mongodb_options=mongodb_config,
+            sink_config=hpos_config.get("result_sinks")
         )
-        
-        # Goal inference
-        self.goal_inference = GoalInference(agent_card)
+        self.pipeline = create_trace_pipeline(agent_card, hpos_config, database=self.result_processor.db)
         
         # Processing config
         self.poll_interval = hpos_config.get("poll_interval_seconds", 30)
+        self.min_poll_interval = hpos_config.get("min_poll_interval_seconds", 1)
         self.batch_size = hpos_config.get("batch_size", 10)
         
+        # Change-stream scheduling (falls back to polling if unsupported)
+        self.use_change_stream = hpos_config.get("use_change_stream", True)
+        self.work_available = asyncio.Event()
+        self.watch_task: Optional[asyncio.Task] = None
+        
+        # Streaming ingestion: read exports in chunks instead of loading them whole
+        self.csv_streaming = hpos_config.get("csv_streaming", True)
+        self.csv_sorted_by_trace_id = hpos_config.get("csv_sorted_by_trace_id", False)
+        self.export_reader = TraceExportReader(hpos_config)
+        
+        # Concurrency: exports in flight, and traces being evaluated per export
+        self.max_concurrent_exports = hpos_config.get("max_concurrent_exports", 2)
+        self.max_concurrent_traces = hpos_config.get("max_concurrent_traces", 16)
+        self.export_semaphore = asyncio.Semaphore(self.max_concurrent_exports)
+        
+        # Saves in flight per export, so upserts of many traces share one bulk write
+        self.save_window = (mongodb_config.get("bulk_write") or {}).get("batch_size", 500)
+        
+        # Lease-based claiming (multi-replica)
+        self.worker_id = hpos_config.get("worker_id") or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = hpos_config.get("lease_seconds", 300)
+        self.heartbeat_interval = hpos_config.get("lease_heartbeat_seconds", self.lease_seconds / 3)
+        # Exports claimed this many times (each crash/lease expiry is a new attempt) are marked FAILED
+        self.max_attempts = hpos_config.get("max_export_attempts", 5)
+        
+        # Checkpoints: resume reclaimed exports instead of starting over
+        self.checkpoint_interval_traces = hpos_config.get("checkpoint_interval_traces", 1000)
+        self.checkpoint_interval_seconds = hpos_config.get("checkpoint_interval_seconds", 30)
+        
         # State
         self.running = False
         self.poll_task: Optional[asyncio.Task] = None
+        self.export_tasks: Set[asyncio.Task] = set()
+        self.backlog_counted_at = 0.0  # time.monotonic() of the last HPOS_BACKLOG count
     
     async def start(self):
         """Start polling and processing"""
         self.running = True
         logger.info(f"Starting HPOS processor (poll interval: {self.poll_interval}s)")
         
+        await start_metrics_server(self.metrics_config)
+        
+        try:
+            # Serves the claim query; create_index is idempotent
+            await self.trace_exports.create_index(
+                [("runtime_id", 1), ("status", 1), ("lease_expires_at", 1)]
+            )
+        except OperationFailure as e:
+            logger.error(f"Failed to ensure claim index on TraceExports: {e}")
+        
         # Start polling task
         self.poll_task = asyncio.create_task(self._poll_loop())
         
+        # Start change stream watcher
+        if self.use_change_stream:
+            self.watch_task = asyncio.create_task(self._watch_loop())
+        
         logger.info("HPOS processor started")
     
     async def _poll_loop(self):
-        """Main polling loop"""
+        """
+        Main polling loop.
+        
+        Wakes up immediately when the change stream reports a new export; otherwise
+        backs off from min_poll_interval_seconds to poll_interval_seconds while idle.
+        """
+        interval = self.min_poll_interval
+        
         while self.running:
             try:
-                await self._process_pending_exports()
-                await asyncio.sleep(self.poll_interval)
+                self.work_available.clear()
+                claimed = await self._process_pending_exports()
+                await self._update_backlog()
+                
+                # Work found: poll again soon (more may be queued); idle: back off
+                interval = self.min_poll_interval if claimed else min(interval * 2, self.poll_interval)
+                
+                try:
+                    await asyncio.wait_for(self.work_available.wait(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"Error in HPOS poll loop: {e}")
                 await asyncio.sleep(self.poll_interval)
     
-    async def _process_pending_exports(self):
-        """Process pending CSV exports"""
-        try:
-            # Query for pending exports
-            cursor = self.trace_exports.find({
-                "runtime_id": self.runtime_id,
-                "status": ProcessingStatus.PENDING.value
-            }).sort("created_at", 1).limit(self.batch_size)
+    async def _update_backlog(self):
+        """Refresh HPOS_BACKLOG, at most once per poll_interval_seconds (it costs a count query)"""
+        now = time.monotonic()
+        if now - self.backlog_counted_at < self.poll_interval:
+            return
+        self.backlog_counted_at = now
+        
+        HPOS_BACKLOG.labels(self.runtime_id).set(await self.trace_exports.count_documents({
+            "runtime_id": self.runtime_id,
+            "status": ProcessingStatus.PENDING.value
+        }))
+    
+    async def _watch_loop(self):
+        """Watch TraceExports for new PENDING exports of this runtime and wake the poll loop"""
+        pipeline = [{
+            "$match": {
+                "operationType": "insert",
+                "fullDocument.runtime_id": self.runtime_id,
+                "fullDocument.status": ProcessingStatus.PENDING.value
+            }
+        }]
+        resume_token = await self._load_resume_token()
+        retry_delay = self.min_poll_interval
+        
+        while self.running:
+            try:
+                async with self.trace_exports.watch(pipeline, resume_after=resume_token) as stream:
+                    logger.info(f"Watching TraceExports change stream (resumed: {resume_token is not None})")
+                    retry_delay = self.min_poll_interval
+                    
+                    async for change in stream:
+                        self.work_available.set()
+                        resume_token = change["_id"]
+                        await self._save_resume_token(resume_token)
             
-            pending_exports = await cursor.to_list(length=self.batch_size)
+            except asyncio.CancelledError:
+                break
             
-            if not pending_exports:
-                logger.debug("No pending exports found")
-                return
+            except OperationFailure as e:
+                # 40573: change streams need a replica set / sharded cluster
+                if e.code == 40573 or "only supported on replica sets" in str(e):
+                    logger.warning("Change streams not supported by MongoDB, using polling only")
+                    return
+                
+                # 286/280: resume point no longer in the oplog - restart from now, poll to catch up
+                if e.code in (280, 286):
+                    logger.warning("Change stream resume token expired, restarting from now")
+                    resume_token = None
+                    self.work_available.set()
+                    continue
+                
+                logger.error(f"Change stream error: {e}")
             
-            logger.info(f"Found {len(pending_exports)} pending exports")
+            except Exception as e:
+                logger.error(f"Change stream error: {e}")
             
-            # Process each export
-            for export_doc in pending_exports:
-                await self._process_export(export_doc)
+            try:
+                await asyncio.sleep(retry_delay)
+            except asyncio.CancelledError:
+                break
+            retry_delay = min(retry_delay * 2, self.poll_interval)
+    
+    async def _load_resume_token(self) -> Optional[Dict[str, Any]]:
+        """Load the stored change stream resume token for this runtime"""
+        try:
+            state = await self.scheduler_state.find_one({"_id": self.runtime_id})
+            return state.get("resume_token") if state else None
+        except Exception as e:
+            logger.error(f"Failed to load change stream resume token: {e}")
+            return None
+    
+    async def _save_resume_token(self, resume_token: Dict[str, Any]):
+        """Store the change stream resume token for this runtime"""
+        try:
+            await self.scheduler_state.update_one(
+                {"_id": self.runtime_id},
+                {"$set": {"resume_token": resume_token, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"Failed to save change stream resume token: {e}")
+    
+    async def _process_pending_exports(self) -> int:
+        """
+        Claim pending CSV exports into free export slots and process them in the background.
+        
+        Only claims while a slot is free, so no claimed export waits (with a ticking
+        lease) behind others, and returns without waiting for the exports to finish.
+        A finished export wakes the poll loop to fill its slot.
+        
+        Returns:
+            Number of exports claimed
+        """
+        claimed = 0
+        
+        try:
+            for _ in range(self.batch_size):
+                if self.export_semaphore.locked():
+                    break
+                await self.export_semaphore.acquire()
+                
+                try:
+                    export_doc = await self._claim_export()
+                except BaseException:
+                    self.export_semaphore.release()
+                    raise
+                
+                if export_doc is None:
+                    self.export_semaphore.release()
+                    break
+                
+                task = asyncio.create_task(self._process_claimed_export(export_doc))
+                self.export_tasks.add(task)
+                task.add_done_callback(self._export_task_done)
+                claimed += 1
+            
+            if not claimed:
+                logger.debug("No pending exports claimed")
         
         except Exception as e:
-            logger.error(f"Error querying pending exports: {e}")
+            logger.error(f"Error claiming pending exports: {e}")
+        
+        return claimed
+    
+    def _export_task_done(self, task: asyncio.Task):
+        """Forget a finished export task and wake the poll loop to fill its slot"""
+        self.export_tasks.discard(task)
+        self.work_available.set()
+    
+    async def _claim_export(self) -> Optional[Dict[str, Any]]:
+        """
+        Atomically claim the oldest pending export, or one whose lease expired.
+        
+        Exports that exceed max_export_attempts are marked FAILED instead of being
+        processed again, and the next claimable export is tried.
+        
+        Returns:
+            Claimed TraceExports document, or None if nothing is claimable
+        """
+        while True:
+            export_doc = await self._claim_next_export()
+            
+            if export_doc is None or export_doc.get("attempts", 1) <= self.max_attempts:
+                return export_doc
+            
+            logger.error(
+                f"Giving up on export {export_doc['csv_filename']} after "
+                f"{self.max_attempts} attempts"
+            )
+            await self.result_processor.update_trace_export_status(
+                csv_filename=export_doc["csv_filename"],
+                status=ProcessingStatus.FAILED,
+                error_message=f"Exceeded {self.max_attempts} processing attempts",
+                worker_id=self.worker_id
+            )
+    
+    async def _claim_next_export(self) -> Optional[Dict[str, Any]]:
+        """
+        Claim the oldest claimable export and count the attempt.
+        
+        Returns:
+            Claimed TraceExports document, or None if nothing is claimable
+        """
+        now = datetime.utcnow()
+        
+        export_doc = await self.trace_exports.find_one_and_update(
+            {
+                "runtime_id": self.runtime_id,
+                "$or": [
+                    {"status": ProcessingStatus.PENDING.value},
+                    {
+                        "status": ProcessingStatus.RUNNING.value,
+                        "lease_expires_at": {"$lt": now}
+                    }
+                ]
+            },
+            {
+                "$set": {
+                    "status": ProcessingStatus.RUNNING.value,
+                    "worker_id": self.worker_id,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        
+        if export_doc:
+            logger.info(
+                f"Claimed export {export_doc['csv_filename']} as {self.worker_id} "
+                f"(attempt {export_doc.get('attempts', 1)})"
+            )
+        
+        return export_doc
+    
+    async def _process_claimed_export(self, export_doc: Dict[str, Any]):
+        """
+        Process a claimed export while renewing its lease; release the export slot afterwards.
+        
+        Args:
+            export_doc: Claimed TraceExports document
+        """
+        processing_task = asyncio.current_task()
+        lease_lost = asyncio.Event()
+        heartbeat = asyncio.create_task(
+            self._lease_heartbeat(export_doc["_id"], processing_task, lease_lost)
+        )
+        HPOS_EXPORTS_IN_PROGRESS.labels(self.runtime_id).inc()
+        
+        try:
+            await self._process_export(export_doc)
+        except asyncio.CancelledError:
+            if not lease_lost.is_set():
+                raise
+            logger.warning(
+                f"Stopped processing {export_doc['csv_filename']} - lease taken over by another worker"
+            )
+        finally:
+            heartbeat.cancel()
+            HPOS_EXPORTS_IN_PROGRESS.labels(self.runtime_id).dec()
+            self.export_semaphore.release()
+    
+    async def _lease_heartbeat(self, export_id, processing_task: asyncio.Task, lease_lost: asyncio.Event):
+        """
+        Renew an export's lease until cancelled; cancel processing if the lease was lost.
+        
+        Args:
+            export_id: TraceExports document _id
+            processing_task: Task processing the export
+            lease_lost: Set when the lease could not be renewed
+        """
+        while True:
+            try:
+                await asyncio.sleep(self.heartbeat_interval)
+                
+                now = datetime.utcnow()
+                result = await self.trace_exports.update_one(
+                    {"_id": export_id, "worker_id": self.worker_id},
+                    {"$set": {
+                        "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                        "updated_at": now
+                    }}
+                )
+                
+                if result.matched_count == 0:
+                    lease_lost.set()
+                    processing_task.cancel()
+                    return
+            
+            except asyncio.CancelledError:
+                return
+            except Exception as e:
+                # Keep trying; the lease only lapses after lease_seconds
+                logger.error(f"Failed to renew lease on export {export_id}: {e}")
     
     async def _download_csv_from_s3(self, s3_location: str) -> pd.DataFrame:
         """
@@ -149,38 +482,91 @@ class HPOSProcessor:
         Returns:
             DataFrame with CSV contents
         """
-        try:
-            # Parse S3 location
-            if s3_location.startswith("s3://"):
-                # Format: s3://bucket/key
-                parts = s3_location[5:].split("/", 1)
-                bucket = parts[0]
-                key = parts[1] if len(parts) > 1 else ""
-            else:
-                # Assume it's just the key, use configured bucket
-                bucket = self.s3_bucket
-                key = s3_location
+        # Parse CSV
+        df = await asyncio.to_thread(
+            pd.read_csv,
+            BytesIO(await self._download_s3_object(s3_location)),
+            dtype=self.export_reader.csv_dtypes,
+            compression=self.export_reader.detect_compression(s3_location)
+        )
+        logger.info(f"Downloaded CSV from S3: {len(df)} rows")
+        
+        return df
+    
+    def _parse_s3_location(self, s3_location: str) -> Tuple[str, str]:
+        """
+        Split an S3 location into bucket and key.
+        
+        Args:
+            s3_location: S3 URI (s3://bucket/key) or S3 key
             
-            logger.debug(f"Downloading from S3: bucket={bucket}, key={key}")
+        Returns:
+            Tuple of (bucket, key)
+        """
+        if s3_location.startswith("s3://"):
+            # Format: s3://bucket/key
+            parts = s3_location[5:].split("/", 1)
+            return parts[0], parts[1] if len(parts) > 1 else ""
+        
+        # Assume it's just the key, use configured bucket
+        return self.s3_bucket, s3_location
+    
+    async def _download_s3_object(self, s3_location: str) -> bytes:
+        """
+        Download an object from S3 (in a worker thread).
+        
+        Args:
+            s3_location: S3 URI (s3://bucket/key) or S3 key
             
-            # Download file content
-            response = self.s3_client.get_object(Bucket=bucket, Key=key)
-            csv_content = response['Body'].read()
+        Returns:
+            Object contents
+        """
+        bucket, key = self._parse_s3_location(s3_location)
+        
+        try:
+            logger.debug(f"Downloading from S3: bucket={bucket}, key={key}")
             
-            # Parse CSV
-            df = pd.read_csv(BytesIO(csv_content))
-            logger.info(f"Downloaded CSV from S3: {len(df)} rows")
+            # Download file content without blocking the event loop
+            response = await asyncio.to_thread(self.s3_client.get_object, Bucket=bucket, Key=key)
+            return await asyncio.to_thread(response['Body'].read)
             
-            return df
+        except ClientError as e:
+            self._raise_s3_error(e, s3_location, bucket)
+    
+    async def _open_s3_stream(self, s3_location: str):
+        """
+        Open an S3 object as a binary stream fetched in parallel byte ranges.
+        
+        Args:
+            s3_location: S3 URI (s3://bucket/key) or S3 key
             
+        Returns:
+            Seekable binary file object (read it from a worker thread)
+        """
+        bucket, key = self._parse_s3_location(s3_location)
+        
+        try:
+            return await asyncio.to_thread(
+                open_s3_stream,
+                self.s3_client,
+                bucket,
+                key,
+                part_size=self.s3_part_size,
+                max_concurrency=self.s3_max_concurrency
+            )
         except ClientError as e:
-            error_code = e.response['Error']['Code']
-            if error_code == 'NoSuchKey':
-                raise FileNotFoundError(f"S3 file not found: {s3_location}")
-            elif error_code == 'NoSuchBucket':
-                raise FileNotFoundError(f"S3 bucket not found: {bucket}")
-            else:
-                raise Exception(f"S3 error ({error_code}): {e}")
+            self._raise_s3_error(e, s3_location, bucket)
+    
+    @staticmethod
+    def _raise_s3_error(e: ClientError, s3_location: str, bucket: str):
+        """Translate an S3 client error"""
+        error_code = e.response['Error']['Code']
+        if error_code in ('NoSuchKey', '404'):
+            raise FileNotFoundError(f"S3 file not found: {s3_location}")
+        elif error_code == 'NoSuchBucket':
+            raise FileNotFoundError(f"S3 bucket not found: {bucket}")
+        else:
+            raise Exception(f"S3 error ({error_code}): {e}")
     
     async def _load_csv_file(self, csv_filename: str) -> pd.DataFrame:
         """
@@ -202,10 +588,105 @@ class HPOSProcessor:
             if not csv_path.exists():
                 raise FileNotFoundError(f"CSV file not found: {csv_path}")
             
-            df = pd.read_csv(csv_path)
+            df = await asyncio.to_thread(pd.read_csv, csv_path, dtype=self.export_reader.csv_dtypes)
             logger.info(f"Loaded CSV from local filesystem: {len(df)} rows")
             return df
 
+    async def _open_export_stream(self, csv_filename: str):
+        """
+        Open an export as a binary stream, from S3 or the local stand-in.
+        
+        Args:
+            csv_filename: S3 location or local filename
+            
+        Returns:
+            Seekable binary file object (caller closes it)
+        """
+        if self.use_s3:
+            return await self._open_s3_stream(csv_filename)
+        
+        csv_path = self.csv_directory / csv_filename
+        if not csv_path.exists():
+            raise FileNotFoundError(f"CSV file not found: {csv_path}")
+        return await asyncio.to_thread(open, csv_path, "rb")
+    
+    def _trace_order(self, export_doc: Dict[str, Any]) -> str:
+        """Order _iter_export_batches yields an export's traces in (for checkpoints)"""
+        export_format = self.export_reader.detect_format(export_doc["csv_filename"], export_doc.get("format"))
+        if not self.csv_streaming and export_format == "csv":
+            return "grouped"
+        sorted_by_trace_id = export_doc.get("sorted_by_trace_id", self.csv_sorted_by_trace_id)
+        return self.export_reader.trace_order(sorted_by_trace_id)
+    
+    async def _iter_export_batches(
+        self,
+        export_doc: Dict[str, Any]
+    ) -> AsyncIterator[List[Tuple[str, List[Dict[str, Any]]]]]:
+        """
+        Yield batches of (trace_id, trace_data) pairs of an export, in a deterministic order.
+        
+        In streaming mode the export is read in chunks in a worker thread and each
+        trace is yielded as soon as it is complete; memory stays flat regardless
+        of export size. Exports sorted by trace_id (hpos_config or the
+        sorted_by_trace_id field of the TraceExports document) take the fast path,
+        others are spilled to disk first.
+        
+        Exports are CSV, Parquet or Arrow IPC, by the format field of the
+        TraceExports document or the file extension; Parquet and Arrow exports
+        are always streamed.
+        
+        Args:
+            export_doc: TraceExports document
+        """
+        csv_filename = export_doc["csv_filename"]
+        export_format = self.export_reader.detect_format(csv_filename, export_doc.get("format"))
+        
+        if not self.csv_streaming and export_format == "csv":
+            df = await self._load_csv_file(csv_filename)
+            logger.info(f"Loaded CSV with {len(df)} rows")
+            
+            traces = self.export_reader.group(df)
+            while batch := list(itertools.islice(traces, 256)):
+                yield batch
+            return
+        
+        # Parsing starts while later parts of the object are still downloading
+        source = await self._open_export_stream(csv_filename)
+        sorted_by_trace_id = export_doc.get("sorted_by_trace_id", self.csv_sorted_by_trace_id)
+        traces = self.export_reader.iter_traces(
+            source,
+            sorted_by_trace_id,
+            export_format,
+            compression=self.export_reader.detect_compression(csv_filename)
+        )
+        
+        try:
+            while True:
+                # Pull traces in small batches to amortize the thread hop
+                batch = await asyncio.to_thread(list, itertools.islice(traces, 256))
+                if not batch:
+                    break
+                yield batch
+        finally:
+            source.close()
+    
+    async def _save_checkpoint(self, export_doc: Dict[str, Any], checkpoint: ExportCheckpoint):
+        """
+        Store an export's checkpoint, while this worker holds the lease.
+        
+        Args:
+            export_doc: TraceExports document
+            checkpoint: Export's checkpoint
+        """
+        try:
+            await self.trace_exports.update_one(
+                {"_id": export_doc["_id"], "worker_id": self.worker_id},
+                {"$set": {"checkpoint": checkpoint.advance(), "updated_at": datetime.utcnow()}}
+            )
+        except Exception as e:
+            # Not fatal: a resume starts from the previous checkpoint
+            logger.error(f"Failed to save checkpoint for {export_doc['csv_filename']}: {e}")
+    
     async def _process_export(self, export_doc: Dict[str, Any]):
         """
         Process a single CSV export from S3 or local storage.
@@ -216,92 +697,78 @@ class HPOSProcessor:
         csv_filename = export_doc["csv_filename"]
         
         try:
-            logger.info(f"Processing CSV export: {csv_filename}")
-            
-            # Update status to RUNNING
-            await self.result_processor.update_trace_export_status(
-                csv_filename=csv_filename,
-                status=ProcessingStatus.RUNNING
+            # Status is already RUNNING (set when the export was claimed)
+            checkpoint = ExportCheckpoint(
+                export_doc.get("checkpoint"),
+                self._trace_order(export_doc),
+                self.checkpoint_interval_traces,
+                self.checkpoint_interval_seconds
             )
             
-            # Load CSV file from S3 or local filesystem
-            df = await self._load_csv_file(csv_filename)
-            logger.info(f"Loaded CSV with {len(df)} rows")
+            # A reclaimed export may have traces saved after its last checkpoint
+            check_saved = export_doc.get("attempts", 1) > 1
             
-            # Group by trace_id
-            traces = TraceParser.group_csv_by_trace_id(df.to_dict('records'))
-            logger.info(f"Found {len(traces)} unique traces in CSV")
+            if checkpoint.resumed:
+                logger.info(
+                    f"Resuming CSV export {csv_filename} after {checkpoint.resume_watermark} traces"
+                )
+            else:
+                logger.info(f"Processing CSV export: {csv_filename}")
             
-            # Process each trace
-            processed_count = 0
-            failed_count = 0
+            # Process traces concurrently: up to max_concurrent_traces evaluating and
+            # save_window saving. Reading waits for a free evaluation slot, so memory
+            # stays bounded.
+            eval_slots = asyncio.Semaphore(self.max_concurrent_traces)
+            save_slots = asyncio.Semaphore(self.save_window)
+            tasks: Set[asyncio.Task] = set()
             
-            for trace_id, trace_data in traces.items():
-                try:
-                    # Parse spans from CSV rows
-                    spans = TraceParser.parse_spans_from_csv(trace_data)
-                    
-                    # Extract user prompt early for goal inference
-                    temp_llm_spans = [s for s in spans if s.attributes.get("openinference.span.kind") == "LLM"]
-                    user_prompt, model_response = TraceParser.extract_user_prompt_and_response(temp_llm_spans)
-                    
-                    # Infer goal from user prompt and tools
-                    tool_calls = []
-                    for s in spans:
-                        if s.attributes.get("openinference.span.kind") == "TOOL":
-                            # Extract tool name from input.value (e.g., "search_and_summarize with query: ...")
-                            input_value = s.attributes.get("input.value", "")
-                            tool_name = input_value.split(" with ")[0].strip() if " with " in input_value else input_value.strip()
-                            if not tool_name:
-                                tool_name = s.name  # Fallback to span name if extraction fails
-                            tool_calls.append({"tool_name": tool_name})
-                    inferred_goal = self.goal_inference.infer_goal(
-                        user_prompt=user_prompt or "",
-                        tool_calls=tool_calls,
-                        llm_spans=temp_llm_spans
-                    )
-                    
-                    logger.info(f"Inferred goal for trace {trace_id}: {inferred_goal}")
-                    
-                    # Parse complete trace with filtering and metadata (including inferred goal)
-                    parsed_trace = TraceParser.parse_trace(
-                        spans=spans,
-                        trace_id=trace_id,
-                        runtime_id=self.runtime_id,
-                        goal_name=inferred_goal  # Use inferred goal
-                    )
-                    
-                    # Convert ParsedTrace to dictionary for evaluation
-                    trace_dict = parsed_trace.model_dump()
-                    
-                    # Run evaluation
-                    evaluation_result = await self.executor.evaluate(trace_dict)
+            try:
+                # Traces are read from S3 or local filesystem as the loop consumes them
+                async for batch in self._iter_export_batches(export_doc):
+                    batch = checkpoint.skip_done(batch)
+                    if not batch:
+                        continue
                     
-                    # Save results with user prompt and model response
-                    await self.result_processor.save_evaluation_result(
-                        trace_id=trace_id,
-                        runtime_id=self.runtime_id,
-                        evaluation_result=evaluation_result,
-                        source_type="hpos_csv",
-                        source_reference=csv_filename,
-                        user_prompt=user_prompt,
-                        model_response=model_response
-                    )
+                    saved = set()
+                    if check_saved:
+                        saved = await self.result_processor.find_saved_trace_ids(
+                            [trace_id for trace_id, _ in batch], csv_filename
+                        )
                     
-                    processed_count += 1
+                    for trace_id, trace_data in batch:
+                        seq = checkpoint.begin()
+                        if trace_id in saved:
+                            checkpoint.finish(seq, succeeded=True)
+                            continue
+                        
+                        await eval_slots.acquire()
+                        task = asyncio.create_task(self._process_trace(
+                            trace_id, trace_data, csv_filename, checkpoint, seq, eval_slots, save_slots
+                        ))
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
                     
-                    logger.debug(
-                        f"Processed trace {trace_id}: {evaluation_result['overall_status']}"
-                    )
+                    if saved:
+                        logger.info(f"Skipped {len(saved)} traces of {csv_filename} saved by a previous attempt")
                     
-                except Exception as e:
-                    logger.error(f"Failed to process trace {trace_id}: {e}")
-                    failed_count += 1
+                    if checkpoint.due():
+                        await self._save_checkpoint(export_doc, checkpoint)
+                
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+            
+            # Final counts are kept on the export alongside the completed status
+            await self._save_checkpoint(export_doc, checkpoint)
+            processed_count = checkpoint.processed
+            failed_count = checkpoint.failed
             
             # Update status to COMPLETED
             await self.result_processor.update_trace_export_status(
                 csv_filename=csv_filename,
-                status=ProcessingStatus.COMPLETED
+                status=ProcessingStatus.COMPLETED,
+                worker_id=self.worker_id
             )
             
             logger.info(
@@ -316,24 +783,102 @@ class HPOSProcessor:
             await self.result_processor.update_trace_export_status(
                 csv_filename=csv_filename,
                 status=ProcessingStatus.FAILED,
-                error_message=str(e)
+                error_message=str(e),
+                worker_id=self.worker_id
             )
     
+    async def _process_trace(
+        self,
+        trace_id: str,
+        trace_data: List[Dict[str, Any]],
+        csv_filename: str,
+        checkpoint: ExportCheckpoint,
+        seq: int,
+        eval_slots: asyncio.Semaphore,
+        save_slots: asyncio.Semaphore
+    ):
+        """
+        Evaluate and save one trace of an export.
+        
+        Args:
+            trace_id: Trace identifier
+            trace_data: CSV rows of the trace
+            csv_filename: Export being processed
+            checkpoint: Export's checkpoint, told when the trace is done
+            seq: Trace's sequence number in the export
+            eval_slots: Evaluation slot, acquired by the caller
+            save_slots: Save slots, shared by the export's traces
+        """
+        try:
+            try:
+                # Parse, infer goal and evaluate (inline or on the trace's shard process)
+                result = await self.pipeline.evaluate_csv_rows(trace_id, trace_data)
+                evaluation_result = result["evaluation_result"]
+                record_timings(result.get("timings"))
+                
+                logger.debug(
+                    f"Evaluated trace {trace_id}: {evaluation_result['overall_status']}"
+                )
+                
+                # Hand over from the evaluation slot to a save slot, so the next
+                # trace is evaluated while this upsert waits for its bulk write
+                await save_slots.acquire()
+            finally:
+                eval_slots.release()
+            
+            save_started = time.perf_counter()
+            try:
+                # Save results with user prompt and model response
+                await self.result_processor.save_evaluation_result(
+                    trace_id=trace_id,
+                    runtime_id=self.runtime_id,
+                    evaluation_result=evaluation_result,
+                    source_type="hpos_csv",
+                    source_reference=csv_filename,
+                    user_prompt=result["user_prompt"],
+                    model_response=result["model_response"],
+                    content_hash=result.get("content_hash"),
+                    cached=result.get("cached", False)
+                )
+            finally:
+                save_slots.release()
+            
+            STAGE_SECONDS.labels("save").observe(time.perf_counter() - save_started)
+            TRACES_PROCESSED.labels("hpos", "processed").inc()
+            checkpoint.finish(seq, succeeded=True)
+            
+        except Exception as e:
+            logger.error(f"Failed to process trace {trace_id}: {e}")
+            TRACES_PROCESSED.labels("hpos", "failed").inc()
+            checkpoint.finish(seq, succeeded=False)
+    
     async def stop(self):
         """Stop processing"""
         logger.info("Stopping HPOS processor...")
         self.running = False
         
-        # Cancel poll task
-        if self.poll_task:
-            self.poll_task.cancel()
-            try:
-                await self.poll_task
-            except asyncio.CancelledError:
-                pass
+        # Cancel poll and change stream tasks
+        for task in (self.poll_task, self.watch_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        
+        # Stop in-flight exports - they keep their lease and are reclaimed once it expires
+        for task in list(self.export_tasks):
+            task.cancel()
+        if self.export_tasks:
+            await asyncio.gather(*self.export_tasks, return_exceptions=True)
         
         # Close connections
-        self.client.close()
+        release_mongo_client(self.mongodb_uri)
         await self.result_processor.close()
+        await self.pipeline.close()
+        
+        HPOS_BACKLOG.remove(self.runtime_id)
+        HPOS_EXPORTS_IN_PROGRESS.remove(self.runtime_id)
+        await stop_metrics_server(self.metrics_config)
         
         logger.info("HPOS processor stopped")
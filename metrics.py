@@ -0,0 +1,419 @@
+"""
+Metrics - process-wide counters, gauges and histograms with a Prometheus text endpoint.
+"""
+
+import asyncio
+import bisect
+from abc import ABC, abstractmethod
+import logging
+import math
+import time
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets (seconds), from sub-millisecond parsing to slow LLM-judge guardrails
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Tuple[str, ...], labelvalues: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    """Base of labelled metrics: one child per label value combination"""
+    
+    type_name = ""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children: Dict[Tuple[str, ...], Any] = {}
+        if not self.labelnames:
+            self.children[()] = self._new_child()
+    
+    def labels(self, *labelvalues: str):
+        """Child for a label value combination (cache it on hot paths)"""
+        key = tuple(str(value) for value in labelvalues)
+        child = self.children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self.children.setdefault(key, self._new_child())
+        return child
+    
+    def remove(self, *labelvalues: str):
+        """Drop a label value combination's child (e.g. when its component stops)"""
+        self.children.pop(tuple(str(value) for value in labelvalues), None)
+    
+    @abstractmethod
+    def _new_child(self):
+        """Value holder for one label value combination"""
+    
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Exposition lines of all children"""
+    
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self._samples()
+        ]
+
+
+class _Value:
+    __slots__ = ("value", "function")
+    
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+    
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+    
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+    
+    def set(self, value: float):
+        self.value = value
+    
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from function at scrape time (nothing to record on the hot path)"""
+        self.function = function
+    
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return math.nan
+        return self.value
+
+
+class Counter(_Metric):
+    """Monotonic counter"""
+    
+    type_name = "counter"
+    
+    def _new_child(self):
+        return _Value()
+    
+    def inc(self, amount: float = 1.0):
+        self.children[()].inc(amount)
+    
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.get())}"
+            for key, child in list(self.children.items())
+        ]
+
+
+class Gauge(Counter):
+    """Value that goes up and down, set directly or read from a function at scrape time"""
+    
+    type_name = "gauge"
+    
+    def dec(self, amount: float = 1.0):
+        self.children[()].dec(amount)
+    
+    def set(self, value: float):
+        self.children[()].set(value)
+    
+    def set_function(self, function: Callable[[], float]):
+        self.children[()].set_function(function)
+
+
+class _HistogramValue:
+    __slots__ = ("upper_bounds", "counts", "sum")
+    
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)  # Last bucket: +Inf
+        self.sum = 0.0
+    
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values"""
+    
+    type_name = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ):
+        self.upper_bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+    
+    def _new_child(self):
+        return _HistogramValue(self.upper_bounds)
+    
+    def observe(self, value: float):
+        self.children[()].observe(value)
+    
+    def _samples(self) -> List[str]:
+        samples = []
+        for key, child in list(self.children.items()):
+            cumulative = 0
+            for upper_bound, count in zip((*self.upper_bounds, math.inf), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(upper_bound)}"'
+                samples.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            samples.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            samples.append(f"{self.name}_count{labels} {cumulative}")
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics, shared by all processors.
+    
+    Metrics are created once by name (get-or-create), so components can declare
+    the same metric independently.
+    """
+    
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+    
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+    
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+    
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = Histogram(name, documentation, labelnames, buckets)
+        elif type(metric) is not Histogram:
+            raise ValueError(f"Metric {name} already registered as {metric.type_name}")
+        return metric
+    
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Iterable[str]):
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = cls(name, documentation, labelnames)
+        elif type(metric) is not cls:
+            raise ValueError(f"Metric {name} already registered as {metric.type_name}")
+        return metric
+    
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)"""
+        lines: List[str] = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Pipeline stages (parse, goal_inference, evaluate) and per-guardrail latency;
+# recorded in the parent process from the timings returned by the pipeline
+STAGE_SECONDS = REGISTRY.histogram(
+    "guardrails_eval_stage_seconds", "Trace processing stage latency", ["stage"]
+)
+GUARDRAIL_SECONDS = REGISTRY.histogram(
+    "guardrails_eval_guardrail_seconds", "Guardrail evaluation latency", ["guardrail"]
+)
+GUARDRAIL_MEMO_LOOKUPS = REGISTRY.counter(
+    "guardrails_eval_guardrail_memo_lookups_total",
+    "Guardrail memo lookups (hit, persistent_hit, miss)",
+    ["guardrail", "outcome"]
+)
+
+# Result sinks (mongodb, kafka, arize_alert, arize_evaluation)
+SINK_SECONDS = REGISTRY.histogram(
+    "guardrails_eval_sink_seconds", "Result sink write latency", ["sink"]
+)
+SINK_ERRORS = REGISTRY.counter(
+    "guardrails_eval_sink_errors_total", "Result sink write errors, timeouts and drops", ["sink", "kind"]
+)
+
+# Arize HTTP requests (evaluation, batch, alert, aggregates)
+ARIZE_REQUEST_SECONDS = REGISTRY.histogram(
+    "guardrails_eval_arize_request_seconds", "Arize API request latency", ["endpoint"]
+)
+ARIZE_ERRORS = REGISTRY.counter(
+    "guardrails_eval_arize_errors_total", "Failed Arize API requests", ["endpoint"]
+)
+
+# Redis ingestion; gauges are per processor (runtime_id), removed when it stops
+TRACE_BUFFER_TRACES = REGISTRY.gauge(
+    "guardrails_eval_trace_buffer_traces", "Traces in the trace buffer", ["runtime_id"]
+)
+TRACE_BUFFER_SPANS = REGISTRY.gauge(
+    "guardrails_eval_trace_buffer_spans", "Spans in the trace buffer", ["runtime_id"]
+)
+TRACE_BUFFER_BYTES = REGISTRY.gauge(
+    "guardrails_eval_trace_buffer_bytes", "Bytes in the trace buffer", ["runtime_id"]
+)
+TRACE_QUEUE_DEPTH = REGISTRY.gauge(
+    "guardrails_eval_trace_queue_depth", "Complete traces waiting for a worker", ["runtime_id"]
+)
+SPANS_RECEIVED = REGISTRY.counter("guardrails_eval_spans_received_total", "Spans received from Redis")
+
+# HPOS ingestion
+HPOS_BACKLOG = REGISTRY.gauge(
+    "guardrails_eval_hpos_backlog_exports", "Pending HPOS exports", ["runtime_id"]
+)
+HPOS_EXPORTS_IN_PROGRESS = REGISTRY.gauge(
+    "guardrails_eval_hpos_exports_in_progress", "HPOS exports being processed by this worker", ["runtime_id"]
+)
+TRACES_PROCESSED = REGISTRY.counter(
+    "guardrails_eval_traces_total", "Evaluated traces", ["source", "outcome"]
+)
+
+
+def record_timings(timings: Optional[Dict[str, float]]):
+    """
+    Record the timings returned by the trace pipeline.
+    
+    Args:
+        timings: Stage name -> seconds; "guardrail:<name>" keys are per guardrail,
+            "memo:<name>:<outcome>" keys are guardrail memo lookup counts
+    """
+    if not timings:
+        return
+    
+    for key, seconds in timings.items():
+        if key.startswith("memo:"):
+            name, _, outcome = key[5:].rpartition(":")
+            GUARDRAIL_MEMO_LOOKUPS.labels(name, outcome).inc(seconds)
+        elif key.startswith("guardrail:"):
+            GUARDRAIL_SECONDS.labels(key[10:]).observe(seconds)
+        else:
+            STAGE_SECONDS.labels(key).observe(seconds)
+
+
+class _Timer:
+    """Context manager adding elapsed seconds to a timings dict"""
+    
+    __slots__ = ("timings", "key", "started")
+    
+    def __init__(self, timings: Dict[str, float], key: str):
+        self.timings = timings
+        self.key = key
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.timings[self.key] = self.timings.get(self.key, 0.0) + time.perf_counter() - self.started
+
+
+def timed(timings: Dict[str, float], key: str) -> _Timer:
+    """Time a block into timings[key] (accumulates)"""
+    return _Timer(timings, key)
+
+
+# Shared endpoint servers and their reference counts, keyed by (host, port)
+_servers: Dict[Tuple[str, int], asyncio.AbstractServer] = {}
+_server_ref_counts: Dict[Tuple[str, int], int] = {}
+
+
+async def _handle_scrape(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Serve GET /metrics (HTTP/1.0 style, one request per connection)"""
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # Skip headers
+        while True:
+            line = await asyncio.wait_for(reader.readline(), timeout=5)
+            if line in (b"\r\n", b"\n", b""):
+                break
+        
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] in ("/metrics", "/"):
+            body = REGISTRY.render().encode("utf-8")
+            status = "200 OK"
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = b"Not Found\n"
+            status = "404 Not Found"
+            content_type = "text/plain"
+        
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+    except Exception as e:
+        logger.debug(f"Metrics scrape failed: {e}")
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(metrics_config: Optional[Dict[str, Any]]):
+    """
+    Start the shared Prometheus endpoint, if configured and not yet running.
+    
+    Every call that started or joined a server must be paired with stop_metrics_server().
+    
+    Args:
+        metrics_config: Metrics configuration (enabled, host, port)
+    """
+    metrics_config = metrics_config or {}
+    if not metrics_config.get("enabled", True) or not metrics_config.get("port"):
+        return
+    
+    key = (metrics_config.get("host", "0.0.0.0"), int(metrics_config["port"]))
+    if key not in _servers:
+        _servers[key] = await asyncio.start_server(_handle_scrape, key[0], key[1])
+        _server_ref_counts[key] = 0
+        logger.info(f"Serving Prometheus metrics on http://{key[0]}:{key[1]}/metrics")
+    _server_ref_counts[key] += 1
+
+
+async def stop_metrics_server(metrics_config: Optional[Dict[str, Any]]):
+    """
+    Release the shared Prometheus endpoint; closes it when no longer used.
+    
+    Args:
+        metrics_config: Metrics configuration passed to start_metrics_server()
+    """
+    metrics_config = metrics_config or {}
+    if not metrics_config.get("enabled", True) or not metrics_config.get("port"):
+        return
+    
+    key = (metrics_config.get("host", "0.0.0.0"), int(metrics_config["port"]))
+    if key not in _servers:
+        return
+    
+    _server_ref_counts[key] -= 1
+    if _server_ref_counts[key] <= 0:
+        server = _servers.pop(key)
+        del _server_ref_counts[key]
+        server.close()
+        await server.wait_closed()
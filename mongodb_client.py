@@ -0,0 +1,111 @@
+"""
+MongoDB client registry - process-wide Motor clients shared across processors.
+"""
+
+import logging
+from typing import Dict, Any, Optional
+from motor.motor_asyncio import AsyncIOMotorClient
+
+logger = logging.getLogger(__name__)
+
+# mongodb_config key -> MongoClient option
+CLIENT_OPTION_KEYS = {
+    "max_pool_size": "maxPoolSize",
+    "min_pool_size": "minPoolSize",
+    "max_idle_time_ms": "maxIdleTimeMS",
+    "max_connecting": "maxConnecting",
+    "wait_queue_timeout_ms": "waitQueueTimeoutMS",
+    "server_selection_timeout_ms": "serverSelectionTimeoutMS",
+    "compressors": "compressors",  # e.g. "zstd,snappy" (needs zstandard / python-snappy)
+    "zstd_compression_level": "zstdCompressionLevel"
+}
+
+# Shared clients and their reference counts, keyed by URI
+_clients: Dict[str, AsyncIOMotorClient] = {}
+_ref_counts: Dict[str, int] = {}
+
+
+def build_client_options(mongodb_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build MongoClient keyword options from mongodb_config.
+    
+    Args:
+        mongodb_config: MongoDB configuration
+        
+    Returns:
+        Pool and wire-compression options for AsyncIOMotorClient
+    """
+    options = {}
+    
+    for config_key, option_name in CLIENT_OPTION_KEYS.items():
+        value = mongodb_config.get(config_key)
+        if value is None:
+            continue
+        if config_key == "compressors" and isinstance(value, (list, tuple)):
+            value = ",".join(value)
+        options[option_name] = value
+    
+    return options
+
+
+def get_mongo_client(uri: str, mongodb_config: Optional[Dict[str, Any]] = None) -> AsyncIOMotorClient:
+    """
+    Get the shared MongoDB client for a URI, creating it on first use.
+    
+    All components of the process share one client (connection pool, monitors,
+    heartbeat threads) per URI. Options are taken from the first caller's config.
+    Every call must be paired with release_mongo_client().
+    
+    Args:
+        uri: MongoDB connection URI
+        mongodb_config: MongoDB configuration with pool/compression options
+        
+    Returns:
+        Shared AsyncIOMotorClient
+    """
+    options = build_client_options(mongodb_config or {})
+    
+    client = _clients.get(uri)
+    if client is None:
+        client = AsyncIOMotorClient(uri, **options)
+        _clients[uri] = client
+        _ref_counts[uri] = 0
+        logger.info(f"Created shared MongoDB client (options: {options})")
+    
+    _ref_counts[uri] += 1
+    return client
+
+
+def register_mongo_client(uri: str, client: Any):
+    """
+    Register an already created client (e.g. an in-process stand-in) for a URI.
+    
+    Later get_mongo_client() calls for the URI share it; it is closed with the last
+    release_mongo_client().
+    
+    Args:
+        uri: MongoDB connection URI
+        client: Client with the AsyncIOMotorClient interface used by the processors
+    """
+    if uri in _clients:
+        raise ValueError(f"A MongoDB client is already registered for {uri}")
+    
+    _clients[uri] = client
+    _ref_counts[uri] = 0
+
+
+def release_mongo_client(uri: str):
+    """
+    Release a reference to the shared client; closes it when no longer used.
+    
+    Args:
+        uri: MongoDB connection URI
+    """
+    if uri not in _clients:
+        return
+    
+    _ref_counts[uri] -= 1
+    if _ref_counts[uri] <= 0:
+        _clients.pop(uri).close()
+        del _ref_counts[uri]
+        logger.info("Closed shared MongoDB client")
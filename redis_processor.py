@@ -3,24 +3,91 @@ Redis processor - real-time trace processing from Redis streams.
 """
 
 import asyncio
-import json
 import logging
-from typing import Dict, Any, List, Optional
+import os
+import socket
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Set, Tuple
 from datetime import datetime
 import redis.asyncio as redis
+from redis.exceptions import ResponseError
 
 from guardrails_eval.utils.config_loader import ConfigLoader
-from guardrails_eval.utils.trace_parser import TraceParser
-from guardrails_eval.executor.guardrails_executor import GuardrailsExecutor
 from guardrails_eval.processors.result_processor import ResultProcessor
+from guardrails_eval.processors.trace_pipeline import create_trace_pipeline
+from guardrails_eval.processors.trace_buffer import TraceBuffer, BufferedTrace
+from guardrails_eval.processors.trace_completion import TraceCompletionTracker
+from guardrails_eval.utils.span_codec import SpanDecoder, SpanDecodeError, SpanRecord
+from guardrails_eval.utils.metrics import (
+    STAGE_SECONDS,
+    SPANS_RECEIVED,
+    TRACE_BUFFER_BYTES,
+    TRACE_BUFFER_SPANS,
+    TRACE_BUFFER_TRACES,
+    TRACE_QUEUE_DEPTH,
+    TRACES_PROCESSED,
+    record_timings,
+    start_metrics_server,
+    stop_metrics_server
+)
 
 logger = logging.getLogger(__name__)
 
+# Span kinds buffered for evaluation; all other spans only drive completion tracking
+EVALUATED_SPAN_KINDS = ("LLM", "TOOL")
+
+
+def _parser_class(parser: str):
+    """
+    redis-py response parser class for the redis_parser setting.
+    
+    Args:
+        parser: "auto" (hiredis if installed), "hiredis" or "python"
+        
+    Returns:
+        Parser class, or None for redis-py's default
+    """
+    if parser == "auto":
+        return None
+    
+    try:
+        # redis-py >= 5
+        from redis._parsers import _AsyncHiredisParser as HiredisParser, _AsyncRESP2Parser as PythonParser
+    except ImportError:
+        from redis.asyncio.connection import HiredisParser, PythonParser
+    from redis.utils import HIREDIS_AVAILABLE
+    
+    if parser == "hiredis":
+        if not HIREDIS_AVAILABLE:
+            raise ImportError("hiredis is required for redis_parser: hiredis")
+        return HiredisParser
+    if parser == "python":
+        return PythonParser
+    raise ValueError(f"Invalid redis_parser: {parser}")
+
+
+class _SpanBatch:
+    """Effects of applying a batch of spans to the buffer, carried out once per batch"""
+    
+    __slots__ = ("acks", "stale", "completed")
+    
+    def __init__(self):
+        self.acks: List[bytes] = []  # Stream entries of dropped spans
+        self.stale: List[BufferedTrace] = []  # Traces evicted from the buffer
+        self.completed: List[BufferedTrace] = []  # Traces completed by the batch
+
 
 class RedisProcessor:
     """
     Processes traces from Redis in real-time.
     Subscribes to Redis channel for span messages and assembles traces.
+
+    Ingestion modes (redis_config["ingestion_mode"]):
+    - "pubsub": subscribe to channel spans:{runtime_id} (default, no delivery guarantee)
+    - "stream": read from a Redis Stream through a consumer group; spans are
+      acknowledged only after the trace's evaluation is saved, and pending
+      entries of dead consumers are taken over with XAUTOCLAIM
     """
     
     def __init__(
@@ -29,7 +96,8 @@ class RedisProcessor:
         mongodb_config: Dict[str, Any],
         kafka_config: Dict[str, Any],
         arize_config: Optional[Dict[str, Any]],
-        agent_card: Dict[str, Any]
+        agent_card: Dict[str, Any],
+        metrics_config: Optional[Dict[str, Any]] = None
     ):
         """
         Initialize Redis processor.
@@ -40,34 +108,96 @@ class RedisProcessor:
             kafka_config: Kafka configuration
             arize_config: Arize configuration (optional)
             agent_card: Agent card configuration
+            metrics_config: Prometheus endpoint configuration (optional)
         """
         self.redis_config = redis_config
+        self.metrics_config = metrics_config
         self.agent_card = agent_card
         self.runtime_id = agent_card.get("runtime_id")
         
         # Redis connection
         self.redis_client: Optional[redis.Redis] = None
+        self.redis_pool: Optional[redis.ConnectionPool] = None
         self.pubsub: Optional[redis.client.PubSub] = None
         
         # Trace assembly
-        self.trace_buffer: Dict[str, List[Dict]] = {}  # trace_id -> spans
+        self.trace_buffer = TraceBuffer(redis_config)
+        self.sweep_interval = redis_config.get("trace_sweep_interval_seconds", 5)
+        self.sweep_task: Optional[asyncio.Task] = None
+        self.completion = TraceCompletionTracker(redis_config, self.trace_buffer)
+        self.completion_check_interval = redis_config.get("completion_check_interval_seconds", 0.1)
+        self.completion_task: Optional[asyncio.Task] = None
         self.trace_metadata: Dict[str, Dict] = {}  # trace_id -> metadata
         
+        # Stream ingestion (consumer groups)
+        self.ingestion_mode = redis_config.get("ingestion_mode", "pubsub")
+        self.stream_key = redis_config.get("stream_key", f"spans_stream:{self.runtime_id}")
+        self.stream_field = redis_config.get("stream_field", "data")
+        self.stream_field_key = self.stream_field.encode("utf-8")  # Responses are not decoded
+        
+        # Pub/sub draining: up to pubsub_batch_size messages are handled per wakeup
+        self.pubsub_batch_size = redis_config.get("pubsub_batch_size", 500)
+        self.pubsub_poll_timeout = redis_config.get("pubsub_poll_timeout_seconds", 1.0)
+        self.stream_start_id = redis_config.get("stream_start_id", "$")
+        self.consumer_group = redis_config.get("consumer_group", f"guardrails_eval:{self.runtime_id}")
+        self.consumer_name = (
+            redis_config.get("consumer_name") or f"{socket.gethostname()}-{os.getpid()}"
+        )
+        self.stream_batch_size = redis_config.get("stream_batch_size", 100)
+        self.stream_block_ms = redis_config.get("stream_block_ms", 1000)
+        self.claim_min_idle_ms = redis_config.get("claim_min_idle_ms", 60000)
+        self.claim_interval_seconds = redis_config.get("claim_interval_seconds", 30)
+        # Entries delivered to this consumer and not yet acknowledged (buffered, queued
+        # or being evaluated); redeliveries of these are skipped
+        self.inflight_message_ids: Set[bytes] = set()
+        # Entries given up without acknowledging (failed or dropped traces), so their
+        # redelivery is a retry, never a late span
+        self.released_message_ids: "OrderedDict[bytes, None]" = OrderedDict()
+        self.max_released_message_ids = redis_config.get("max_released_message_ids", 100000)
+        self.claim_task: Optional[asyncio.Task] = None
+        
+        # Raw span messages -> compact SpanRecords
+        self.span_decoder = SpanDecoder(redis_config)
+        
         # Processors
-        self.executor = GuardrailsExecutor(agent_card)
         self.result_processor = ResultProcessor(
             mongodb_uri=mongodb_config["uri"],
             database_name=mongodb_config["database"],
             kafka_config=kafka_config,
             arize_config=arize_config,
             task_registry_collection=mongodb_config.get("task_registry_collection", "TaskRegistry"),
-            trace_exports_collection=mongodb_config.get("trace_exports_collection", "trace_exports")
+            trace_exports_collection=mongodb_config.get("trace_exports_collection", "trace_exports"),
+            bulk_write_config=mongodb_config.get("bulk_write"),
+            mongodb_options=mongodb_config,
+            sink_config=redis_config.get("result_sinks")
         )
+        self.pipeline = create_trace_pipeline(agent_card, redis_config, database=self.result_processor.db)
         
         # Worker management
         self.num_workers = redis_config.get("num_workers", 5)
         self.running = False
         self.worker_tasks: List[asyncio.Task] = []
+        
+        # Completed traces waiting for a worker: (trace_id, spans, message_ids, enqueued_at)
+        self.max_queue_size = redis_config.get("max_queue_size", 1000)
+        self.queue_full_policy = redis_config.get("queue_full_policy", "block")  # block, drop_newest, drop_oldest
+        if self.queue_full_policy not in ("block", "drop_newest", "drop_oldest"):
+            raise ValueError(f"Invalid queue_full_policy: {self.queue_full_policy}")
+        self.trace_queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self.queue_stats = {
+            "enqueued": 0,
+            "processed": 0,
+            "dropped": 0,
+            "blocked": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0
+        }
+        
+        # Gauges are read at scrape time
+        TRACE_BUFFER_TRACES.labels(self.runtime_id).set_function(lambda: len(self.trace_buffer))
+        TRACE_BUFFER_SPANS.labels(self.runtime_id).set_function(lambda: self.trace_buffer.total_spans)
+        TRACE_BUFFER_BYTES.labels(self.runtime_id).set_function(lambda: self.trace_buffer.total_bytes)
+        TRACE_QUEUE_DEPTH.labels(self.runtime_id).set_function(self.trace_queue.qsize)
     
     async def connect(self):
         """Connect to Redis"""
@@ -77,11 +207,21 @@ class RedisProcessor:
             if password:
                 redis_url = f"redis://:{password}@{self.redis_config['host']}:{self.redis_config['port']}"
             
-            self.redis_client = await redis.from_url(
-                redis_url,
-                decode_responses=True,
-                db=self.redis_config.get("db", 0)
-            )
+            # Dedicated pool; payloads stay bytes so SpanDecoder parses them without a str copy
+            pool_options = {
+                "decode_responses": False,
+                "db": self.redis_config.get("db", 0),
+                "max_connections": self.redis_config.get("max_connections"),
+                "socket_keepalive": self.redis_config.get("socket_keepalive", True),
+                "health_check_interval": self.redis_config.get("health_check_interval_seconds", 30)
+            }
+            parser_class = _parser_class(self.redis_config.get("redis_parser", "auto"))
+            if parser_class is not None:
+                pool_options["parser_class"] = parser_class
+            
+            self.redis_pool = redis.ConnectionPool.from_url(redis_url, **pool_options)
+            self.redis_client = redis.Redis(connection_pool=self.redis_pool)
+            await self.redis_client.ping()
             
             logger.info(
                 f"Connected to Redis: {self.redis_config['host']}:{self.redis_config['port']}"
@@ -95,15 +235,24 @@ class RedisProcessor:
         """Start processing traces from Redis"""
         self.running = True
         
+        await start_metrics_server(self.metrics_config)
+        
         # Connect to Redis
         await self.connect()
         
-        # Subscribe to channel
-        channel = f"spans:{self.runtime_id}"
-        self.pubsub = self.redis_client.pubsub()
-        await self.pubsub.subscribe(channel)
-        
-        logger.info(f"Subscribed to Redis channel: {channel}")
+        if self.ingestion_mode == "stream":
+            await self._ensure_consumer_group()
+            logger.info(
+                f"Reading Redis stream {self.stream_key} as consumer "
+                f"{self.consumer_name} in group {self.consumer_group}"
+            )
+        else:
+            # Subscribe to channel
+            channel = f"spans:{self.runtime_id}"
+            self.pubsub = self.redis_client.pubsub()
+            await self.pubsub.subscribe(channel)
+            
+            logger.info(f"Subscribed to Redis channel: {channel}")
         
         # Start worker pool
         for i in range(self.num_workers):
@@ -112,111 +261,494 @@ class RedisProcessor:
         
         logger.info(f"Started {self.num_workers} Redis processor workers")
         
+        self.sweep_task = asyncio.create_task(self._sweep_loop())
+        self.completion_task = asyncio.create_task(self._completion_loop())
+        
         # Start listening for messages
-        await self._listen_for_spans()
+        if self.ingestion_mode == "stream":
+            self.claim_task = asyncio.create_task(self._claim_loop())
+            await self._listen_for_stream()
+        else:
+            await self._listen_for_spans()
+    
+    async def _ensure_consumer_group(self):
+        """Create the consumer group (and the stream) if it does not exist yet"""
+        try:
+            await self.redis_client.xgroup_create(
+                self.stream_key,
+                self.consumer_group,
+                id=self.stream_start_id,
+                mkstream=True
+            )
+            logger.info(f"Created consumer group {self.consumer_group} on {self.stream_key}")
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+    
+    async def _listen_for_stream(self):
+        """Read span entries from the Redis stream through the consumer group"""
+        # Replay entries delivered to this consumer before a restart ("0"),
+        # then switch to new entries (">")
+        last_id = "0"
+        
+        try:
+            while self.running:
+                response = await self.redis_client.xreadgroup(
+                    self.consumer_group,
+                    self.consumer_name,
+                    {self.stream_key: last_id},
+                    count=self.stream_batch_size,
+                    block=self.stream_block_ms if last_id == ">" else None
+                )
+                entries = response[0][1] if response else []
+                
+                if last_id != ">":
+                    if not entries:
+                        logger.info("Finished replaying pending stream entries")
+                        last_id = ">"
+                        continue
+                    last_id = entries[-1][0]
+                
+                await self._handle_stream_entries(entries)
+        
+        except asyncio.CancelledError:
+            logger.info("Redis stream listener cancelled")
+        except Exception as e:
+            logger.error(f"Error in Redis stream listener: {e}")
+    
+    async def _handle_stream_entries(self, entries: List[Tuple[bytes, Dict[bytes, bytes]]]):
+        """
+        Handle a batch of stream entries.
+        
+        Args:
+            entries: (entry ID, fields) pairs from XREADGROUP or XAUTOCLAIM
+        """
+        spans: List[Tuple[SpanRecord, Optional[bytes], int]] = []
+        invalid: List[bytes] = []
+        
+        for message_id, fields in entries:
+            # Still held by this consumer (e.g. reclaimed from ourselves while queued)
+            if message_id in self.inflight_message_ids:
+                continue
+            self.inflight_message_ids.add(message_id)
+            
+            raw = fields.get(self.stream_field_key) if fields else None
+            if raw is None:
+                logger.warning(f"Stream entry {message_id} has no '{self.stream_field}' field")
+                invalid.append(message_id)
+                continue
+            
+            try:
+                spans.append((self.span_decoder.decode(raw), message_id, len(raw)))
+            except SpanDecodeError as e:
+                logger.error(f"Failed to parse span JSON: {e}")
+                invalid.append(message_id)
+            except Exception as e:
+                # Never let one poison entry stop the reader (it would be reclaimed forever)
+                logger.error(f"Failed to decode stream entry {message_id}: {e}")
+                invalid.append(message_id)
+        
+        await self._ack(*invalid)
+        await self._handle_spans(spans)
+    
+    async def _claim_loop(self):
+        """Periodically take over pending entries from dead consumers with XAUTOCLAIM"""
+        start_id = "0-0"
+        
+        while self.running:
+            try:
+                result = await self.redis_client.xautoclaim(
+                    self.stream_key,
+                    self.consumer_group,
+                    self.consumer_name,
+                    min_idle_time=self.claim_min_idle_ms,
+                    start_id=start_id,
+                    count=self.stream_batch_size
+                )
+                start_id, entries = result[0], result[1]
+                
+                if entries:
+                    logger.info(f"Claimed {len(entries)} pending stream entries")
+                    await self._handle_stream_entries(entries)
+                
+                # Full scan of the pending entries list done, wait for next round
+                if start_id in ("0-0", b"0-0"):
+                    await asyncio.sleep(self.claim_interval_seconds)
+            
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error claiming pending stream entries: {e}")
+                await asyncio.sleep(self.claim_interval_seconds)
+    
+    async def _ack(self, *message_ids: bytes):
+        """Acknowledge stream entries so they leave the pending entries list"""
+        message_ids = [message_id for message_id in message_ids if message_id]
+        if not message_ids or self.ingestion_mode != "stream":
+            return
+        
+        self.inflight_message_ids.difference_update(message_ids)
+        
+        try:
+            await self.redis_client.xack(self.stream_key, self.consumer_group, *message_ids)
+        except Exception as e:
+            logger.error(f"Failed to acknowledge {len(message_ids)} stream entries: {e}")
+    
+    def _release(self, trace_id: str, message_ids: List[bytes]):
+        """
+        Give up a trace without acknowledging it (evaluation failed or trace dropped).
+        
+        Its stream entries stay pending and are redelivered via XAUTOCLAIM, and the
+        trace is no longer completed, so the redelivered spans rebuild and re-evaluate it.
+        
+        Args:
+            trace_id: Trace identifier
+            message_ids: Stream entry IDs of the trace
+        """
+        if not message_ids:
+            return
+        self.inflight_message_ids.difference_update(message_ids)
+        self.completion.uncomplete(trace_id)
+        
+        for message_id in message_ids:
+            self.released_message_ids[message_id] = None
+        while len(self.released_message_ids) > self.max_released_message_ids:
+            self.released_message_ids.popitem(last=False)
     
     async def _listen_for_spans(self):
-        """Listen for span messages from Redis"""
+        """
+        Listen for span messages from Redis.
+        
+        Each wakeup drains up to pubsub_batch_size messages that are already
+        waiting, decodes them and applies them to the buffer as one batch.
+        """
         try:
-            async for message in self.pubsub.listen():
-                if not self.running:
-                    break
+            while self.running:
+                message = await self.pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=self.pubsub_poll_timeout
+                )
+                if message is None:
+                    continue
+                
+                messages = [message]
+                while len(messages) < self.pubsub_batch_size:
+                    message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=0)
+                    if message is None:
+                        break
+                    messages.append(message)
                 
-                if message["type"] == "message":
+                spans: List[Tuple[SpanRecord, Optional[bytes], int]] = []
+                for message in messages:
+                    if message["type"] != "message":
+                        continue
                     try:
-                        span_data = json.loads(message["data"])
-                        await self._handle_span(span_data)
-                    except json.JSONDecodeError as e:
+                        spans.append((self.span_decoder.decode(message["data"]), None, len(message["data"])))
+                    except SpanDecodeError as e:
                         logger.error(f"Failed to parse span JSON: {e}")
                     except Exception as e:
-                        logger.error(f"Error handling span: {e}")
+                        # One malformed message must not stop the listener
+                        logger.error(f"Failed to decode span message: {e}")
+                
+                await self._handle_spans(spans)
         
         except asyncio.CancelledError:
             logger.info("Redis listener cancelled")
         except Exception as e:
             logger.error(f"Error in Redis listener: {e}")
     
-    async def _handle_span(self, span_data: Dict[str, Any]):
+    async def _handle_spans(self, spans: List[Tuple[SpanRecord, Optional[bytes], int]]):
+        """
+        Apply a batch of decoded spans to the trace buffer, then act on the outcome once:
+        acknowledge dropped spans, handle evicted traces and dispatch completed traces.
+        
+        Args:
+            spans: (span, stream entry ID or None, raw message size) tuples
+        """
+        batch = _SpanBatch()
+        SPANS_RECEIVED.inc(len(spans))
+        
+        for span, message_id, size_bytes in spans:
+            try:
+                self._apply_span(span, message_id, size_bytes, batch)
+            except Exception as e:
+                logger.error(f"Error handling span: {e}")
+                # Left pending, so the entry is retried once reclaimed
+                self.inflight_message_ids.discard(message_id)
+        
+        await self._ack(*batch.acks)
+        
+        for stale_entry in batch.stale:
+            await self._handle_stale_trace(stale_entry, reason="evicted")
+        
+        for entry in batch.completed:
+            await self._enqueue_trace(entry)
+    
+    def _apply_span(
+        self,
+        span: SpanRecord,
+        message_id: Optional[bytes],
+        size_bytes: int,
+        batch: _SpanBatch
+    ):
         """
-        Handle incoming span message.
+        Add one span to the trace buffer and completion tracking.
         
         Args:
-            span_data: Span data from Redis
+            span: Decoded span from Redis
+            message_id: Stream entry ID (stream ingestion mode only)
+            size_bytes: Raw message size, counted against the buffer byte budget
+            batch: Collects the effects to carry out for the batch
         """
-        trace_id = span_data.get("context", {}).get("trace_id")
+        trace_id = span.trace_id
         
         if not trace_id:
             logger.warning("Received span without trace_id")
+            batch.acks.append(message_id)
             return
         
-        # Filter: only process LLM and TOOL spans
-        span_kind = span_data.get("span_kind")
-        if span_kind not in ["LLM", "TOOL"]:
-            logger.debug(f"Ignoring span kind: {span_kind}")
-            return
+        # Only LLM and TOOL spans are buffered, but every span drives completion
+        span_kind = span.span_kind
+        evaluated = span_kind in EVALUATED_SPAN_KINDS
+        
+        redelivered = message_id is not None and message_id in self.released_message_ids
+        if redelivered:
+            del self.released_message_ids[message_id]
+        
+        # Span for a trace that was already evaluated; a redelivered entry of a
+        # released trace is a retry, not a late span
+        if redelivered and self.completion.is_completed(trace_id):
+            self.completion.uncomplete(trace_id)
+        elif self.completion.is_completed(trace_id):
+            if not evaluated or self.completion.late_span_policy == "dedupe":
+                self.completion.record_late_span(reevaluated=False)
+                logger.debug(f"Dropping late {span_kind} span for evaluated trace {trace_id}")
+                batch.acks.append(message_id)
+                return
+            
+            reopened = self.completion.reopen(trace_id)
+            if reopened is not None:
+                self.completion.record_late_span(reevaluated=True)
+                logger.info(f"Late {span_kind} span for trace {trace_id}, re-evaluating")
+                self.trace_buffer.restore(reopened)
+        
+        if not evaluated:
+            logger.debug(f"Not buffering span kind: {span_kind}")
         
         # Add to trace buffer
-        if trace_id not in self.trace_buffer:
-            self.trace_buffer[trace_id] = []
+        entry, evicted = self.trace_buffer.add(
+            trace_id,
+            span if evaluated else None,
+            size_bytes if evaluated else 0,
+            message_id
+        )
         
-        self.trace_buffer[trace_id].append(span_data)
+        batch.stale.extend(evicted)
         
-        # Check if trace is complete
-        if self._is_trace_complete(trace_id, span_data):
-            await self._process_complete_trace(trace_id)
+        # Check if trace is complete; later spans of the batch count as late spans
+        if trace_id in self.trace_buffer and self.completion.observe(entry, span):
+            completed = self._take_complete_trace(trace_id)
+            if completed is not None:
+                batch.completed.append(completed)
     
-    def _is_trace_complete(self, trace_id: str, span_data: Dict[str, Any]) -> bool:
+    def _take_complete_trace(self, trace_id: str) -> Optional[BufferedTrace]:
         """
-        Determine if trace is complete.
+        Remove a complete trace from the buffer and mark it completed.
         
-        Simple heuristic: trace is complete when we receive a span with status "OK"
-        and it's the root span (parent_id is None or empty).
-        
-        You may need to adjust this logic based on your trace format.
+        Args:
+            trace_id: Trace identifier
+            
+        Returns:
+            Trace entry to hand to the workers, or None if it is no longer buffered
         """
-        parent_id = span_data.get("parent_id")
-        status = span_data.get("status", {}).get("status_code")
+        entry = self.trace_buffer.pop(trace_id)
+        if entry is None:
+            self.completion.discard(trace_id)
+            return None
         
-        # Root span with OK status indicates trace completion
-        return (parent_id is None or parent_id == "") and status == "OK"
+        self.completion.mark_completed(entry)
+        return entry
     
-    async def _process_complete_trace(self, trace_id: str):
+    async def _complete_trace(self, trace_id: str):
         """
-        Process a complete trace.
+        Remove a complete trace from the buffer and hand it to the workers.
         
         Args:
             trace_id: Trace identifier
         """
-        try:
-            spans = self.trace_buffer.pop(trace_id, [])
+        entry = self._take_complete_trace(trace_id)
+        if entry is not None:
+            await self._enqueue_trace(entry)
+    
+    async def _completion_loop(self):
+        """Complete traces whose root span ended and whose grace window has passed"""
+        while self.running:
+            try:
+                await asyncio.sleep(self.completion_check_interval)
+                
+                for trace_id in self.completion.due():
+                    await self._complete_trace(trace_id)
+            
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error completing traces: {e}")
+    
+    def get_completion_stats(self) -> Dict[str, Any]:
+        """
+        Get trace completion statistics.
+        
+        Returns:
+            Dictionary with grace-window and late-span counters
+        """
+        return self.completion.get_stats()
+    
+    async def _handle_stale_trace(self, entry: BufferedTrace, reason: str):
+        """
+        Apply expired_trace_policy to a trace that expired or was evicted before completing.
+        
+        Args:
+            entry: Buffered trace removed from the buffer
+            reason: "expired" or "evicted"
+        """
+        if self.trace_buffer.expired_policy == "flush":
+            self.trace_buffer.record_outcome(flushed=True)
+            logger.info(
+                f"Flushing {reason} trace {entry.trace_id} ({len(entry.spans)} spans) "
+                f"for best-effort evaluation"
+            )
+            self.completion.mark_completed(entry)
+            await self._enqueue_trace(entry)
+        else:
+            self.trace_buffer.record_outcome(flushed=False)
+            logger.warning(f"Dropping {reason} trace {entry.trace_id} ({len(entry.spans)} spans)")
+            self.completion.discard(entry.trace_id)
+            await self._ack(*entry.message_ids)
+    
+    async def _sweep_loop(self):
+        """Periodically expire idle traces from the trace buffer"""
+        while self.running:
+            try:
+                await asyncio.sleep(self.sweep_interval)
+                
+                for entry in self.trace_buffer.expire():
+                    await self._handle_stale_trace(entry, reason="expired")
             
-            if not spans:
-                logger.warning(f"No spans found for trace {trace_id}")
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error sweeping trace buffer: {e}")
+    
+    def get_buffer_stats(self) -> Dict[str, Any]:
+        """
+        Get trace buffer statistics.
+        
+        Returns:
+            Dictionary with buffer size and completed/evicted/flushed trace counters
+        """
+        return self.trace_buffer.get_stats()
+    
+    async def _enqueue_trace(self, entry: BufferedTrace):
+        """
+        Hand a complete trace over to the worker pool.
+        
+        Applies backpressure according to queue_full_policy when all workers are busy:
+        "block" stops reading spans until a slot frees up, "drop_newest" discards this
+        trace, "drop_oldest" discards the longest-waiting trace. In stream mode dropped
+        traces are not acknowledged, so their entries are redelivered via XAUTOCLAIM.
+        
+        Args:
+            entry: Buffered trace removed from the trace buffer
+        """
+        trace_id, spans, message_ids = entry.trace_id, entry.spans, entry.message_ids
+        
+        if not spans:
+            logger.warning(f"No LLM/TOOL spans found for trace {trace_id}")
+            await self._ack(*message_ids)
+            return
+        
+        item = (trace_id, spans, message_ids, time.monotonic())
+        
+        if self.trace_queue.full():
+            if self.queue_full_policy == "drop_newest":
+                self.queue_stats["dropped"] += 1
+                logger.warning(f"Trace queue full, dropping trace {trace_id}")
+                self._release(trace_id, message_ids)
                 return
             
+            if self.queue_full_policy == "drop_oldest":
+                dropped_trace_id, _, dropped_message_ids, _ = self.trace_queue.get_nowait()
+                self.trace_queue.task_done()
+                self._release(dropped_trace_id, dropped_message_ids)
+                self.queue_stats["dropped"] += 1
+                logger.warning(f"Trace queue full, dropping oldest trace {dropped_trace_id}")
+            else:
+                self.queue_stats["blocked"] += 1
+                logger.debug(f"Trace queue full, waiting for a free worker ({trace_id})")
+        
+        await self.trace_queue.put(item)
+        self.queue_stats["enqueued"] += 1
+    
+    def get_queue_stats(self) -> Dict[str, Any]:
+        """
+        Get worker queue statistics for sizing workers against load.
+        
+        Returns:
+            Dictionary with queue depth, drop/block counts and queue wait times
+        """
+        processed = self.queue_stats["processed"]
+        return {
+            "queue_depth": self.trace_queue.qsize(),
+            "max_queue_size": self.max_queue_size,
+            "num_workers": self.num_workers,
+            "enqueued": self.queue_stats["enqueued"],
+            "processed": processed,
+            "dropped": self.queue_stats["dropped"],
+            "blocked": self.queue_stats["blocked"],
+            "avg_wait_ms": self.queue_stats["total_wait_ms"] / processed if processed else 0.0,
+            "max_wait_ms": self.queue_stats["max_wait_ms"]
+        }
+    
+    async def _process_complete_trace(
+        self,
+        trace_id: str,
+        spans: List[SpanRecord],
+        message_ids: List[bytes]
+    ):
+        """
+        Process a complete trace.
+        
+        Args:
+            trace_id: Trace identifier
+            spans: Buffered spans of the trace
+            message_ids: Stream entry IDs to acknowledge once the result is saved
+        """
+        try:
             logger.info(f"Processing complete trace {trace_id} ({len(spans)} spans)")
             
-            # Parse trace
-            parsed_trace = TraceParser.parse_spans_from_json(spans)
-            
-            # Extract user prompt and model response
-            user_prompt, model_response = TraceParser.extract_user_prompt_and_response(
-                parsed_trace.get("llm_spans", [])
-            )
-            
-            # Run guardrails evaluation
-            evaluation_result = await self.executor.evaluate(parsed_trace)
+            # Parse and evaluate (inline or on the trace's shard process)
+            result = await self.pipeline.evaluate_json_spans(trace_id, [span.to_dict() for span in spans])
+            evaluation_result = result["evaluation_result"]
+            record_timings(result.get("timings"))
             
             # Save results with user prompt and model response
+            save_started = time.perf_counter()
             await self.result_processor.save_evaluation_result(
                 trace_id=trace_id,
                 runtime_id=self.runtime_id,
                 evaluation_result=evaluation_result,
                 source_type="redis",
                 source_reference=f"channel:spans:{self.runtime_id}",
-                user_prompt=user_prompt,
-                model_response=model_response
+                user_prompt=result["user_prompt"],
+                model_response=result["model_response"],
+                content_hash=result.get("content_hash"),
+                cached=result.get("cached", False)
             )
+            STAGE_SECONDS.labels("save").observe(time.perf_counter() - save_started)
+            TRACES_PROCESSED.labels("redis", "processed").inc()
+            
+            # Evaluation saved - spans can leave the pending entries list
+            await self._ack(*message_ids)
             
             logger.info(
                 f"Completed evaluation for trace {trace_id}: "
@@ -225,15 +757,28 @@ class RedisProcessor:
             )
             
         except Exception as e:
+            TRACES_PROCESSED.labels("redis", "failed").inc()
+            # Stream entries stay pending and are reclaimed with XAUTOCLAIM
             logger.error(f"Error processing trace {trace_id}: {e}")
+            self._release(trace_id, message_ids)
     
     async def _worker(self, worker_id: int):
-        """Worker coroutine (placeholder for future enhancements)"""
+        """Worker coroutine - evaluates completed traces from the trace queue"""
         logger.info(f"Redis worker {worker_id} started")
         
         try:
             while self.running:
-                await asyncio.sleep(1)  # Keep alive
+                trace_id, spans, message_ids, enqueued_at = await self.trace_queue.get()
+                
+                wait_ms = (time.monotonic() - enqueued_at) * 1000
+                self.queue_stats["total_wait_ms"] += wait_ms
+                self.queue_stats["max_wait_ms"] = max(self.queue_stats["max_wait_ms"], wait_ms)
+                
+                try:
+                    await self._process_complete_trace(trace_id, spans, message_ids)
+                finally:
+                    self.queue_stats["processed"] += 1
+                    self.trace_queue.task_done()
         except asyncio.CancelledError:
             logger.info(f"Redis worker {worker_id} cancelled")
     
@@ -242,6 +787,14 @@ class RedisProcessor:
         logger.info("Stopping Redis processor...")
         self.running = False
         
+        for task in (self.claim_task, self.sweep_task, self.completion_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        
         # Cancel workers
         for task in self.worker_tasks:
             task.cancel()
@@ -255,7 +808,14 @@ class RedisProcessor:
         
         if self.redis_client:
             await self.redis_client.close()
+            await self.redis_pool.disconnect()
         
         await self.result_processor.close()
+        await self.pipeline.close()
+        
+        # Drop the gauges so they stop referencing (and reporting) this processor
+        for gauge in (TRACE_BUFFER_TRACES, TRACE_BUFFER_SPANS, TRACE_BUFFER_BYTES, TRACE_QUEUE_DEPTH):
+            gauge.remove(self.runtime_id)
+        await stop_metrics_server(self.metrics_config)
         
         logger.info("Redis processor stopped")
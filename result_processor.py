@@ -3,13 +3,22 @@ Result processor - saves evaluation results to MongoDB, sends Kafka notification
 """
 
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Set
 from datetime import datetime
-from motor.motor_asyncio import AsyncIOMotorClient
 
 from guardrails_eval.models.mongodb_models import TaskRegistryRecord, TraceExport, ProcessingStatus
 from guardrails_eval.utils.kafka_notifier import get_kafka_notifier
 from guardrails_eval.exporters.arize_exporter import ArizeExporter
+from guardrails_eval.processors.bulk_writer import TaskRegistryBulkWriter
+from guardrails_eval.processors.result_sinks import (
+    ResultSink,
+    SinkFanout,
+    TaskRegistrySink,
+    KafkaBreachSink,
+    ArizeBreachAlertSink,
+    ArizeEvaluationSink
+)
+from guardrails_eval.utils.mongodb_client import get_mongo_client, release_mongo_client
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +39,10 @@ class ResultProcessor:
         kafka_config: Dict[str, Any],
         arize_config: Optional[Dict[str, Any]] = None,
         task_registry_collection: str = "TaskRegistry",
-        trace_exports_collection: str = "trace_exports"
+        trace_exports_collection: str = "trace_exports",
+        bulk_write_config: Optional[Dict[str, Any]] = None,
+        mongodb_options: Optional[Dict[str, Any]] = None,
+        sink_config: Optional[Dict[str, Any]] = None
     ):
         """
         Initialize result processor.
@@ -42,19 +54,58 @@ class ResultProcessor:
             arize_config: Arize configuration (optional)
             task_registry_collection: TaskRegistry collection name
             trace_exports_collection: TraceExports collection name
+            bulk_write_config: TaskRegistry write batching configuration (optional)
+            mongodb_options: Pool/compression options for the shared client (optional)
+            sink_config: Result sink fan-out configuration, e.g. max_pending_writes (optional)
         """
-        self.client = AsyncIOMotorClient(mongodb_uri)
+        self.mongodb_uri = mongodb_uri
+        self.client = get_mongo_client(mongodb_uri, mongodb_options)
         self.db = self.client[database_name]
         self.task_registry = self.db[task_registry_collection]
         self.trace_exports = self.db[trace_exports_collection]
         
+        # Write-behind batching of TaskRegistry upserts
+        self.task_registry_writer = TaskRegistryBulkWriter(self.task_registry, bulk_write_config or {})
+        
         # Initialize Kafka notifier
         self.kafka_notifier = get_kafka_notifier(kafka_config)
         
         # Initialize Arize exporter
         self.arize_exporter = ArizeExporter(arize_config or {})
+        
+        # MongoDB (critical) is awaited by callers; Kafka and Arize follow in the background
+        kafka_timeout = kafka_config.get("sink_timeout_seconds", 10.0)
+        arize_timeout = (arize_config or {}).get("sink_timeout_seconds", 10.0)
+        self.sink_fanout = SinkFanout([
+            TaskRegistrySink(
+                self.task_registry_writer,
+                timeout_seconds=(bulk_write_config or {}).get("sink_timeout_seconds", 30.0)
+            ),
+            KafkaBreachSink(self.kafka_notifier, timeout_seconds=kafka_timeout),
+            ArizeBreachAlertSink(self.arize_exporter, timeout_seconds=arize_timeout),
+            ArizeEvaluationSink(self.arize_exporter, timeout_seconds=arize_timeout)
+        ], max_pending_writes=(sink_config or {}).get("max_pending_writes", 1000))
+        
         logger.info(f"ResultProcessor initialized - Arize enabled: {self.arize_exporter.enabled}")
     
+    def add_sink(self, sink: ResultSink):
+        """
+        Register an additional result sink.
+        
+        Args:
+            sink: Sink to receive every evaluation result
+        """
+        self.sink_fanout.add_sink(sink)
+    
+    def get_sink_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get per-sink latency and error counters.
+        
+        Returns:
+            Dictionary of sink name -> statistics
+        """
+        return self.sink_fanout.get_stats()
+    
     async def save_evaluation_result(
         self,
         trace_id: str,
@@ -63,11 +114,17 @@ class ResultProcessor:
         source_type: str = "redis",
         source_reference: str = None,
         user_prompt: str = None,
-        model_response: str = None
+        model_response: str = None,
+        content_hash: str = None,
+        cached: bool = False
     ) -> str:
         """
         Save evaluation result to TaskRegistry.
         
+        A cached result (see CachedTracePipeline) whose trace already has a record
+        with the same content_hash is not written again, and not re-sent to
+        Kafka or Arize.
+        
         Args:
             trace_id: Trace identifier
             runtime_id: Runtime identifier
@@ -76,11 +133,17 @@ class ResultProcessor:
             source_reference: Reference to source (CSV filename, Redis key)
             user_prompt: User prompt extracted from trace
             model_response: Model response extracted from trace
+            content_hash: Trace content hash (parsed trace + guardrail config version)
+            cached: Whether evaluation_result was reused from the evaluation cache
             
         Returns:
             Inserted document ID
         """
         try:
+            if cached and content_hash and await self._is_unchanged(trace_id, content_hash):
+                logger.info(f"Skipped saving trace {trace_id} - result unchanged")
+                return trace_id
+            
             # Build TaskRegistry record
             record = TaskRegistryRecord(
                 trace_id=trace_id,
@@ -105,55 +168,62 @@ class ResultProcessor:
             record_dict = record.model_dump(by_alias=True, exclude_none=True)
             if "_id" in record_dict and record_dict["_id"] is None:
                 del record_dict["_id"]
+            if content_hash:
+                record_dict["content_hash"] = content_hash
             
-            result = await self.task_registry.update_one(
-                {"trace_id": trace_id},
-                {"$set": record_dict},
-                upsert=True
-            )
+            # Upsert to MongoDB, then Kafka (breaches) and Arize in the background;
+            # waits for the TaskRegistry upsert only, raises if it failed
+            sink_results = await self.sink_fanout.dispatch({
+                "trace_id": trace_id,
+                "runtime_id": runtime_id,
+                "evaluation_result": evaluation_result,
+                "record": record_dict,
+                "user_prompt": user_prompt,
+                "model_response": model_response
+            })
             
             logger.info(
                 f"Saved evaluation result for trace {trace_id} "
                 f"(breached: {record.breached_status})"
             )
             
-            # Send Kafka notification if breach detected
-            if record.breached_status:
-                await self.kafka_notifier.send_breach_notification(
-                    trace_id=trace_id,
-                    runtime_id=runtime_id,
-                    breach_details=evaluation_result.get("breach_details", {}),
-                    evaluation_result=evaluation_result
-                )
-                
-                # Send breach alert to Arize
-                await self.arize_exporter.export_breach_alert(
-                    trace_id=trace_id,
-                    runtime_id=runtime_id,
-                    breach_details=evaluation_result.get("breach_details", {})
-                )
-            
-            # Export evaluation result to Arize (async, non-blocking)
-            await self.arize_exporter.export_evaluation_result(
-                trace_id=trace_id,
-                runtime_id=runtime_id,
-                evaluation_result=evaluation_result,
-                user_prompt=user_prompt,
-                model_response=model_response,
-                trace_metadata=evaluation_result.get("trace_metadata", {})
-            )
-            
-            return str(result.upserted_id) if result.upserted_id else trace_id
+            return sink_results.get(TaskRegistrySink.name) or trace_id
             
         except Exception as e:
             logger.error(f"Failed to save evaluation result for trace {trace_id}: {e}")
             raise
     
+    async def _is_unchanged(self, trace_id: str, content_hash: str) -> bool:
+        """Whether the trace's TaskRegistry record was saved from the same content"""
+        doc = await self.task_registry.find_one(
+            {"trace_id": trace_id, "content_hash": content_hash},
+            {"_id": 1}
+        )
+        return doc is not None
+    
+    async def find_saved_trace_ids(self, trace_ids: List[str], source_reference: str) -> Set[str]:
+        """
+        Find which traces of a source already have a TaskRegistry record (one query).
+        
+        Args:
+            trace_ids: Trace identifiers to check
+            source_reference: Reference to source (CSV filename)
+            
+        Returns:
+            Subset of trace_ids already saved
+        """
+        cursor = self.task_registry.find(
+            {"trace_id": {"$in": trace_ids}, "source_reference": source_reference},
+            {"trace_id": 1, "_id": 0}
+        )
+        return {doc["trace_id"] async for doc in cursor}
+    
     async def update_trace_export_status(
         self,
         csv_filename: str,
         status: ProcessingStatus,
-        error_message: str = None
+        error_message: str = None,
+        worker_id: str = None
     ):
         """
         Update TraceExports record status (for HPOS processor).
@@ -162,6 +232,7 @@ class ResultProcessor:
             csv_filename: CSV filename
             status: New status (running, completed, failed)
             error_message: Error message if failed
+            worker_id: Lease holder; if given, only updated while this worker holds the lease
         """
         try:
             update_data = {
@@ -174,10 +245,22 @@ class ResultProcessor:
             elif status == ProcessingStatus.FAILED:
                 update_data["error_message"] = error_message
             
-            result = await self.trace_exports.update_one(
-                {"csv_filename": csv_filename},
-                {"$set": update_data}
-            )
+            query = {"csv_filename": csv_filename}
+            if worker_id:
+                query["worker_id"] = worker_id
+            
+            update = {"$set": update_data}
+            if status in (ProcessingStatus.COMPLETED, ProcessingStatus.FAILED):
+                update["$unset"] = {"lease_expires_at": ""}
+            
+            result = await self.trace_exports.update_one(query, update)
+            
+            if worker_id and result.matched_count == 0:
+                logger.warning(
+                    f"TraceExports status for {csv_filename} not updated - "
+                    f"lease no longer held by {worker_id}"
+                )
+                return
             
             logger.info(f"Updated TraceExports status for {csv_filename}: {status.value}")
             
@@ -187,7 +270,9 @@ class ResultProcessor:
     
     async def close(self):
         """Close connections"""
-        self.client.close()
+        await self.sink_fanout.close()
+        await self.task_registry_writer.close()
+        release_mongo_client(self.mongodb_uri)
         self.kafka_notifier.close()
         await self.arize_exporter.close()
         logger.info("ResultProcessor closed")
@@ -0,0 +1,255 @@
+"""
+Result sinks - concurrent fan-out of evaluation results to MongoDB, Kafka and Arize.
+"""
+
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional, Set
+
+from guardrails_eval.utils.metrics import SINK_ERRORS, SINK_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class ResultSink(ABC):
+    """
+    Destination for evaluation results.
+    
+    Critical sinks are awaited by the caller and their failures propagate;
+    non-critical sinks run in the background once the critical sinks have
+    succeeded, and their failures are only counted.
+    """
+    
+    name = "sink"
+    
+    def __init__(self, critical: bool = False, timeout_seconds: Optional[float] = None):
+        """
+        Initialize sink.
+        
+        Args:
+            critical: Whether the caller waits for (and fails with) this sink
+            timeout_seconds: Per-write timeout (None for no timeout)
+        """
+        self.critical = critical
+        self.timeout_seconds = timeout_seconds
+    
+    @abstractmethod
+    async def write(self, result: Dict[str, Any]) -> Any:
+        """
+        Write one evaluation result.
+        
+        Args:
+            result: Dictionary with trace_id, runtime_id, evaluation_result, record,
+                user_prompt and model_response
+        """
+
+
+class TaskRegistrySink(ResultSink):
+    """Upserts the TaskRegistry record (through the bulk writer)"""
+    
+    name = "mongodb"
+    
+    def __init__(self, writer, critical: bool = True, timeout_seconds: Optional[float] = None):
+        super().__init__(critical, timeout_seconds)
+        self.writer = writer
+    
+    async def write(self, result: Dict[str, Any]) -> Optional[str]:
+        return await self.writer.upsert(result["trace_id"], result["record"])
+
+
+class KafkaBreachSink(ResultSink):
+    """Sends a Kafka breach notification for breached traces"""
+    
+    name = "kafka"
+    
+    def __init__(self, kafka_notifier, critical: bool = False, timeout_seconds: Optional[float] = None):
+        super().__init__(critical, timeout_seconds)
+        self.kafka_notifier = kafka_notifier
+    
+    async def write(self, result: Dict[str, Any]) -> Any:
+        evaluation_result = result["evaluation_result"]
+        if not evaluation_result.get("breached_status"):
+            return None
+        
+        return await self.kafka_notifier.send_breach_notification(
+            trace_id=result["trace_id"],
+            runtime_id=result["runtime_id"],
+            breach_details=evaluation_result.get("breach_details", {}),
+            evaluation_result=evaluation_result
+        )
+
+
+class ArizeBreachAlertSink(ResultSink):
+    """Sends a breach alert to Arize for breached traces"""
+    
+    name = "arize_alert"
+    
+    def __init__(self, arize_exporter, critical: bool = False, timeout_seconds: Optional[float] = None):
+        super().__init__(critical, timeout_seconds)
+        self.arize_exporter = arize_exporter
+    
+    async def write(self, result: Dict[str, Any]) -> Any:
+        evaluation_result = result["evaluation_result"]
+        if not evaluation_result.get("breached_status"):
+            return None
+        
+        return await self.arize_exporter.export_breach_alert(
+            trace_id=result["trace_id"],
+            runtime_id=result["runtime_id"],
+            breach_details=evaluation_result.get("breach_details", {})
+        )
+
+
+class ArizeEvaluationSink(ResultSink):
+    """Exports the evaluation result to Arize"""
+    
+    name = "arize_evaluation"
+    
+    def __init__(self, arize_exporter, critical: bool = False, timeout_seconds: Optional[float] = None):
+        super().__init__(critical, timeout_seconds)
+        self.arize_exporter = arize_exporter
+    
+    async def write(self, result: Dict[str, Any]) -> Any:
+        evaluation_result = result["evaluation_result"]
+        
+        return await self.arize_exporter.export_evaluation_result(
+            trace_id=result["trace_id"],
+            runtime_id=result["runtime_id"],
+            evaluation_result=evaluation_result,
+            user_prompt=result.get("user_prompt"),
+            model_response=result.get("model_response"),
+            trace_metadata=evaluation_result.get("trace_metadata", {})
+        )
+
+
+class SinkFanout:
+    """
+    Dispatches each evaluation result to all sinks.
+    
+    Critical sinks run concurrently and the caller waits for them; only once
+    they all succeeded are the non-critical sinks started in the background,
+    so a failed (and later retried) save sends no notifications. At most
+    max_pending_writes background writes are in flight; further writes are
+    dropped and counted. Every sink write has its own timeout, and per-sink
+    latency, error, timeout and drop counters are kept.
+    """
+    
+    def __init__(self, sinks: Optional[List[ResultSink]] = None, max_pending_writes: int = 1000):
+        """
+        Initialize fan-out.
+        
+        Args:
+            sinks: Initial sinks
+            max_pending_writes: Bound on in-flight background (non-critical) writes
+        """
+        self.sinks: List[ResultSink] = []
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self.background_tasks: Set[asyncio.Task] = set()
+        self.max_pending_writes = max_pending_writes
+        
+        for sink in sinks or []:
+            self.add_sink(sink)
+    
+    def add_sink(self, sink: ResultSink):
+        """Register an additional sink"""
+        self.sinks.append(sink)
+        self.stats[sink.name] = {
+            "writes": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "dropped": 0,
+            "total_latency_ms": 0.0,
+            "max_latency_ms": 0.0
+        }
+    
+    async def dispatch(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Write a result to all sinks.
+        
+        Args:
+            result: Evaluation result context (see ResultSink.write)
+            
+        Returns:
+            Return values of the critical sinks, by sink name
+            
+        Raises:
+            Exception: First failure of a critical sink
+        """
+        critical = [sink for sink in self.sinks if sink.critical]
+        values = await asyncio.gather(*[self._write(sink, result) for sink in critical])
+        
+        for sink in self.sinks:
+            if sink.critical:
+                continue
+            
+            if len(self.background_tasks) >= self.max_pending_writes:
+                self.stats[sink.name]["dropped"] += 1
+                SINK_ERRORS.labels(sink.name, "dropped").inc()
+                logger.warning(
+                    f"Sink {sink.name} skipped for trace {result['trace_id']} - "
+                    f"{self.max_pending_writes} background writes pending"
+                )
+                continue
+            
+            task = asyncio.create_task(self._write(sink, result))
+            self.background_tasks.add(task)
+            task.add_done_callback(self.background_tasks.discard)
+        
+        return {sink.name: value for sink, value in zip(critical, values)}
+    
+    async def _write(self, sink: ResultSink, result: Dict[str, Any]) -> Any:
+        """Run one sink write with timeout and bookkeeping"""
+        stats = self.stats[sink.name]
+        started = time.perf_counter()
+        
+        try:
+            return await asyncio.wait_for(sink.write(result), sink.timeout_seconds)
+        
+        except asyncio.TimeoutError:
+            stats["timeouts"] += 1
+            SINK_ERRORS.labels(sink.name, "timeout").inc()
+            logger.error(
+                f"Sink {sink.name} timed out after {sink.timeout_seconds}s "
+                f"for trace {result['trace_id']}"
+            )
+            if sink.critical:
+                raise
+        
+        except Exception as e:
+            stats["errors"] += 1
+            SINK_ERRORS.labels(sink.name, "error").inc()
+            logger.error(f"Sink {sink.name} failed for trace {result['trace_id']}: {e}")
+            if sink.critical:
+                raise
+        
+        finally:
+            elapsed = time.perf_counter() - started
+            SINK_SECONDS.labels(sink.name).observe(elapsed)
+            latency_ms = elapsed * 1000
+            stats["writes"] += 1
+            stats["total_latency_ms"] += latency_ms
+            stats["max_latency_ms"] = max(stats["max_latency_ms"], latency_ms)
+        
+        return None
+    
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get per-sink statistics.
+        
+        Returns:
+            Dictionary of sink name -> writes, errors, timeouts, dropped, avg/max latency
+        """
+        return {
+            name: {
+                **stats,
+                "avg_latency_ms": stats["total_latency_ms"] / stats["writes"] if stats["writes"] else 0.0
+            }
+            for name, stats in self.stats.items()
+        }
+    
+    async def close(self):
+        """Wait for background sink writes to finish"""
+        if self.background_tasks:
+            await asyncio.gather(*self.background_tasks, return_exceptions=True)
@@ -0,0 +1,152 @@
+"""
+S3 stream - seekable file object over an S3 object, fetched as parallel byte ranges.
+"""
+
+import io
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+class S3RangeReader(io.RawIOBase):
+    """
+    Read-only file object over an S3 object.
+    
+    The object is split into part_size byte ranges; up to max_concurrency ranges
+    ahead of the read position are fetched in parallel threads, so a consumer
+    (e.g. a CSV parser) can start on the first part while the rest downloads.
+    Memory is bounded by max_concurrency * part_size. Seeking is supported
+    (columnar formats read their footer first).
+    
+    Blocking - use from a worker thread, not the event loop.
+    """
+    
+    def __init__(
+        self,
+        s3_client,
+        bucket: str,
+        key: str,
+        size: int,
+        part_size: int = 8 * 1024 * 1024,
+        max_concurrency: int = 8
+    ):
+        """
+        Initialize reader.
+        
+        Args:
+            s3_client: boto3 S3 client (thread-safe)
+            bucket: S3 bucket
+            key: S3 key
+            size: Object size in bytes (from head_object)
+            part_size: Byte range size per request
+            max_concurrency: Parallel range requests (read-ahead window)
+        """
+        super().__init__()
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.size = size
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.num_parts = (size + part_size - 1) // part_size
+        
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="s3-range")
+        self._parts: Dict[int, Future] = {}  # part index -> future with the part's bytes
+        self._pos = 0
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def tell(self) -> int:
+        return self._pos
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        
+        self._pos = max(0, self._pos)
+        return self._pos
+    
+    def readinto(self, buffer) -> int:
+        if self._pos >= self.size:
+            return 0
+        
+        part = self._pos // self.part_size
+        self._schedule(part)
+        data = self._parts[part].result()
+        
+        offset = self._pos - part * self.part_size
+        count = min(len(buffer), len(data) - offset)
+        buffer[:count] = data[offset:offset + count]
+        self._pos += count
+        
+        # Part fully consumed - release it
+        if offset + count >= len(data):
+            self._parts.pop(part, None)
+        
+        return count
+    
+    def _schedule(self, part: int):
+        """Fetch the current part and the read-ahead window; drop parts behind it"""
+        for stale in [index for index in self._parts if index < part]:
+            self._parts.pop(stale).cancel()
+        
+        for index in range(part, min(part + self.max_concurrency, self.num_parts)):
+            if index not in self._parts:
+                self._parts[index] = self._pool.submit(self._fetch_part, index)
+    
+    def _fetch_part(self, part: int) -> bytes:
+        start = part * self.part_size
+        end = min(start + self.part_size, self.size) - 1
+        response = self.s3_client.get_object(
+            Bucket=self.bucket,
+            Key=self.key,
+            Range=f"bytes={start}-{end}"
+        )
+        return response['Body'].read()
+    
+    def close(self):
+        if not self.closed:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._parts.clear()
+        super().close()
+
+
+def open_s3_stream(
+    s3_client,
+    bucket: str,
+    key: str,
+    part_size: int = 8 * 1024 * 1024,
+    max_concurrency: int = 8,
+    buffer_size: int = 1024 * 1024
+) -> io.BufferedReader:
+    """
+    Open an S3 object as a buffered, seekable binary stream (blocking).
+    
+    Args:
+        s3_client: boto3 S3 client
+        bucket: S3 bucket
+        key: S3 key
+        part_size: Byte range size per request
+        max_concurrency: Parallel range requests
+        buffer_size: Read buffer size
+        
+    Returns:
+        Binary file object
+    """
+    size = s3_client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+    logger.debug(f"Streaming s3://{bucket}/{key} ({size} bytes) in {part_size}-byte ranges")
+    
+    reader = S3RangeReader(s3_client, bucket, key, size, part_size, max_concurrency)
+    return io.BufferedReader(reader, buffer_size=buffer_size)
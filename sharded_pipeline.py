@@ -0,0 +1,155 @@
+"""
+Sharded pipeline - multi-core trace evaluation in hash-sharded worker processes.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional
+
+from guardrails_eval.processors.trace_pipeline import TracePipeline
+from guardrails_eval.utils.metrics import GUARDRAIL_MEMO_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# Per-process state of a shard worker
+_worker_pipeline: Optional[TracePipeline] = None
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _init_shard_worker(
+    agent_card: Dict[str, Any],
+    guardrail_memo_config: Optional[Dict[str, Any]] = None,
+    goal_config: Optional[Dict[str, Any]] = None,
+    content_hash: bool = False
+):
+    """Build the shard's own pipeline (and executor) from the agent card"""
+    global _worker_pipeline, _worker_loop
+    
+    _worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+    _worker_pipeline = TracePipeline(agent_card, guardrail_memo_config, goal_config, content_hash)
+
+
+def _run_in_shard(method_name: str, *args) -> Dict[str, Any]:
+    """Run a TracePipeline coroutine method on the shard worker's event loop"""
+    method = getattr(_worker_pipeline, method_name)
+    return _worker_loop.run_until_complete(method(*args))
+
+
+class ShardedTracePipeline:
+    """
+    Runs TracePipeline in N worker processes.
+    
+    Traces are routed by a stable hash of trace_id, so all work for one trace
+    lands on the same shard. Each shard is a single-process pool with its own
+    GuardrailsExecutor; the parent process only does I/O and aggregates results.
+    Same interface as TracePipeline.
+    """
+    
+    def __init__(
+        self,
+        agent_card: Dict[str, Any],
+        num_shards: Optional[int] = None,
+        start_method: str = "spawn",
+        guardrail_memo_config: Optional[Dict[str, Any]] = None,
+        goal_config: Optional[Dict[str, Any]] = None,
+        content_hash: bool = False
+    ):
+        """
+        Initialize sharded pipeline.
+        
+        Args:
+            agent_card: Agent card configuration
+            num_shards: Number of worker processes (defaults to CPU count)
+            start_method: multiprocessing start method for the workers
+            guardrail_memo_config: Per-guardrail memoization, applied in each shard (optional)
+            goal_config: Goal inference cache configuration, per shard (optional)
+            content_hash: Compute content hashes in the shards (see TracePipeline)
+        """
+        self.agent_card = agent_card
+        self.guardrail_memo_config = guardrail_memo_config
+        self.goal_config = goal_config
+        self.content_hash = content_hash
+        self.num_shards = num_shards or os.cpu_count() or 1
+        self.mp_context = multiprocessing.get_context(start_method)
+        self.shards: List[ProcessPoolExecutor] = [
+            self._create_shard() for _ in range(self.num_shards)
+        ]
+        
+        logger.info(f"ShardedTracePipeline started {self.num_shards} worker processes")
+    
+    def _create_shard(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=self.mp_context,
+            initializer=_init_shard_worker,
+            initargs=(self.agent_card, self.guardrail_memo_config, self.goal_config, self.content_hash)
+        )
+    
+    def shard_for(self, trace_id: str) -> int:
+        """Stable shard index for a trace (independent of PYTHONHASHSEED)"""
+        return zlib.crc32(trace_id.encode("utf-8")) % self.num_shards
+    
+    async def evaluate_json_spans(self, trace_id: str, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """See TracePipeline.evaluate_json_spans"""
+        return await self._submit(trace_id, "evaluate_json_spans", trace_id, spans)
+    
+    async def evaluate_csv_rows(self, trace_id: str, trace_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """See TracePipeline.evaluate_csv_rows"""
+        return await self._submit(trace_id, "evaluate_csv_rows", trace_id, trace_data)
+    
+    async def prepare_json_spans(self, trace_id: str, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """See TracePipeline.prepare_json_spans"""
+        return await self._submit(trace_id, "prepare_json_spans", trace_id, spans)
+    
+    async def prepare_csv_rows(self, trace_id: str, trace_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """See TracePipeline.prepare_csv_rows"""
+        return await self._submit(trace_id, "prepare_csv_rows", trace_id, trace_data)
+    
+    async def evaluate_prepared(self, trace_id: str, prepared: Dict[str, Any]) -> Dict[str, Any]:
+        """See TracePipeline.evaluate_prepared"""
+        return await self._submit(trace_id, "evaluate_prepared", trace_id, prepared)
+    
+    async def _submit(self, trace_id: str, method_name: str, *args) -> Dict[str, Any]:
+        """Run a pipeline method on the trace's shard"""
+        shard_index = self.shard_for(trace_id)
+        loop = asyncio.get_running_loop()
+        pool = self.shards[shard_index]
+        
+        try:
+            return await loop.run_in_executor(pool, _run_in_shard, method_name, *args)
+        except BrokenProcessPool:
+            # Worker died (e.g. OOM-killed) - replace it so later traces keep flowing;
+            # concurrent failures of the same pool replace it only once
+            if self.shards[shard_index] is pool:
+                logger.error(f"Shard {shard_index} worker died, restarting it")
+                pool.shutdown(wait=False)
+                self.shards[shard_index] = self._create_shard()
+            raise
+    
+    def get_memo_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get per-guardrail memoization statistics.
+        
+        The memos live in the shard processes; their lookups reach this process with
+        each result's timings, so these are the process-wide lookup counters.
+        
+        Returns:
+            Dictionary of guardrail name -> hits, persistent_hits and misses
+        """
+        stats: Dict[str, Dict[str, Any]] = {}
+        for (name, outcome), child in list(GUARDRAIL_MEMO_LOOKUPS.children.items()):
+            stats.setdefault(name, {"hits": 0, "persistent_hits": 0, "misses": 0})[f"{outcome}s"] = int(child.get())
+        return stats
+    
+    async def close(self):
+        """Shut down worker processes"""
+        await asyncio.gather(*[
+            asyncio.to_thread(shard.shutdown, wait=True) for shard in self.shards
+        ])
+        logger.info("ShardedTracePipeline stopped")
@@ -0,0 +1,228 @@
+"""
+Span codec - decodes raw span messages into compact records with only the fields we use.
+"""
+
+import json
+import logging
+from typing import Dict, Any, List, Optional
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class SpanDecodeError(ValueError):
+    """Raised when a span message is not a valid span JSON object"""
+
+
+class SpanRecord:
+    """
+    One buffered span: the fields TraceParser.parse_spans_from_json, completion
+    tracking and goal inference read, nothing else (resource, links etc. are
+    dropped at decode time). status and events keep their span JSON shape.
+    
+    Supports get() like the span dict it replaces; to_dict() rebuilds the JSON
+    span shape for parsing.
+    """
+    
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "span_kind",
+        "start_time",
+        "end_time",
+        "status_code",
+        "status_message",
+        "attributes",
+        "events"
+    )
+    
+    def __init__(
+        self,
+        trace_id: Optional[str],
+        span_id: Optional[str],
+        parent_id: Optional[str],
+        name: Optional[str],
+        span_kind: Optional[str],
+        start_time: Any,
+        end_time: Any,
+        status_code: Optional[str],
+        status_message: Optional[str],
+        attributes: Optional[Dict[str, Any]],
+        events: Optional[List[Any]] = None
+    ):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.span_kind = span_kind
+        self.start_time = start_time
+        self.end_time = end_time
+        self.status_code = status_code
+        self.status_message = status_message
+        self.attributes = attributes or {}
+        self.events = events or []
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """Read a field like the original span dict"""
+        if key == "context":
+            return {"trace_id": self.trace_id, "span_id": self.span_id}
+        if key == "status":
+            return self._status()
+        if key in self.__slots__ and key not in ("trace_id", "span_id", "status_code", "status_message"):
+            value = getattr(self, key)
+            return default if value is None else value
+        return default
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Span dict in the shape TraceParser.parse_spans_from_json expects"""
+        return {
+            "name": self.name,
+            "context": {"trace_id": self.trace_id, "span_id": self.span_id},
+            "parent_id": self.parent_id,
+            "span_kind": self.span_kind,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "status": self._status(),
+            "attributes": self.attributes,
+            "events": self.events
+        }
+    
+    def _status(self) -> Dict[str, Any]:
+        """Nested status object of the span JSON"""
+        return {"status_code": self.status_code, "status_message": self.status_message}
+
+
+def _record_from_dict(span: Any) -> SpanRecord:
+    """Build a record from a decoded span dict (orjson / json fallback)"""
+    if not isinstance(span, dict):
+        raise SpanDecodeError("Span message is not a JSON object")
+    
+    context = span.get("context") or {}
+    status = span.get("status") or {}
+    attributes = span.get("attributes")
+    if not isinstance(context, dict) or not isinstance(status, dict):
+        raise SpanDecodeError("Span context and status must be JSON objects")
+    if attributes is not None and not isinstance(attributes, dict):
+        raise SpanDecodeError("Span attributes must be a JSON object")
+    
+    return SpanRecord(
+        trace_id=context.get("trace_id"),
+        span_id=context.get("span_id"),
+        parent_id=span.get("parent_id"),
+        name=span.get("name"),
+        span_kind=span.get("span_kind"),
+        start_time=span.get("start_time"),
+        end_time=span.get("end_time"),
+        status_code=status.get("status_code"),
+        status_message=status.get("status_message"),
+        attributes=attributes,
+        events=span.get("events")
+    )
+
+
+if MSGSPEC_AVAILABLE:
+    class _ContextSchema(msgspec.Struct):
+        trace_id: Optional[str] = None
+        span_id: Optional[str] = None
+    
+    class _StatusSchema(msgspec.Struct):
+        status_code: Optional[str] = None
+        status_message: Optional[str] = None
+    
+    class _SpanSchema(msgspec.Struct):
+        """Declared span schema - other fields in the message are skipped, not materialized"""
+        name: Optional[str] = None
+        context: Optional[_ContextSchema] = None
+        parent_id: Optional[str] = None
+        span_kind: Optional[str] = None
+        start_time: Any = None
+        end_time: Any = None
+        status: Optional[_StatusSchema] = None
+        attributes: Optional[Dict[str, Any]] = None
+        events: Optional[List[Any]] = None
+
+
+class SpanDecoder:
+    """
+    Decodes raw span messages (bytes) into SpanRecords.
+    
+    Uses msgspec with the declared span schema if installed, else orjson, else
+    the standard json module.
+    """
+    
+    def __init__(self, decoder_config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize decoder.
+        
+        Args:
+            decoder_config: Redis configuration (span_decoder: "auto", "msgspec",
+                "orjson" or "json")
+        """
+        backend = (decoder_config or {}).get("span_decoder", "auto")
+        if backend == "auto":
+            backend = "msgspec" if MSGSPEC_AVAILABLE else "orjson" if ORJSON_AVAILABLE else "json"
+        
+        if backend == "msgspec" and not MSGSPEC_AVAILABLE:
+            raise ImportError("msgspec is required for span_decoder: msgspec")
+        if backend == "orjson" and not ORJSON_AVAILABLE:
+            raise ImportError("orjson is required for span_decoder: orjson")
+        if backend not in ("msgspec", "orjson", "json"):
+            raise ValueError(f"Invalid span_decoder: {backend}")
+        
+        self.backend = backend
+        if backend == "msgspec":
+            self._msgspec_decoder = msgspec.json.Decoder(_SpanSchema)
+        
+        logger.info(f"Decoding spans with {backend}")
+    
+    def decode(self, raw: bytes) -> SpanRecord:
+        """
+        Decode one span message.
+        
+        Args:
+            raw: Message payload
+            
+        Raises:
+            SpanDecodeError: If the payload is not a span JSON object
+        """
+        if self.backend == "msgspec":
+            try:
+                span = self._msgspec_decoder.decode(raw)
+            except msgspec.DecodeError as e:
+                raise SpanDecodeError(str(e)) from e
+            
+            context = span.context
+            status = span.status
+            return SpanRecord(
+                trace_id=context.trace_id if context else None,
+                span_id=context.span_id if context else None,
+                parent_id=span.parent_id,
+                name=span.name,
+                span_kind=span.span_kind,
+                start_time=span.start_time,
+                end_time=span.end_time,
+                status_code=status.status_code if status else None,
+                status_message=status.status_message if status else None,
+                attributes=span.attributes,
+                events=span.events
+            )
+        
+        try:
+            span = orjson.loads(raw) if self.backend == "orjson" else json.loads(raw)
+        except ValueError as e:
+            raise SpanDecodeError(str(e)) from e
+        
+        return _record_from_dict(span)
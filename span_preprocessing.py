@@ -0,0 +1,85 @@
+"""
+Span preprocessing - per-span fields of HPOS exports computed per chunk, not per row.
+"""
+
+import logging
+from typing import Dict, Any
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Columns added to each row; TracePipeline uses them when present and strips them
+# before parsing. SPAN_ID_FIELD matches the annotations to parsed spans.
+SPAN_ID_FIELD = "_span_id"
+SPAN_KIND_FIELD = "_span_kind"
+TOOL_NAME_FIELD = "_tool_name"
+HELPER_FIELDS = (SPAN_ID_FIELD, SPAN_KIND_FIELD, TOOL_NAME_FIELD)
+
+
+class SpanPreprocessor:
+    """
+    Adds span kind and tool name columns to an export chunk with vectorized
+    column operations, so the per-trace code does not loop over span
+    attributes. The tool name is the part of input.value before " with "
+    (e.g. "search_and_summarize with query: ..."), or the span name if that
+    is empty; it is only set on TOOL spans.
+    """
+    
+    def __init__(self, preprocessing_config: Dict[str, Any]):
+        """
+        Initialize preprocessor.
+        
+        Args:
+            preprocessing_config: HPOS configuration (span_preprocessing, span_id_column,
+                span_kind_column, input_value_column, span_name_column)
+        """
+        self.enabled = preprocessing_config.get("span_preprocessing", True)
+        self.span_id_column = preprocessing_config.get("span_id_column", "context.span_id")
+        self.span_kind_column = preprocessing_config.get(
+            "span_kind_column", "attributes.openinference.span.kind"
+        )
+        self.input_value_column = preprocessing_config.get("input_value_column", "attributes.input.value")
+        self.span_name_column = preprocessing_config.get("span_name_column", "name")
+    
+    def annotate(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add SPAN_ID_FIELD, SPAN_KIND_FIELD and TOOL_NAME_FIELD columns.
+        
+        Chunks without a span kind or span id column are returned unchanged (the
+        pipeline then reads span attributes as before).
+        
+        Args:
+            df: Export rows
+            
+        Returns:
+            The same rows with the added columns
+        """
+        if (
+            not self.enabled
+            or df.empty
+            or self.span_kind_column not in df.columns
+            or self.span_id_column not in df.columns
+        ):
+            return df
+        
+        kinds = df[self.span_kind_column]
+        is_tool = kinds == "TOOL"
+        
+        tool_names = pd.Series(None, index=df.index, dtype=object)
+        if is_tool.any():
+            if self.input_value_column in df.columns:
+                values = df.loc[is_tool, self.input_value_column].fillna("").astype(str)
+                names = values.str.split(" with ", n=1).str[0].str.strip()
+            else:
+                names = pd.Series("", index=df.index[is_tool], dtype=object)
+            
+            if self.span_name_column in df.columns:
+                names = names.where(names != "", df.loc[is_tool, self.span_name_column])
+            tool_names.loc[names.index] = names.values
+        
+        return df.assign(**{
+            SPAN_ID_FIELD: df[self.span_id_column],
+            SPAN_KIND_FIELD: kinds,
+            TOOL_NAME_FIELD: tool_names
+        })
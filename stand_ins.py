@@ -0,0 +1,659 @@
+"""
+Stand-ins - in-process replacements for Redis, MongoDB, Kafka, S3 and the Arize API.
+
+They implement only the calls the processors make, keep everything in memory and
+add an optional fixed latency per call, so the processors can be benchmarked on
+one machine without network access (see throughput_benchmark).
+"""
+
+import asyncio
+import copy
+import io
+import itertools
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import httpx
+from bson import ObjectId
+from botocore.exceptions import ClientError
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure
+
+_MISSING = object()
+
+
+async def _delay(latency_seconds: float):
+    """Simulated round trip; always yields to the event loop like a real client"""
+    await asyncio.sleep(latency_seconds if latency_seconds > 0 else 0)
+
+
+# ---------------------------------------------------------------------------
+# Redis
+# ---------------------------------------------------------------------------
+
+class InMemoryPubSub:
+    """Pub/sub subscription of InMemoryRedis"""
+    
+    def __init__(self, redis_stand_in: "InMemoryRedis"):
+        self.redis_stand_in = redis_stand_in
+        self.channels: List[str] = []
+        self.queue: asyncio.Queue = asyncio.Queue()
+    
+    async def subscribe(self, *channels: str):
+        for channel in channels:
+            self.channels.append(channel)
+            self.redis_stand_in.subscribers.setdefault(channel, []).append(self)
+    
+    async def unsubscribe(self, *channels: str):
+        for channel in channels or list(self.channels):
+            subscribers = self.redis_stand_in.subscribers.get(channel, [])
+            if self in subscribers:
+                subscribers.remove(self)
+            if channel in self.channels:
+                self.channels.remove(channel)
+    
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0):
+        if timeout and timeout > 0:
+            try:
+                return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return None
+        
+        try:
+            return self.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+    
+    async def close(self):
+        await self.unsubscribe()
+
+
+class _StreamGroup:
+    __slots__ = ("next_index", "pending")
+    
+    def __init__(self, next_index: int):
+        self.next_index = next_index  # Index of the next undelivered entry
+        self.pending: "OrderedDict[bytes, Dict[bytes, bytes]]" = OrderedDict()
+
+
+class InMemoryRedis:
+    """
+    Redis stand-in: pub/sub and the stream consumer group commands used by RedisProcessor.
+    
+    Also serves as its own connection pool (disconnect()).
+    """
+    
+    def __init__(self):
+        self.subscribers: Dict[str, List[InMemoryPubSub]] = {}
+        self.streams: Dict[str, List[Tuple[bytes, Dict[bytes, bytes]]]] = {}
+        self.groups: Dict[Tuple[str, str], _StreamGroup] = {}
+        self.stream_ids = itertools.count(1)
+        self.entries_added = asyncio.Event()
+        self.stats = Counter()
+    
+    async def ping(self) -> bool:
+        return True
+    
+    def pubsub(self) -> InMemoryPubSub:
+        return InMemoryPubSub(self)
+    
+    def has_subscribers(self, channel: str) -> bool:
+        return bool(self.subscribers.get(channel))
+    
+    def publish_nowait(self, channel: str, data: bytes) -> int:
+        """PUBLISH without a round trip (the benchmark publishes from the same loop)"""
+        subscribers = self.subscribers.get(channel, [])
+        for pubsub in subscribers:
+            pubsub.queue.put_nowait({"type": "message", "channel": channel.encode(), "data": data})
+        self.stats["published"] += 1
+        return len(subscribers)
+    
+    async def publish(self, channel: str, data: bytes) -> int:
+        return self.publish_nowait(channel, data)
+    
+    def xadd_nowait(self, stream_key: str, fields: Dict[bytes, bytes]) -> bytes:
+        """XADD without a round trip"""
+        message_id = f"{next(self.stream_ids)}-0".encode()
+        self.streams.setdefault(stream_key, []).append((message_id, fields))
+        self.entries_added.set()
+        self.stats["stream_entries"] += 1
+        return message_id
+    
+    async def xadd(self, stream_key: str, fields: Dict[bytes, bytes]) -> bytes:
+        return self.xadd_nowait(stream_key, fields)
+    
+    async def xgroup_create(self, stream_key: str, group: str, id: str = "$", mkstream: bool = False):
+        entries = self.streams.setdefault(stream_key, [])
+        self.groups.setdefault((stream_key, group), _StreamGroup(len(entries) if id == "$" else 0))
+    
+    async def xreadgroup(
+        self,
+        group: str,
+        consumer: str,
+        streams: Dict[str, str],
+        count: Optional[int] = None,
+        block: Optional[int] = None
+    ):
+        (stream_key, last_id), = streams.items()
+        state = self.groups[(stream_key, group)]
+        
+        if last_id != ">":
+            # Replay of this consumer's pending entries
+            entries = list(state.pending.items())[:count]
+            return [[stream_key.encode(), entries]] if entries else []
+        
+        entries = self.streams.setdefault(stream_key, [])
+        if state.next_index >= len(entries) and block:
+            self.entries_added.clear()
+            try:
+                await asyncio.wait_for(self.entries_added.wait(), timeout=block / 1000)
+            except asyncio.TimeoutError:
+                return []
+        
+        delivered = entries[state.next_index:state.next_index + (count or len(entries))]
+        state.next_index += len(delivered)
+        state.pending.update(delivered)
+        return [[stream_key.encode(), delivered]] if delivered else []
+    
+    async def xack(self, stream_key: str, group: str, *message_ids: bytes) -> int:
+        pending = self.groups[(stream_key, group)].pending
+        return sum(pending.pop(message_id, None) is not None for message_id in message_ids)
+    
+    async def xautoclaim(self, stream_key: str, group: str, consumer: str, min_idle_time: int = 0,
+                         start_id: str = "0-0", count: int = 100):
+        # Single consumer - nothing to take over
+        return [b"0-0", [], []]
+    
+    async def close(self):
+        pass
+    
+    async def disconnect(self):
+        pass
+
+
+# ---------------------------------------------------------------------------
+# MongoDB
+# ---------------------------------------------------------------------------
+
+def _get_path(doc: Dict[str, Any], path: str) -> Any:
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _set_path(doc: Dict[str, Any], path: str, value: Any):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def _unset_path(doc: Dict[str, Any], path: str):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(last, None)
+
+
+def _compare(value: Any, arg: Any, op) -> bool:
+    if value is _MISSING or value is None:
+        return False
+    try:
+        return op(value, arg)
+    except TypeError:
+        return False
+
+
+_OPERATORS = {
+    "$eq": lambda value, arg: value == arg,
+    "$ne": lambda value, arg: value != arg,
+    "$in": lambda value, arg: value in arg,
+    "$nin": lambda value, arg: value not in arg,
+    "$exists": lambda value, arg: (value is not _MISSING) == bool(arg),
+    "$lt": lambda value, arg: _compare(value, arg, lambda a, b: a < b),
+    "$lte": lambda value, arg: _compare(value, arg, lambda a, b: a <= b),
+    "$gt": lambda value, arg: _compare(value, arg, lambda a, b: a > b),
+    "$gte": lambda value, arg: _compare(value, arg, lambda a, b: a >= b)
+}
+
+
+def _is_operator_dict(condition: Any) -> bool:
+    return isinstance(condition, dict) and bool(condition) and all(key.startswith("$") for key in condition)
+
+
+def matches(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    """Whether a document matches a query (equality, $or/$and and comparison operators)"""
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, clause) for clause in condition):
+                return False
+        elif _is_operator_dict(condition):
+            value = _get_path(doc, key)
+            for op, arg in condition.items():
+                if op not in _OPERATORS:
+                    raise NotImplementedError(f"Query operator {op} not supported by the stand-in")
+                if not _OPERATORS[op](value, arg):
+                    return False
+        elif _get_path(doc, key) != condition:
+            return False
+    return True
+
+
+def _project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return copy.deepcopy(doc)
+    
+    projected = {
+        key: copy.deepcopy(value) for key, value in doc.items()
+        if key != "_id" and projection.get(key)
+    }
+    if projection.get("_id", 1) and "_id" in doc:
+        projected["_id"] = doc["_id"]
+    return projected
+
+
+class _UpdateResult:
+    def __init__(self, matched_count: int, modified_count: int, upserted_id: Any = None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
+
+class _InsertOneResult:
+    def __init__(self, inserted_id: Any):
+        self.inserted_id = inserted_id
+
+
+class _BulkWriteResult:
+    def __init__(self, matched_count: int, upserted_ids: Dict[int, Any]):
+        self.matched_count = matched_count
+        self.upserted_count = len(upserted_ids)
+        self.upserted_ids = upserted_ids
+
+
+class _Cursor:
+    """Result of find(), materialized on first iteration"""
+    
+    def __init__(self, collection: "InMemoryCollection", query: Dict[str, Any], projection):
+        self.collection = collection
+        self.query = query
+        self.projection = projection
+        self._docs: Optional[Iterable[Dict[str, Any]]] = None
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self) -> Dict[str, Any]:
+        if self._docs is None:
+            await _delay(self.collection.latency_seconds)
+            self._docs = iter([
+                _project(doc, self.projection) for doc in self.collection._find(self.query)
+            ])
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+    
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        docs = [doc async for doc in self]
+        return docs if length is None else docs[:length]
+
+
+class InMemoryCollection:
+    """
+    Collection stand-in with the Motor calls used by the processors.
+    
+    Single-field indexes (create_index) are kept as value -> _id maps and used for
+    equality and $in lookups; other queries scan the collection. TTL indexes are
+    accepted but documents never expire. Change streams are not supported, like
+    on a standalone server, so the HPOS processor falls back to polling.
+    """
+    
+    def __init__(self, name: str, latency_seconds: float = 0.0):
+        self.name = name
+        self.latency_seconds = latency_seconds
+        self.documents: "OrderedDict[Any, Dict[str, Any]]" = OrderedDict()
+        self.indexes: Dict[str, Dict[Any, set]] = {}
+        self.stats = Counter()
+    
+    def with_options(self, **kwargs) -> "InMemoryCollection":
+        return self
+    
+    async def create_index(self, keys, **kwargs) -> str:
+        field = keys if isinstance(keys, str) else keys[0][0]
+        if isinstance(keys, str) or len(keys) == 1:
+            if field not in self.indexes:
+                index: Dict[Any, set] = {}
+                for doc_id, doc in self.documents.items():
+                    index.setdefault(_get_path(doc, field), set()).add(doc_id)
+                self.indexes[field] = index
+        return f"{field}_1"
+    
+    async def insert_one(self, document: Dict[str, Any]) -> _InsertOneResult:
+        await _delay(self.latency_seconds)
+        self.stats["inserts"] += 1
+        doc = copy.deepcopy(document)
+        doc.setdefault("_id", ObjectId())
+        self._store(doc)
+        return _InsertOneResult(doc["_id"])
+    
+    async def find_one(self, query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None):
+        await _delay(self.latency_seconds)
+        self.stats["reads"] += 1
+        doc = next(iter(self._find(query)), None)
+        return _project(doc, projection) if doc is not None else None
+    
+    def find(self, query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None) -> _Cursor:
+        self.stats["reads"] += 1
+        return _Cursor(self, query, projection)
+    
+    async def count_documents(self, query: Dict[str, Any]) -> int:
+        await _delay(self.latency_seconds)
+        self.stats["reads"] += 1
+        return sum(1 for _ in self._find(query))
+    
+    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> _UpdateResult:
+        await _delay(self.latency_seconds)
+        self.stats["writes"] += 1
+        return self._update_one(query, update, upsert)
+    
+    async def find_one_and_update(
+        self,
+        query: Dict[str, Any],
+        update: Dict[str, Any],
+        sort: Optional[List[Tuple[str, int]]] = None,
+        upsert: bool = False,
+        return_document: bool = ReturnDocument.BEFORE
+    ) -> Optional[Dict[str, Any]]:
+        await _delay(self.latency_seconds)
+        self.stats["writes"] += 1
+        
+        docs = list(self._find(query))
+        for field, direction in reversed(sort or []):
+            docs.sort(key=lambda doc: _sort_key(_get_path(doc, field)), reverse=direction < 0)
+        
+        if not docs:
+            if not upsert:
+                return None
+            result = self._update_one(query, update, upsert=True)
+            return _project(self.documents[result.upserted_id], None) if return_document else None
+        
+        doc = docs[0]
+        before = copy.deepcopy(doc)
+        self._apply(doc, update, inserting=False)
+        return _project(doc, None) if return_document == ReturnDocument.AFTER else before
+    
+    async def bulk_write(self, operations: List[Any], ordered: bool = True) -> _BulkWriteResult:
+        await _delay(self.latency_seconds)
+        self.stats["bulk_writes"] += 1
+        
+        matched = 0
+        upserted_ids: Dict[int, Any] = {}
+        for index, operation in enumerate(operations):
+            # pymongo UpdateOne keeps its arguments in private attributes
+            result = self._update_one(operation._filter, operation._doc, operation._upsert)
+            self.stats["writes"] += 1
+            matched += result.matched_count
+            if result.upserted_id is not None:
+                upserted_ids[index] = result.upserted_id
+        
+        return _BulkWriteResult(matched, upserted_ids)
+    
+    def watch(self, *args, **kwargs):
+        raise OperationFailure(
+            "The $changeStream stage is only supported on replica sets", code=40573
+        )
+    
+    def _find(self, query: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+        candidates = self._candidates(query)
+        docs = self.documents.values() if candidates is None else (
+            self.documents[doc_id] for doc_id in candidates if doc_id in self.documents
+        )
+        return (doc for doc in list(docs) if matches(doc, query))
+    
+    def _candidates(self, query: Dict[str, Any]) -> Optional[List[Any]]:
+        """_ids that can match, from an index; None = scan"""
+        for field, condition in query.items():
+            if field == "_id" and not _is_operator_dict(condition):
+                return [condition]
+            index = self.indexes.get(field)
+            if index is None:
+                continue
+            if not _is_operator_dict(condition):
+                return list(index.get(condition, ()))
+            if set(condition) == {"$in"}:
+                return [doc_id for value in condition["$in"] for doc_id in index.get(value, ())]
+        return None
+    
+    def _update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool) -> _UpdateResult:
+        doc = next(iter(self._find(query)), None)
+        if doc is not None:
+            self._apply(doc, update, inserting=False)
+            return _UpdateResult(1, 1)
+        
+        if not upsert:
+            return _UpdateResult(0, 0)
+        
+        doc = {
+            key: condition for key, condition in query.items()
+            if not key.startswith("$") and not _is_operator_dict(condition)
+        }
+        self._apply(doc, update, inserting=True)
+        doc.setdefault("_id", ObjectId())
+        self._store(doc)
+        return _UpdateResult(0, 0, doc["_id"])
+    
+    def _apply(self, doc: Dict[str, Any], update: Dict[str, Any], inserting: bool):
+        old_values = {field: _get_path(doc, field) for field in self.indexes}
+        
+        for op, fields in update.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                for path, value in fields.items():
+                    _set_path(doc, path, value)
+            elif op == "$unset":
+                for path in fields:
+                    _unset_path(doc, path)
+            elif op == "$inc":
+                for path, amount in fields.items():
+                    current = _get_path(doc, path)
+                    _set_path(doc, path, (0 if current is _MISSING else current) + amount)
+            elif op != "$setOnInsert":
+                raise NotImplementedError(f"Update operator {op} not supported by the stand-in")
+        
+        if "_id" in doc and doc["_id"] in self.documents:
+            self._reindex(doc, old_values)
+    
+    def _store(self, doc: Dict[str, Any]):
+        self.documents[doc["_id"]] = doc
+        self._reindex(doc, {field: _MISSING for field in self.indexes})
+    
+    def _reindex(self, doc: Dict[str, Any], old_values: Dict[str, Any]):
+        for field, index in self.indexes.items():
+            new_value = _get_path(doc, field)
+            old_value = old_values.get(field, _MISSING)
+            if old_value is new_value or (old_value is not _MISSING and old_value == new_value):
+                continue
+            if old_value is not _MISSING:
+                index.get(old_value, set()).discard(doc["_id"])
+            index.setdefault(new_value, set()).add(doc["_id"])
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    # Missing / None sort first, like MongoDB
+    return (0, 0) if value is _MISSING or value is None else (1, value)
+
+
+class InMemoryDatabase:
+    def __init__(self, name: str, latency_seconds: float = 0.0):
+        self.name = name
+        self.latency_seconds = latency_seconds
+        self.collections: Dict[str, InMemoryCollection] = {}
+    
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        collection = self.collections.get(name)
+        if collection is None:
+            collection = self.collections[name] = InMemoryCollection(name, self.latency_seconds)
+        return collection
+
+
+class InMemoryMongoClient:
+    """MongoDB stand-in; register it with mongodb_client.register_mongo_client()"""
+    
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.databases: Dict[str, InMemoryDatabase] = {}
+    
+    def __getitem__(self, name: str) -> InMemoryDatabase:
+        database = self.databases.get(name)
+        if database is None:
+            database = self.databases[name] = InMemoryDatabase(name, self.latency_seconds)
+        return database
+    
+    def close(self):
+        pass
+    
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            f"{database.name}.{collection.name}": {"documents": len(collection.documents), **collection.stats}
+            for database in self.databases.values()
+            for collection in database.collections.values()
+        }
+
+
+# ---------------------------------------------------------------------------
+# Kafka
+# ---------------------------------------------------------------------------
+
+class InMemoryKafkaNotifier:
+    """Kafka notifier stand-in; records breach notifications"""
+    
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.notifications: List[str] = []
+    
+    async def send_breach_notification(
+        self,
+        trace_id: str,
+        runtime_id: str,
+        breach_details: Dict[str, Any],
+        evaluation_result: Dict[str, Any]
+    ) -> bool:
+        await _delay(self.latency_seconds)
+        self.notifications.append(trace_id)
+        return True
+    
+    def close(self):
+        pass
+    
+    def get_stats(self) -> Dict[str, int]:
+        return {"breach_notifications": len(self.notifications)}
+
+
+# ---------------------------------------------------------------------------
+# S3
+# ---------------------------------------------------------------------------
+
+class _Body(io.BytesIO):
+    """StreamingBody stand-in"""
+
+
+class InMemoryS3:
+    """
+    S3 client stand-in (put_object, head_object, get_object with byte ranges).
+    
+    Blocking like boto3 - the processors call it from worker threads.
+    """
+    
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.objects: Dict[Tuple[str, str], bytes] = {}
+        self.stats = Counter()
+        self._lock = threading.Lock()
+    
+    def put_object(self, Bucket: str, Key: str, Body: bytes) -> Dict[str, Any]:
+        self.objects[(Bucket, Key)] = bytes(Body)
+        return {}
+    
+    def head_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        data = self._object(Bucket, Key, "HeadObject")
+        return {"ContentLength": len(data)}
+    
+    def get_object(self, Bucket: str, Key: str, Range: Optional[str] = None) -> Dict[str, Any]:
+        data = self._object(Bucket, Key, "GetObject")
+        
+        if Range:
+            start, end = Range.split("=", 1)[1].split("-")
+            data = data[int(start):int(end) + 1]
+        
+        with self._lock:
+            self.stats["get_requests"] += 1
+            self.stats["bytes_read"] += len(data)
+        
+        return {"Body": _Body(data), "ContentLength": len(data)}
+    
+    def _object(self, bucket: str, key: str, operation: str) -> bytes:
+        if self.latency_seconds > 0:
+            time.sleep(self.latency_seconds)
+        
+        data = self.objects.get((bucket, key))
+        if data is None:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": key}}, operation)
+        return data
+    
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats)
+
+
+# ---------------------------------------------------------------------------
+# Arize
+# ---------------------------------------------------------------------------
+
+class ArizeStandIn:
+    """
+    Arize HTTP API stand-in, served through httpx.MockTransport.
+    
+    Accepts every request (or fails error_rate of them with 503) after latency_seconds.
+    """
+    
+    def __init__(self, latency_seconds: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency_seconds = latency_seconds
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = Counter()
+        self.errors = 0
+    
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        await _delay(self.latency_seconds)
+        self.requests[request.url.path] += 1
+        
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.errors += 1
+            return httpx.Response(503, json={"error": "unavailable"})
+        return httpx.Response(200, json={"status": "ok"})
+    
+    async def install(self, arize_exporter):
+        """Point an enabled ArizeExporter's HTTP client at the stand-in"""
+        if arize_exporter.client is None:
+            return
+        
+        headers = arize_exporter.client.headers
+        await arize_exporter.client.aclose()
+        arize_exporter.client = httpx.AsyncClient(
+            base_url=arize_exporter.endpoint,
+            headers=headers,
+            transport=httpx.MockTransport(self.handle)
+        )
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {"requests": dict(self.requests), "errors": self.errors}
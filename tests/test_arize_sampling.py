@@ -0,0 +1,48 @@
+"""
+ArizeExporter sampling: passed traces are sampled out, breaches and failures are always exported.
+"""
+
+import asyncio
+
+from guardrails_eval.exporters.arize_exporter import ArizeExporter
+from guardrails_eval.benchmarks.stand_ins import ArizeStandIn
+
+ARIZE_CONFIG = {
+    "endpoint": "http://arize.test.invalid",
+    "api_key": "test",
+    "space_id": "test",
+    "pass_sample_rate": 0.0
+}
+
+PASSED = {"overall_status": "passed", "breached_status": False, "guardrail_results": []}
+FAILED = {"overall_status": "failed", "breached_status": False, "guardrail_results": []}
+BREACHED = {"overall_status": "failed", "breached_status": True, "guardrail_results": []}
+
+
+def test_sampled_out_passed_traces_return_none_and_failures_are_exported():
+    async def scenario():
+        exporter = ArizeExporter(ARIZE_CONFIG)
+        arize = ArizeStandIn()
+        await arize.install(exporter)
+        
+        try:
+            passed = [
+                await exporter.export_evaluation_result(f"passed-{i}", "runtime", PASSED)
+                for i in range(20)
+            ]
+            failed = await exporter.export_evaluation_result("failed", "runtime", FAILED)
+            breached = await exporter.export_evaluation_result("breached", "runtime", BREACHED)
+            
+            assert passed == [None] * 20
+            assert failed is True
+            assert breached is True
+            assert arize.requests["/api/v1/evaluations"] == 2
+            
+            # Sampled-out passes are counted exactly for the aggregates
+            assert exporter.sampled_out_counts == {"runtime": 20}
+        finally:
+            await exporter.close()
+        
+        assert arize.requests["/api/v1/evaluations/aggregates"] == 1
+    
+    asyncio.run(scenario())
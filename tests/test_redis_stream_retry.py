@@ -0,0 +1,97 @@
+"""
+RedisProcessor stream ingestion: failed traces are retried when their entries are reclaimed.
+"""
+
+import asyncio
+import json
+
+from guardrails_eval.processors.redis_processor import RedisProcessor
+from guardrails_eval.benchmarks.throughput_benchmark import MONGODB_URI, StandIns, SyntheticTraceGenerator
+
+RUNTIME_ID = "test-runtime"
+
+EVALUATION_RESULT = {"overall_status": "passed", "breached_status": False, "guardrail_results": []}
+
+
+class _FlakyPipeline:
+    """Fails the first evaluation of every trace, then succeeds"""
+    
+    def __init__(self):
+        self.calls = []
+    
+    async def evaluate_json_spans(self, trace_id, spans):
+        self.calls.append(trace_id)
+        if self.calls.count(trace_id) == 1:
+            raise RuntimeError("evaluation failed")
+        return {"evaluation_result": EVALUATION_RESULT, "user_prompt": "", "model_response": ""}
+    
+    async def close(self):
+        pass
+
+
+def _processor(stand_ins: StandIns) -> RedisProcessor:
+    with stand_ins.install():
+        processor = RedisProcessor(
+            {
+                "host": "test.invalid",
+                "port": 6379,
+                "ingestion_mode": "stream",
+                "completion_grace_seconds": 0
+            },
+            {"uri": MONGODB_URI, "database": "test"},
+            {},
+            None,
+            {"runtime_id": RUNTIME_ID, "guardrails": {}}
+        )
+    processor.redis_client = stand_ins.redis
+    processor.pipeline = _FlakyPipeline()
+    return processor
+
+
+async def _evaluate_queued(processor: RedisProcessor):
+    while not processor.trace_queue.empty():
+        trace_id, spans, message_ids, _ = processor.trace_queue.get_nowait()
+        await processor._process_complete_trace(trace_id, spans, message_ids)
+
+
+def test_failed_trace_is_reevaluated_after_reclaim():
+    async def scenario():
+        stand_ins = StandIns({}, seed=1)
+        processor = _processor(stand_ins)
+        await processor._ensure_consumer_group()
+        
+        generator = SyntheticTraceGenerator(
+            {
+                "traces": 1,
+                "spans_per_trace": 4,
+                "prompt_chars": 40,
+                "response_chars": 40,
+                "breach_share": 0.0,
+                "seed": 1
+            },
+            RUNTIME_ID
+        )
+        trace_id = generator.trace_id(0)
+        for span in generator.spans(0):
+            stand_ins.redis.xadd_nowait(processor.stream_key, {processor.stream_field_key: json.dumps(span).encode()})
+        
+        group = (processor.consumer_group, processor.consumer_name)
+        response = await stand_ins.redis.xreadgroup(*group, {processor.stream_key: ">"}, count=100)
+        await processor._handle_stream_entries(response[0][1])
+        
+        # First evaluation fails: nothing is acknowledged
+        await _evaluate_queued(processor)
+        pending = stand_ins.redis.groups[(processor.stream_key, processor.consumer_group)].pending
+        assert len(pending) == len(generator.spans(0))
+        assert not processor.completion.is_completed(trace_id)
+        
+        # The reclaimed entries rebuild the trace instead of being dropped as late spans
+        response = await stand_ins.redis.xreadgroup(*group, {processor.stream_key: "0"}, count=100)
+        await processor._handle_stream_entries(response[0][1])
+        await _evaluate_queued(processor)
+        
+        assert processor.pipeline.calls == [trace_id, trace_id]
+        assert not pending
+        assert processor.completion.get_stats()["late_spans_dropped"] == 0
+    
+    asyncio.run(scenario())
@@ -0,0 +1,268 @@
+"""
+Trace buffer - memory-bounded trace assembly store with idle TTL and LRU eviction.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedTrace:
+    """Spans and bookkeeping for a single trace being assembled"""
+    
+    __slots__ = (
+        "trace_id", "spans", "message_ids", "size_bytes", "created_at", "last_seen",
+        "spans_seen", "root_ended_at", "expected_spans"
+    )
+    
+    def __init__(self, trace_id: str, now: float):
+        self.trace_id = trace_id
+        self.spans: List[Any] = []  # Buffered (evaluation-relevant) spans only
+        self.message_ids: List[str] = []  # Stream entry IDs (stream ingestion mode)
+        self.size_bytes = 0
+        self.created_at = now
+        self.last_seen = now
+        
+        # Completion tracking (see TraceCompletionTracker)
+        self.spans_seen = 0  # All spans observed, buffered or not
+        self.root_ended_at: Optional[float] = None
+        self.expected_spans: Optional[int] = None
+
+
+class TraceBuffer:
+    """
+    Assembles spans into traces with bounded memory.
+    
+    - Per-trace idle TTL: traces without new spans for trace_idle_ttl_seconds expire
+    - Global budget: max_buffered_spans / max_buffered_bytes, enforced by evicting
+      the least recently updated traces
+    - Expired and evicted traces are flushed for best-effort evaluation or dropped,
+      according to expired_trace_policy ("flush" or "drop")
+    - Spans of evaluated traces retained for late-span re-evaluation count against
+      the same budget; the oldest retained traces are dropped first
+    """
+    
+    def __init__(self, buffer_config: Dict[str, Any]):
+        """
+        Initialize trace buffer.
+        
+        Args:
+            buffer_config: Buffer configuration (trace_idle_ttl_seconds, max_buffered_spans,
+                max_buffered_bytes, expired_trace_policy)
+        """
+        self.idle_ttl_seconds = buffer_config.get("trace_idle_ttl_seconds", 300)
+        self.max_spans = buffer_config.get("max_buffered_spans", 100000)
+        self.max_bytes = buffer_config.get("max_buffered_bytes", 256 * 1024 * 1024)
+        self.expired_policy = buffer_config.get("expired_trace_policy", "flush")
+        if self.expired_policy not in ("flush", "drop"):
+            raise ValueError(f"Invalid expired_trace_policy: {self.expired_policy}")
+        
+        # Ordered by last update: first entry is the least recently updated trace
+        self.traces: "OrderedDict[str, BufferedTrace]" = OrderedDict()
+        self.total_spans = 0
+        self.total_bytes = 0
+        
+        # Evaluated traces kept for re-evaluation (see TraceCompletionTracker), oldest first
+        self.retained: "OrderedDict[str, BufferedTrace]" = OrderedDict()
+        self.retained_spans = 0
+        self.retained_bytes = 0
+        
+        self.stats = {
+            "completed": 0,
+            "expired": 0,
+            "evicted": 0,
+            "flushed": 0,
+            "dropped": 0,
+            "retained_dropped": 0
+        }
+    
+    def __len__(self) -> int:
+        return len(self.traces)
+    
+    def __contains__(self, trace_id: str) -> bool:
+        return trace_id in self.traces
+    
+    def add(
+        self,
+        trace_id: str,
+        span_data: Optional[Any],
+        size_bytes: int = 0,
+        message_id: Optional[str] = None
+    ) -> Tuple[BufferedTrace, List[BufferedTrace]]:
+        """
+        Add a span to its trace.
+        
+        Args:
+            trace_id: Trace identifier
+            span_data: Span (SpanRecord), or None to only record that a span was seen
+            size_bytes: Approximate span size (raw message length)
+            message_id: Stream entry ID (stream ingestion mode only)
+            
+        Returns:
+            Tuple of (trace entry, traces evicted to stay within the span/byte budget)
+        """
+        now = time.monotonic()
+        
+        entry = self.traces.get(trace_id)
+        if entry is None:
+            entry = BufferedTrace(trace_id, now)
+            self.traces[trace_id] = entry
+        else:
+            self.traces.move_to_end(trace_id)
+        
+        entry.spans_seen += 1
+        entry.last_seen = now
+        if message_id:
+            entry.message_ids.append(message_id)
+        
+        if span_data is not None:
+            entry.spans.append(span_data)
+            entry.size_bytes += size_bytes
+            self.total_spans += 1
+            self.total_bytes += size_bytes
+        
+        return entry, self._evict_over_budget()
+    
+    def restore(self, entry: BufferedTrace):
+        """
+        Put a previously removed trace back into the buffer (late-span re-evaluation).
+        
+        Args:
+            entry: Trace entry returned by pop()
+        """
+        entry.last_seen = time.monotonic()
+        self.traces[entry.trace_id] = entry
+        self.traces.move_to_end(entry.trace_id)
+        self.total_spans += len(entry.spans)
+        self.total_bytes += entry.size_bytes
+    
+    def pop(self, trace_id: str) -> Optional[BufferedTrace]:
+        """
+        Remove a completed trace from the buffer.
+        
+        Args:
+            trace_id: Trace identifier
+            
+        Returns:
+            Buffered trace, or None if the trace is not buffered
+        """
+        entry = self._remove(trace_id)
+        if entry is not None:
+            self.stats["completed"] += 1
+        return entry
+    
+    def expire(self) -> List[BufferedTrace]:
+        """
+        Remove traces that have been idle for longer than the TTL.
+        
+        Returns:
+            Expired traces
+        """
+        deadline = time.monotonic() - self.idle_ttl_seconds
+        expired = []
+        
+        while self.traces:
+            entry = next(iter(self.traces.values()))
+            if entry.last_seen > deadline:
+                break
+            expired.append(self._remove(entry.trace_id))
+        
+        self.stats["expired"] += len(expired)
+        return expired
+    
+    def retain(self, entry: BufferedTrace):
+        """
+        Keep the spans of an evaluated trace for re-evaluation, within the budget.
+        
+        Args:
+            entry: Trace entry returned by pop()
+        """
+        self.release(entry.trace_id)
+        self.retained[entry.trace_id] = entry
+        self.retained_spans += len(entry.spans)
+        self.retained_bytes += entry.size_bytes
+        self._drop_retained_over_budget()
+    
+    def take_retained(self, trace_id: str) -> Optional[BufferedTrace]:
+        """
+        Remove and return a retained trace.
+        
+        Args:
+            trace_id: Trace identifier
+            
+        Returns:
+            Retained trace entry, or None if it was not retained (or dropped for budget)
+        """
+        entry = self.retained.pop(trace_id, None)
+        if entry is not None:
+            self.retained_spans -= len(entry.spans)
+            self.retained_bytes -= entry.size_bytes
+        return entry
+    
+    def release(self, trace_id: str):
+        """Forget a retained trace"""
+        self.take_retained(trace_id)
+    
+    def record_outcome(self, flushed: bool):
+        """Count an expired/evicted trace as flushed or dropped"""
+        self.stats["flushed" if flushed else "dropped"] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get buffer statistics.
+        
+        Returns:
+            Dictionary with current size and completed/expired/evicted/flushed/dropped counters
+        """
+        return {
+            "buffered_traces": len(self.traces),
+            "buffered_spans": self.total_spans,
+            "buffered_bytes": self.total_bytes,
+            "retained_traces": len(self.retained),
+            "retained_spans": self.retained_spans,
+            "retained_bytes": self.retained_bytes,
+            **self.stats
+        }
+    
+    def _over_budget(self) -> bool:
+        return (
+            self.total_spans + self.retained_spans > self.max_spans
+            or self.total_bytes + self.retained_bytes > self.max_bytes
+        )
+    
+    def _drop_retained_over_budget(self):
+        """Drop the oldest retained traces until the buffer fits its budget (or none are left)"""
+        dropped = 0
+        
+        while self.retained and self._over_budget():
+            self.take_retained(next(iter(self.retained)))
+            dropped += 1
+        
+        if dropped:
+            self.stats["retained_dropped"] += dropped
+            logger.debug(f"Trace buffer over budget, dropped {dropped} retained traces")
+    
+    def _evict_over_budget(self) -> List[BufferedTrace]:
+        """Evict least recently updated traces until the buffer fits its budget"""
+        self._drop_retained_over_budget()
+        evicted = []
+        
+        while self.traces and self._over_budget():
+            trace_id = next(iter(self.traces))
+            evicted.append(self._remove(trace_id))
+        
+        if evicted:
+            self.stats["evicted"] += len(evicted)
+            logger.warning(f"Trace buffer over budget, evicted {len(evicted)} traces")
+        
+        return evicted
+    
+    def _remove(self, trace_id: str) -> Optional[BufferedTrace]:
+        entry = self.traces.pop(trace_id, None)
+        if entry is not None:
+            self.total_spans -= len(entry.spans)
+            self.total_bytes -= entry.size_bytes
+        return entry
@@ -0,0 +1,213 @@
+"""
+Trace completion - decides when a buffered trace is complete and handles late spans.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from guardrails_eval.processors.trace_buffer import BufferedTrace, TraceBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class TraceCompletionTracker:
+    """
+    Tracks trace completion across all spans of a trace.
+    
+    - A trace is complete once its root span (no parent_id) has ended, whatever its
+      status, and a grace window (completion_grace_seconds) has passed so late
+      children are still included
+    - If the root span carries an expected child count (expected_child_count_attribute),
+      the trace completes as soon as that many children have been seen
+    - Spans arriving after a trace was evaluated are dropped ("dedupe") or trigger
+      a re-evaluation with the full span set ("reevaluate"), per late_span_policy;
+      retained spans are held by the trace buffer and count against its budget
+    """
+    
+    def __init__(self, completion_config: Dict[str, Any], trace_buffer: TraceBuffer):
+        """
+        Initialize completion tracker.
+        
+        Args:
+            completion_config: Completion configuration (completion_grace_seconds,
+                expected_child_count_attribute, late_span_policy,
+                completed_trace_retention_seconds, max_completed_traces)
+            trace_buffer: Buffer whose span/byte budget also covers retained spans
+        """
+        self.trace_buffer = trace_buffer
+        self.grace_seconds = completion_config.get("completion_grace_seconds", 0.5)
+        self.expected_child_count_attribute = completion_config.get("expected_child_count_attribute")
+        self.late_span_policy = completion_config.get("late_span_policy", "dedupe")
+        if self.late_span_policy not in ("dedupe", "reevaluate"):
+            raise ValueError(f"Invalid late_span_policy: {self.late_span_policy}")
+        self.retention_seconds = completion_config.get("completed_trace_retention_seconds", 300)
+        self.max_completed = completion_config.get("max_completed_traces", 10000)
+        
+        # Traces whose root span ended, waiting out the grace window: trace_id -> deadline
+        self.pending: Dict[str, float] = {}
+        
+        # Recently completed traces: trace_id -> completed_at
+        # Their spans are only retained (in the trace buffer) in "reevaluate" mode
+        self.completed: "OrderedDict[str, float]" = OrderedDict()
+        
+        self.stats = {
+            "completed_by_count": 0,
+            "completed_by_grace": 0,
+            "late_spans_dropped": 0,
+            "late_spans_reevaluated": 0
+        }
+    
+    @staticmethod
+    def is_root_span(span_data: Dict[str, Any]) -> bool:
+        """Root span: parent_id is None or empty"""
+        parent_id = span_data.get("parent_id")
+        return parent_id is None or parent_id == ""
+    
+    def observe(self, entry: BufferedTrace, span_data: Dict[str, Any]) -> bool:
+        """
+        Update completion state with a newly seen span.
+        
+        Args:
+            entry: Trace entry the span was added to
+            span_data: Span data (any span kind)
+            
+        Returns:
+            True if the trace is complete now and should be evaluated immediately
+        """
+        if self.is_root_span(span_data):
+            entry.root_ended_at = time.monotonic()
+            entry.expected_spans = self._expected_spans(span_data)
+            
+            if self.grace_seconds <= 0:
+                return True
+            
+            self.pending[entry.trace_id] = entry.root_ended_at + self.grace_seconds
+        
+        if (
+            entry.root_ended_at is not None
+            and entry.expected_spans is not None
+            and entry.spans_seen >= entry.expected_spans
+        ):
+            self.pending.pop(entry.trace_id, None)
+            self.stats["completed_by_count"] += 1
+            return True
+        
+        return False
+    
+    def due(self) -> List[str]:
+        """
+        Get traces whose grace window has passed.
+        
+        Returns:
+            Trace IDs ready for evaluation
+        """
+        now = time.monotonic()
+        ready = [trace_id for trace_id, deadline in self.pending.items() if deadline <= now]
+        
+        for trace_id in ready:
+            del self.pending[trace_id]
+        
+        self.stats["completed_by_grace"] += len(ready)
+        self._prune_completed(now)
+        return ready
+    
+    def discard(self, trace_id: str):
+        """Forget the grace window of a trace (expired, evicted or completed)"""
+        self.pending.pop(trace_id, None)
+    
+    def mark_completed(self, entry: BufferedTrace):
+        """
+        Remember an evaluated trace so late spans can be recognised.
+        
+        Args:
+            entry: Trace entry removed from the buffer
+        """
+        self.pending.pop(entry.trace_id, None)
+        self.completed[entry.trace_id] = time.monotonic()
+        self.completed.move_to_end(entry.trace_id)
+        if self.late_span_policy == "reevaluate":
+            self.trace_buffer.retain(entry)
+        
+        while len(self.completed) > self.max_completed:
+            self._forget_oldest()
+    
+    def uncomplete(self, trace_id: str):
+        """
+        Forget a trace entirely, so its redelivered spans rebuild it instead of
+        counting as late spans (evaluation failed or the trace was dropped).
+        
+        Args:
+            trace_id: Trace identifier
+        """
+        self.pending.pop(trace_id, None)
+        if self.completed.pop(trace_id, None) is not None:
+            self.trace_buffer.release(trace_id)
+    
+    def is_completed(self, trace_id: str) -> bool:
+        return trace_id in self.completed
+    
+    def record_late_span(self, reevaluated: bool):
+        """Count a span that arrived after its trace was evaluated"""
+        self.stats["late_spans_reevaluated" if reevaluated else "late_spans_dropped"] += 1
+    
+    def reopen(self, trace_id: str) -> Optional[BufferedTrace]:
+        """
+        Reopen a completed trace for re-evaluation ("reevaluate" policy).
+        
+        The trace gets a fresh grace window so a burst of late spans is
+        evaluated once.
+        
+        Args:
+            trace_id: Trace identifier
+            
+        Returns:
+            Retained trace entry, or None if its spans were not retained
+        """
+        self.completed.pop(trace_id, None)
+        entry = self.trace_buffer.take_retained(trace_id)
+        if entry is None:
+            return None
+        
+        entry.message_ids = []
+        self.pending[trace_id] = time.monotonic() + max(self.grace_seconds, 0)
+        return entry
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get completion statistics.
+        
+        Returns:
+            Dictionary with pending/completed counts and late-span counters
+        """
+        return {
+            "pending_grace": len(self.pending),
+            "recently_completed": len(self.completed),
+            **self.stats
+        }
+    
+    def _expected_spans(self, root_span: Dict[str, Any]) -> Optional[int]:
+        """Total expected spans (root + children) from the root span attributes"""
+        if not self.expected_child_count_attribute:
+            return None
+        
+        value = (root_span.get("attributes") or {}).get(self.expected_child_count_attribute)
+        try:
+            return int(value) + 1 if value is not None else None
+        except (TypeError, ValueError):
+            logger.debug(f"Invalid expected child count: {value}")
+            return None
+    
+    def _prune_completed(self, now: float):
+        """Forget completed traces older than the retention window"""
+        deadline = now - self.retention_seconds
+        
+        while self.completed:
+            if next(iter(self.completed.values())) > deadline:
+                break
+            self._forget_oldest()
+    
+    def _forget_oldest(self):
+        trace_id, _ = self.completed.popitem(last=False)
+        self.trace_buffer.release(trace_id)
@@ -0,0 +1,360 @@
+"""
+Trace export reader - streams traces out of HPOS exports in bounded memory.
+"""
+
+import logging
+import os
+import tempfile
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from guardrails_eval.utils.trace_parser import TraceParser
+from guardrails_eval.utils.span_preprocessing import SpanPreprocessor
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("csv", "parquet", "arrow")
+
+# Columns TraceParser.parse_spans_from_csv and SpanPreprocessor read (besides the
+# configured id columns); a trailing "*" matches a column prefix
+REQUIRED_COLUMNS = (
+    "name",
+    "span_kind",
+    "start_time",
+    "end_time",
+    "status_code",
+    "status_message",
+    "events",
+    "attributes.*"
+)
+
+# File extension -> export format
+FORMAT_EXTENSIONS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".ipc": "arrow",
+    ".feather": "arrow"
+}
+
+
+class TraceExportReader:
+    """
+    Reads an export in chunks and yields each trace's rows once the trace is complete.
+    
+    - Sorted by trace_id (fast path): a trace is complete as soon as the next
+      trace_id starts, so only the current chunk and one trailing trace are in memory
+    - Unsorted: rows are spilled to hash-partitioned temporary files on disk (CSV
+      for CSV exports, Arrow IPC for Parquet/Arrow exports so column types
+      survive), then each partition is grouped on its own, so memory is bounded
+      by the largest partition rather than the whole export
+    
+    Exports are CSV, Parquet (read by row group) or Arrow IPC (read by record
+    batch); only the columns the pipeline reads (REQUIRED_COLUMNS, or the
+    configured columns) are loaded, unless columns is set to None. Span kind and
+    tool name are computed per chunk before grouping (see SpanPreprocessor).
+    """
+    
+    def __init__(self, reader_config: Dict[str, Any]):
+        """
+        Initialize export reader.
+        
+        Args:
+            reader_config: HPOS configuration (csv_chunk_size, trace_id_column,
+                span_id_column, parent_id_column, spill_partitions, spill_directory, columns)
+        """
+        self.chunk_size = reader_config.get("csv_chunk_size", 50000)
+        self.trace_id_column = reader_config.get("trace_id_column", "context.trace_id")
+        span_id_column = reader_config.get("span_id_column", "context.span_id")
+        parent_id_column = reader_config.get("parent_id_column", "parent_id")
+        
+        # Identifier columns are read as text in every chunk: per-chunk type inference
+        # could make an id int in one chunk and str in another (and drop leading zeros)
+        self.csv_dtypes = {
+            self.trace_id_column: str,
+            span_id_column: str,
+            parent_id_column: str
+        }
+        self.spill_partitions = reader_config.get("spill_partitions", 64)
+        self.spill_directory = reader_config.get("spill_directory")  # None = system temp dir
+        self.preprocessor = SpanPreprocessor(reader_config)
+        
+        # Columns TraceParser and the preprocessor read (exact names and "prefix*"
+        # patterns); columns: null reads all columns
+        columns = reader_config.get("columns", REQUIRED_COLUMNS)
+        self.columns: Optional[List[str]] = None
+        self.column_prefixes: Tuple[str, ...] = ()
+        if columns:
+            self.columns = list(dict.fromkeys([
+                self.trace_id_column,
+                span_id_column,
+                parent_id_column,
+                self.preprocessor.span_kind_column,
+                self.preprocessor.input_value_column,
+                self.preprocessor.span_name_column,
+                *(column for column in columns if not column.endswith("*"))
+            ]))
+            self.column_prefixes = tuple(column[:-1] for column in columns if column.endswith("*"))
+    
+    @staticmethod
+    def detect_format(filename: str, declared: Optional[str] = None) -> str:
+        """
+        Determine an export's format.
+        
+        Args:
+            filename: Export filename or S3 location (extension, before any .gz)
+            declared: format field of the TraceExports document, if set
+            
+        Returns:
+            "csv", "parquet" or "arrow"
+        """
+        if declared:
+            export_format = declared.lower()
+            if export_format not in EXPORT_FORMATS:
+                raise ValueError(f"Unsupported export format: {declared}")
+            return export_format
+        
+        name = filename.lower()
+        if name.endswith(".gz"):
+            name = name[:-3]
+        return FORMAT_EXTENSIONS.get(os.path.splitext(name)[1], "csv")
+    
+    @staticmethod
+    def detect_compression(filename: str) -> Optional[str]:
+        """
+        Compression of a CSV export, from its filename.
+        
+        pandas only infers compression from paths, not from the file objects
+        exports are streamed through.
+        
+        Args:
+            filename: Export filename or S3 location
+            
+        Returns:
+            "gzip" or None
+        """
+        return "gzip" if filename.lower().endswith(".gz") else None
+    
+    def trace_order(self, sorted_by_trace_id: bool) -> str:
+        """
+        Identify the order iter_traces yields traces in for an export.
+        
+        The order is deterministic for a given export and settings; it changes if
+        the export is read differently (e.g. another spill_partitions).
+        
+        Args:
+            sorted_by_trace_id: Whether rows of each trace are contiguous
+        """
+        if sorted_by_trace_id:
+            return "sorted"
+        return f"spill-{self.spill_partitions}"
+    
+    def iter_chunks(
+        self,
+        source,
+        export_format: str = "csv",
+        compression: Optional[str] = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Read the export in chunks of about csv_chunk_size rows.
+        
+        Args:
+            source: File path or binary file-like object (seekable for Parquet/Arrow)
+            export_format: "csv", "parquet" or "arrow"
+            compression: CSV compression (see detect_compression)
+        """
+        if export_format == "csv":
+            usecols = None
+            if self.columns:
+                usecols = self._wanted  # Missing columns are fine
+            yield from pd.read_csv(
+                source,
+                chunksize=self.chunk_size,
+                usecols=usecols,
+                dtype=self.csv_dtypes,
+                compression=compression or "infer"
+            )
+            return
+        
+        if not PYARROW_AVAILABLE:
+            raise ImportError(f"pyarrow is required to read {export_format} exports")
+        
+        if export_format == "parquet":
+            yield from self._iter_parquet(source)
+        elif export_format == "arrow":
+            yield from self._iter_arrow(source)
+        else:
+            raise ValueError(f"Unsupported export format: {export_format}")
+    
+    def _iter_parquet(self, source) -> Iterator[pd.DataFrame]:
+        """Read a Parquet export row group by row group"""
+        parquet_file = pq.ParquetFile(source)
+        
+        for batch in parquet_file.iter_batches(
+            batch_size=self.chunk_size,
+            columns=self._project(parquet_file.schema_arrow.names)
+        ):
+            yield batch.to_pandas()
+    
+    def _iter_arrow(self, source) -> Iterator[pd.DataFrame]:
+        """Read an Arrow IPC export (file or stream format) record batch by record batch"""
+        try:
+            reader = pa.ipc.open_file(source)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+            names = reader.schema.names
+        except pa.ArrowInvalid:
+            if hasattr(source, "seek"):
+                source.seek(0)
+            reader = pa.ipc.open_stream(source)
+            batches = iter(reader)
+            names = reader.schema.names
+        
+        columns = self._project(names)
+        for batch in batches:
+            if columns is not None:
+                batch = batch.select(columns)
+            yield batch.to_pandas()
+    
+    def _wanted(self, column: str) -> bool:
+        """Whether a column is read"""
+        return column in self.columns or column.startswith(self.column_prefixes)
+    
+    def _project(self, available: List[str]) -> Optional[List[str]]:
+        """Configured columns present in the export (None = all)"""
+        if not self.columns:
+            return None
+        return [column for column in available if self._wanted(column)]
+    
+    def iter_traces(
+        self,
+        source,
+        sorted_by_trace_id: bool,
+        export_format: str = "csv",
+        compression: Optional[str] = None
+    ) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Stream (trace_id, trace_data) pairs from an export.
+        
+        Blocking (file I/O and parsing) - run from a worker thread.
+        
+        Args:
+            source: File path or binary file-like object
+            sorted_by_trace_id: Whether rows of each trace are contiguous
+            export_format: "csv", "parquet" or "arrow"
+            compression: CSV compression (see detect_compression)
+        """
+        chunks = self.iter_chunks(source, export_format, compression)
+        
+        if sorted_by_trace_id:
+            yield from self._iter_sorted(chunks)
+        else:
+            yield from self._iter_spilled(chunks, "csv" if export_format == "csv" else "arrow")
+    
+    def _iter_sorted(self, chunks: Iterator[pd.DataFrame]) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """Emit traces as soon as the next trace_id starts"""
+        carry = None  # Rows of the last trace of the previous chunk (may continue)
+        
+        for chunk in chunks:
+            if carry is not None:
+                chunk = pd.concat([carry, chunk], ignore_index=True)
+            if chunk.empty:
+                continue
+            
+            tail = chunk[self.trace_id_column] == chunk[self.trace_id_column].iloc[-1]
+            carry = chunk[tail]
+            yield from self.group(chunk[~tail])
+        
+        if carry is not None:
+            yield from self.group(carry)
+    
+    def _iter_spilled(
+        self,
+        chunks: Iterator[pd.DataFrame],
+        spill_format: str = "csv"
+    ) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Partition rows by trace_id hash on disk, then group one partition at a time.
+        
+        Args:
+            chunks: Export chunks
+            spill_format: "csv" (one appended file per partition) or "arrow" (one
+                Arrow IPC file per chunk and partition, keeping column types)
+        """
+        if spill_format == "arrow":
+            yield from self._iter_spilled_arrow(chunks)
+            return
+        
+        with tempfile.TemporaryDirectory(prefix="hpos_spill_", dir=self.spill_directory) as spill_dir:
+            written = set()
+            
+            for chunk in chunks:
+                partitions = self._partitions(chunk)
+                
+                for partition, rows in chunk.groupby(partitions.values):
+                    rows.to_csv(
+                        self._spill_path(spill_dir, partition),
+                        mode="a",
+                        header=partition not in written,
+                        index=False
+                    )
+                    written.add(partition)
+            
+            logger.debug(f"Spilled export into {len(written)} partitions")
+            
+            for partition in sorted(written):
+                path = self._spill_path(spill_dir, partition)
+                yield from self.group(pd.read_csv(path, dtype=self.csv_dtypes))
+                os.remove(path)
+    
+    def _iter_spilled_arrow(self, chunks: Iterator[pd.DataFrame]) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """Spill partitions as Arrow IPC files, so Parquet/Arrow column types are kept"""
+        with tempfile.TemporaryDirectory(prefix="hpos_spill_", dir=self.spill_directory) as spill_dir:
+            parts: Dict[int, List[str]] = {}
+            
+            for chunk_index, chunk in enumerate(chunks):
+                partitions = self._partitions(chunk)
+                
+                for partition, rows in chunk.groupby(partitions.values):
+                    path = os.path.join(
+                        spill_dir, f"partition-{int(partition):05d}-{chunk_index:06d}.arrow"
+                    )
+                    feather.write_feather(rows.reset_index(drop=True), path, compression="uncompressed")
+                    parts.setdefault(int(partition), []).append(path)
+            
+            logger.debug(f"Spilled export into {len(parts)} partitions")
+            
+            for partition in sorted(parts):
+                paths = parts[partition]
+                df = pd.concat([feather.read_table(path).to_pandas() for path in paths], ignore_index=True)
+                yield from self.group(df)
+                for path in paths:
+                    os.remove(path)
+    
+    def _partitions(self, chunk: pd.DataFrame) -> pd.Series:
+        """Spill partition of each row"""
+        # Stable across runs (unlike hash()), so partition order is reproducible
+        return pd.util.hash_pandas_object(
+            chunk[self.trace_id_column].astype(str), index=False
+        ) % self.spill_partitions
+    
+    @staticmethod
+    def _spill_path(spill_dir: str, partition: int) -> str:
+        return os.path.join(spill_dir, f"partition-{int(partition):05d}.csv")
+    
+    def group(self, df: pd.DataFrame) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """Group complete rows by trace_id with the regular CSV grouping"""
+        if df.empty:
+            return
+        df = self.preprocessor.annotate(df)
+        yield from TraceParser.group_csv_by_trace_id(df.to_dict('records')).items()
@@ -0,0 +1,406 @@
+"""
+Trace pipeline - parsing, goal inference and guardrails evaluation for a single trace.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import logging
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional
+
+from guardrails_eval.utils.trace_parser import TraceParser
+from guardrails_eval.utils.goal_inference import GoalInference
+from guardrails_eval.utils.goal_cache import CachedGoalInference
+from guardrails_eval.utils.span_preprocessing import (
+    HELPER_FIELDS,
+    SPAN_ID_FIELD,
+    SPAN_KIND_FIELD,
+    TOOL_NAME_FIELD
+)
+from guardrails_eval.executor.guardrails_executor import GuardrailsExecutor
+from guardrails_eval.executor.guardrail_memo import install_guardrail_memo, iter_guardrails
+from guardrails_eval.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Timings of the trace being evaluated in the current task (guardrail latencies land here)
+_trace_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("trace_timings", default=None)
+
+
+def _time_guardrails(executor):
+    """Record each guardrail's evaluate latency into the current trace's timings"""
+    for name, guardrail in iter_guardrails(executor):
+        evaluate = getattr(guardrail, "evaluate", None)
+        if evaluate is None:
+            continue
+        
+        key = f"guardrail:{name}"
+        
+        if inspect.iscoroutinefunction(evaluate):
+            async def timed_evaluate(*args, _evaluate=evaluate, _key=key, **kwargs):
+                timings = _trace_timings.get()
+                if timings is None:
+                    return await _evaluate(*args, **kwargs)
+                with timed(timings, _key):
+                    return await _evaluate(*args, **kwargs)
+        else:
+            def timed_evaluate(*args, _evaluate=evaluate, _key=key, **kwargs):
+                timings = _trace_timings.get()
+                if timings is None:
+                    return _evaluate(*args, **kwargs)
+                with timed(timings, _key):
+                    return _evaluate(*args, **kwargs)
+        
+        guardrail.evaluate = functools.wraps(evaluate)(timed_evaluate)
+
+
+def _count_memo_lookup(name: str, outcome: str):
+    """Count a guardrail memo lookup into the current trace's timings (see record_timings)"""
+    timings = _trace_timings.get()
+    if timings is not None:
+        key = f"memo:{name}:{outcome}"
+        timings[key] = timings.get(key, 0) + 1
+
+
+def _tool_name(input_value: Optional[str], span_name: str) -> str:
+    """Tool name from input.value (e.g. "search_and_summarize with query: ..."), else the span name"""
+    input_value = input_value or ""
+    tool_name = input_value.split(" with ")[0].strip() if " with " in input_value else input_value.strip()
+    return tool_name or span_name  # Fallback to span name if extraction fails
+
+
+def _span_id(span: Any) -> Optional[str]:
+    """Span id of a parsed span (context.span_id)"""
+    context = getattr(span, "context", None)
+    if isinstance(context, dict):
+        return context.get("span_id")
+    return getattr(context, "span_id", None)
+
+
+def _stable_hash(value: Any) -> str:
+    """Hash of a JSON-like value, independent of key order"""
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class TracePipeline:
+    """
+    CPU side of trace processing, shared by RedisProcessor and HPOSProcessor.
+    
+    Takes the raw spans of one trace and returns the evaluation result together
+    with the extracted user prompt and model response. Performs no I/O, so it can
+    run inline on the event loop or inside a worker process (see ShardedTracePipeline).
+    
+    Each step is also available on its own: prepare_* parses the trace and, if
+    content_hash is set, computes its content hash (parsed trace + guardrail config
+    version), evaluate_prepared runs the guardrails, so results can be cached in
+    between (see CachedTracePipeline).
+    
+    Results carry timings (stage and per-guardrail seconds) so the parent process
+    can record metrics for work done in shard workers too.
+    """
+    
+    def __init__(
+        self,
+        agent_card: Dict[str, Any],
+        guardrail_memo_config: Optional[Dict[str, Any]] = None,
+        goal_config: Optional[Dict[str, Any]] = None,
+        content_hash: bool = False
+    ):
+        """
+        Initialize trace pipeline.
+        
+        Args:
+            agent_card: Agent card configuration
+            guardrail_memo_config: Per-guardrail memoization (optional, see install_guardrail_memo)
+            goal_config: Goal inference cache configuration (optional, see CachedGoalInference)
+            content_hash: Compute content hashes of prepared traces (needed by the
+                evaluation cache only; otherwise content_hash is None)
+        """
+        self.agent_card = agent_card
+        self.runtime_id = agent_card.get("runtime_id")
+        self.executor = GuardrailsExecutor(agent_card)
+        self.guardrail_memos = install_guardrail_memo(self.executor, guardrail_memo_config)
+        for memo in self.guardrail_memos.values():
+            memo.on_lookup = _count_memo_lookup
+        _time_guardrails(self.executor)
+        self.goal_config = goal_config
+        self._goal_inference: Optional[CachedGoalInference] = None
+        
+        # Results are only reusable under the same agent card / guardrail config
+        self.content_hash = content_hash
+        self.config_version = _stable_hash(agent_card)
+    
+    @property
+    def goal_inference(self) -> CachedGoalInference:
+        """Goal inference (cached, batched), created on first use"""
+        if self._goal_inference is None:
+            self._goal_inference = CachedGoalInference(GoalInference(self.agent_card), self.goal_config)
+        return self._goal_inference
+    
+    async def evaluate_json_spans(self, trace_id: str, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Evaluate a trace assembled from JSON spans (Redis).
+        
+        Args:
+            trace_id: Trace identifier
+            spans: Span dictionaries
+            
+        Returns:
+            Dictionary with evaluation_result, user_prompt, model_response and content_hash
+        """
+        prepared = await self.prepare_json_spans(trace_id, spans)
+        return await self.evaluate_prepared(trace_id, prepared)
+    
+    async def evaluate_csv_rows(self, trace_id: str, trace_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Evaluate a trace from HPOS CSV rows.
+        
+        Args:
+            trace_id: Trace identifier
+            trace_data: CSV rows of the trace
+            
+        Returns:
+            Dictionary with evaluation_result, user_prompt, model_response and content_hash
+        """
+        prepared = await self.prepare_csv_rows(trace_id, trace_data)
+        return await self.evaluate_prepared(trace_id, prepared)
+    
+    async def prepare_json_spans(self, trace_id: str, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Parse a trace assembled from JSON spans (Redis), without evaluating it.
+        
+        Args:
+            trace_id: Trace identifier
+            spans: Span dictionaries
+            
+        Returns:
+            Dictionary with parsed_trace, user_prompt, model_response, content_hash and timings
+        """
+        timings: Dict[str, float] = {}
+        
+        with timed(timings, "parse"):
+            # Parse trace
+            parsed_trace = TraceParser.parse_spans_from_json(spans)
+            
+            # Extract user prompt and model response
+            user_prompt, model_response = TraceParser.extract_user_prompt_and_response(
+                parsed_trace.get("llm_spans", [])
+            )
+        
+        # Infer goal the same way as for HPOS exports
+        if not parsed_trace.get("goal_name"):
+            with timed(timings, "goal_inference"):
+                tool_calls = [
+                    {"tool_name": _tool_name((span.get("attributes") or {}).get("input.value"), span.get("name"))}
+                    for span in spans if span.get("span_kind") == "TOOL"
+                ]
+                parsed_trace["goal_name"] = await self.goal_inference.infer(
+                    user_prompt or "",
+                    tool_calls,
+                    parsed_trace.get("llm_spans", [])
+                )
+            logger.debug(f"Inferred goal for trace {trace_id}: {parsed_trace['goal_name']}")
+        
+        return self._prepared(parsed_trace, user_prompt, model_response, timings)
+    
+    async def prepare_csv_rows(self, trace_id: str, trace_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Parse a trace from HPOS CSV rows and infer its goal, without evaluating it.
+        
+        Args:
+            trace_id: Trace identifier
+            trace_data: CSV rows of the trace
+            
+        Returns:
+            Dictionary with parsed_trace, user_prompt, model_response, content_hash and timings
+        """
+        timings: Dict[str, float] = {}
+        
+        with timed(timings, "parse"):
+            # Span kind and tool name computed per chunk (SpanPreprocessor), by span id;
+            # the helper columns are dropped so they never reach the parsed trace or its hash
+            annotations = None
+            if trace_data and SPAN_KIND_FIELD in trace_data[0]:
+                annotations = {
+                    row[SPAN_ID_FIELD]: (row[SPAN_KIND_FIELD], row[TOOL_NAME_FIELD])
+                    for row in trace_data
+                }
+                trace_data = [
+                    {key: value for key, value in row.items() if key not in HELPER_FIELDS}
+                    for row in trace_data
+                ]
+            
+            # Parse spans from CSV rows
+            spans = TraceParser.parse_spans_from_csv(trace_data)
+            
+            matched = None
+            if annotations is not None:
+                matched = [annotations.get(_span_id(span)) for span in spans]
+            
+            if matched and all(annotation is not None for annotation in matched):
+                temp_llm_spans = [s for s, (kind, _) in zip(spans, matched) if kind == "LLM"]
+                tool_calls = [{"tool_name": tool_name} for kind, tool_name in matched if kind == "TOOL"]
+            else:
+                temp_llm_spans, tool_calls = self._llm_spans_and_tool_calls(spans)
+            
+            # Extract user prompt early for goal inference
+            user_prompt, model_response = TraceParser.extract_user_prompt_and_response(temp_llm_spans)
+        
+        with timed(timings, "goal_inference"):
+            # Infer goal from user prompt and tools
+            inferred_goal = await self.goal_inference.infer(
+                user_prompt or "",
+                tool_calls,
+                temp_llm_spans
+            )
+        
+        logger.info(f"Inferred goal for trace {trace_id}: {inferred_goal}")
+        
+        with timed(timings, "parse"):
+            # Parse complete trace with filtering and metadata (including inferred goal)
+            parsed_trace = TraceParser.parse_trace(
+                spans=spans,
+                trace_id=trace_id,
+                runtime_id=self.runtime_id,
+                goal_name=inferred_goal  # Use inferred goal
+            )
+            
+            # Convert ParsedTrace to dictionary for evaluation
+            trace_dict = parsed_trace.model_dump()
+        
+        return self._prepared(trace_dict, user_prompt, model_response, timings)
+    
+    @staticmethod
+    def _llm_spans_and_tool_calls(spans: List[Any]):
+        """LLM spans and tool calls of a trace, read from span attributes"""
+        llm_spans = [s for s in spans if s.attributes.get("openinference.span.kind") == "LLM"]
+        
+        tool_calls = [
+            {"tool_name": _tool_name(s.attributes.get("input.value", ""), s.name)}
+            for s in spans if s.attributes.get("openinference.span.kind") == "TOOL"
+        ]
+        
+        return llm_spans, tool_calls
+    
+    async def evaluate_prepared(self, trace_id: str, prepared: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run guardrails evaluation on a prepared trace.
+        
+        Args:
+            trace_id: Trace identifier
+            prepared: Result of prepare_json_spans / prepare_csv_rows
+            
+        Returns:
+            Dictionary with evaluation_result, user_prompt, model_response, content_hash
+            and timings (prepare timings plus evaluate and per-guardrail seconds)
+        """
+        timings = dict(prepared.get("timings") or {})
+        
+        token = _trace_timings.set(timings)
+        try:
+            with timed(timings, "evaluate"):
+                evaluation_result = await self.executor.evaluate(prepared["parsed_trace"])
+        finally:
+            _trace_timings.reset(token)
+        
+        return {
+            "evaluation_result": evaluation_result,
+            "user_prompt": prepared["user_prompt"],
+            "model_response": prepared["model_response"],
+            "content_hash": prepared["content_hash"],
+            "timings": timings
+        }
+    
+    def _prepared(
+        self,
+        parsed_trace: Dict[str, Any],
+        user_prompt: Optional[str],
+        model_response: Optional[str],
+        timings: Dict[str, float]
+    ) -> Dict[str, Any]:
+        """Bundle a parsed trace with its content hash (None unless content_hash is enabled)"""
+        content_hash = None
+        if self.content_hash:
+            with timed(timings, "content_hash"):
+                content_hash = _stable_hash([self.config_version, parsed_trace])
+        
+        return {
+            "parsed_trace": parsed_trace,
+            "user_prompt": user_prompt,
+            "model_response": model_response,
+            "content_hash": content_hash,
+            "timings": timings
+        }
+    
+    def get_memo_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get per-guardrail memoization statistics.
+        
+        Returns:
+            Dictionary of guardrail name -> statistics
+        """
+        return {name: memo.get_stats() for name, memo in self.guardrail_memos.items()}
+    
+    async def close(self):
+        """Release pipeline resources"""
+        for store in {memo.store for memo in self.guardrail_memos.values() if memo.store is not None}:
+            store.close()
+
+
+def create_trace_pipeline(agent_card: Dict[str, Any], processor_config: Dict[str, Any], database=None):
+    """
+    Create the trace pipeline selected by the processor configuration.
+    
+    Args:
+        agent_card: Agent card configuration
+        processor_config: redis_config or hpos_config; execution_mode is "inline"
+            (default, evaluate on the event loop) or "sharded" (num_shards worker
+            processes); evaluation_cache enables result caching (opt-in,
+            enabled: true) and guardrail_memo per-guardrail memoization
+        database: MongoDB database for the persistent evaluation cache (optional)
+            
+    Returns:
+        TracePipeline, ShardedTracePipeline or CachedTracePipeline wrapping either
+    """
+    execution_mode = processor_config.get("execution_mode", "inline")
+    
+    # Only the goal cache settings - the processor config holds credentials and is
+    # pickled to every shard process
+    goal_config = {
+        key: processor_config[key] for key in ("goal_cache_max_entries",) if key in processor_config
+    }
+    
+    cache_config = processor_config.get("evaluation_cache") or {}
+    cache_enabled = cache_config.get("enabled", False)
+    
+    if execution_mode == "sharded":
+        from guardrails_eval.processors.sharded_pipeline import ShardedTracePipeline
+        
+        pipeline = ShardedTracePipeline(
+            agent_card,
+            num_shards=processor_config.get("num_shards"),
+            start_method=processor_config.get("shard_start_method", "spawn"),
+            guardrail_memo_config=processor_config.get("guardrail_memo"),
+            goal_config=goal_config,
+            content_hash=cache_enabled
+        )
+    elif execution_mode == "inline":
+        pipeline = TracePipeline(
+            agent_card, processor_config.get("guardrail_memo"), goal_config, content_hash=cache_enabled
+        )
+    else:
+        raise ValueError(f"Invalid execution_mode: {execution_mode}")
+    
+    if not cache_enabled:
+        return pipeline
+    
+    from guardrails_eval.processors.evaluation_cache import CachedTracePipeline, EvaluationCache
+    
+    collection = None
+    if database is not None and cache_config.get("persistent", True):
+        collection = database[cache_config.get("collection", "evaluation_cache")]
+    
+    return CachedTracePipeline(pipeline, EvaluationCache(collection, cache_config))